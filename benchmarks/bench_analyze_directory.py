@@ -0,0 +1,43 @@
+"""Benchmark how analyze_directory scales with the number of worker processes.
+
+Example usage:
+
+    python -m benchmarks.bench_analyze_directory --replays 2000 --workers 1 2 4 8 16
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import main
+
+from .bench_extraction import _DEFAULT_REPLAY
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--replays', type=int, default=1000)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        for i in range(args.replays):
+            shutil.copyfile(_DEFAULT_REPLAY, os.path.join(directory, f'replay-{i}.html'))
+
+        baseline = None
+        for workers in args.workers:
+            start = time.perf_counter()
+            main.analyze_directory(directory, workers=workers)
+            throughput = args.replays / (time.perf_counter() - start)
+            baseline = baseline or throughput / workers
+            print(f'workers: {workers:3d}  {throughput:10.1f} replays/s  '
+                  f'({throughput / baseline:5.1f}x single worker)')
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,80 @@
+"""Benchmark parsing a corpus of battle logs in bulk.
+
+parse_battle_logs and parse_concatenated_file are timed against calling
+parse_replay once per battle log. The corpus is made of variants of the
+fixture replay with different player names and winners.
+
+Example usage:
+
+    python -m benchmarks.bench_bulk_parse --logs 10000
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import List
+
+from showdown_replay_analyzer import bulk, showdown
+
+from .bench_extraction import _DEFAULT_REPLAY
+
+
+def _build_corpus(battle_log: str, count: int) -> List[str]:
+    corpus = []
+    for i in range(count):
+        variant = battle_log.replace('Quarter Machine', f'Player {i}')
+        if i % 2:
+            variant = variant.replace(f'|win|Player {i}', '|win|Tears ricochet')
+        corpus.append(variant)
+    return corpus
+
+
+def _best(function, rounds: int) -> float:
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--logs', type=int, default=10000)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--mode', choices=showdown.PARSE_MODES, default='full')
+    args = parser.parse_args()
+
+    battle_log = showdown.ShowdownDownloadReplayRetrievalStrategy().retrieve_replay(_DEFAULT_REPLAY)
+    corpus = _build_corpus(battle_log, args.logs)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'battle-logs.txt')
+        with open(path, 'w', encoding='utf8') as f:
+            f.write('\n'.join(corpus))
+
+        expected = [showdown.parse_replay(log, args.mode) for log in corpus]
+        if bulk.parse_battle_logs(corpus, args.mode) != expected:
+            raise RuntimeError('parse_battle_logs disagrees with parse_replay')
+        if bulk.parse_concatenated_file(path, args.mode) != expected:
+            raise RuntimeError('parse_concatenated_file disagrees with parse_replay')
+        del expected
+
+        per_file = _best(
+            lambda: [showdown.parse_replay(log, args.mode) for log in corpus],
+            args.rounds
+        )
+        batched = _best(lambda: bulk.parse_battle_logs(corpus, args.mode), args.rounds)
+        mapped = _best(lambda: bulk.parse_concatenated_file(path, args.mode), args.rounds)
+
+    print(f'battle logs:             {args.logs} ({sum(map(len, corpus)) / 1e6:.1f} M characters)')
+    for name, seconds in (
+            ('parse_replay per log', per_file),
+            ('parse_battle_logs', batched),
+            ('parse_concatenated_file', mapped)):
+        print(f'{name + ":":24} {seconds:7.2f} s, {args.logs / seconds:8.0f} logs/s, '
+              f'{per_file / seconds:4.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Benchmark finding the top species pairs of many teams.
+
+Random teams of six are drawn from hundreds of species, with four brought
+and two leads. CoreAggregator.top_pairs is timed against counting every
+pair of every team in a Counter.
+
+Example usage:
+
+    python -m benchmarks.bench_cores --teams 100000 --species 300
+"""
+import argparse
+import collections
+import itertools
+import random
+import time
+
+from showdown_replay_analyzer import cores, dex, pokemon, showdown
+
+
+def _random_teams(count: int, species_count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    names = dex.default_dex().species.names[:species_count]
+    # Some species are much more popular than others, like on the ladder.
+    weights = [1 / (rank + 1) for rank in range(species_count)]
+    player_infos = []
+    for _ in range(count):
+        species = set()
+        while len(species) < 6:
+            species.update(rng.choices(names, weights, k=6 - len(species)))
+        team = pokemon.Team([pokemon.Pokemon(name) for name in species])
+        for position, p in enumerate(rng.sample(team.pokemon, 4)):
+            p.was_brought = True
+            p.was_lead = position < 2
+        player_infos.append(showdown.PlayerInfo('player', team, rng.random() < 0.5))
+    return player_infos
+
+
+def _counter_top_pairs(player_infos: list, k: int) -> list:
+    counts = collections.Counter()
+    for player_info in player_infos:
+        species = sorted(p.species for p in player_info.team.pokemon)
+        counts.update(itertools.combinations(species, 2))
+    return counts.most_common(k)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--teams', type=int, default=100000)
+    parser.add_argument('--species', type=int, default=300)
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    player_infos = _random_teams(args.teams, args.species, args.seed)
+
+    start = time.perf_counter()
+    expected = _counter_top_pairs(player_infos, args.top)
+    counter = time.perf_counter() - start
+
+    start = time.perf_counter()
+    aggregator = cores.CoreAggregator()
+    for player_info in player_infos:
+        aggregator.add(player_info)
+    added = time.perf_counter() - start
+    start = time.perf_counter()
+    top = aggregator.top_pairs(args.top)
+    query = time.perf_counter() - start
+
+    if [core.count for core in top] != [count for _, count in expected]:
+        raise RuntimeError('top_pairs disagrees with counting every pair')
+
+    start = time.perf_counter()
+    aggregator.top_pairs(args.top, selection='lead')
+    aggregator.top_selections(args.top, selection='brought')
+    other_queries = time.perf_counter() - start
+
+    print(f'teams: {args.teams}, species: {args.species}')
+    print(f'Counter of every pair:        {counter:6.2f} s')
+    print(f'CoreAggregator add:           {added:6.2f} s')
+    print(f'CoreAggregator top_pairs:     {query:6.2f} s, {counter / (added + query):4.2f}x with add')
+    print(f'lead pairs and brought quads: {other_queries:6.2f} s')
+
+
+if __name__ == '__main__':
+    main()
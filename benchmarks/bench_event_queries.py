@@ -0,0 +1,67 @@
+"""Benchmark vectorized queries over a memory-mapped event store.
+
+The events of the fixture replay are repeated into a store of millions of
+events, saved as .npy files and loaded memory-mapped. Each query is compared
+with parsing the equivalent number of replays again.
+
+Example usage:
+
+    python -m benchmarks.bench_event_queries --replays 100000
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from showdown_replay_analyzer import events, showdown
+
+from .bench_extraction import _DEFAULT_REPLAY
+
+
+def _best(function, rounds: int) -> float:
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--replays', type=int, default=100000)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    battle_log = showdown.ShowdownDownloadReplayRetrievalStrategy().retrieve_replay(_DEFAULT_REPLAY)
+    store = events.EventStore()
+    store.add_replay(battle_log)
+    replay_events = len(store)
+    columns = {name: np.tile(store.column(name), args.replays) for name in events.COLUMNS}
+    columns['replay'] = np.repeat(np.arange(args.replays, dtype=np.int32), replay_events)
+    corpus = events.EventStore.from_columns(
+        columns,
+        store.names,
+        [str(i) for i in range(args.replays)]
+    )
+    del columns
+
+    parse = _best(lambda: showdown.parse_replay(battle_log), args.rounds * 10)
+    with tempfile.TemporaryDirectory() as directory:
+        corpus.save(directory)
+        loaded = events.EventStore.load(directory)
+        queries = {
+            'move usage on turn 1': lambda: loaded.move_usage(turn=1),
+            'move usage': loaded.move_usage,
+            'tera timing': loaded.tera_turns,
+        }
+        print(f'events: {len(loaded) / 1e6:.1f} M from {args.replays} replays')
+        print(f'parsing the replays again: {parse * args.replays:8.2f} s')
+        for name, query in queries.items():
+            print(f'{name + ":":26} {_best(query, args.rounds) * 1e3:8.1f} ms')
+        del loaded
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Benchmark battle log extraction from downloaded Showdown replays.
+
+Compares the BeautifulSoup based extraction with the raw byte scan used by
+ShowdownDownloadReplayRetrievalStrategy and reports files per second.
+
+Example usage:
+
+    python -m benchmarks.bench_extraction
+    python -m benchmarks.bench_extraction --replays-dir ~/Downloads/replays
+"""
+import argparse
+import os
+import pathlib
+import time
+from typing import Callable, List
+
+from showdown_replay_analyzer import showdown
+
+_DEFAULT_REPLAY = pathlib.Path(__file__).parent.parent / 'tests' / 'resources' / \
+    'Gen9VGC2024RegFBo3-2024-02-24-tearsricochet-quartermachine.html'
+
+
+def _files_per_second(retrieve: Callable[[str], str], locations: List[str], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for location in locations:
+            retrieve(location)
+    return len(locations) * repeat / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--replays-dir', help='Directory of downloaded replays')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    if args.replays_dir:
+        locations = [
+            os.path.join(root, file)
+            for root, _, files in os.walk(os.path.abspath(args.replays_dir))
+            for file in files
+        ]
+    else:
+        locations = [str(_DEFAULT_REPLAY)]
+
+    bs4_strategy = showdown.ShowdownDownloadReplayRetrievalStrategy(
+        fast_extraction=False
+    )
+    fast_strategy = showdown.ShowdownDownloadReplayRetrievalStrategy()
+
+    for location in locations:
+        if bs4_strategy.retrieve_replay(location) != fast_strategy.retrieve_replay(location):
+            raise RuntimeError(f'Extraction mismatch for {location}')
+
+    before = _files_per_second(bs4_strategy.retrieve_replay, locations, args.repeat)
+    after = _files_per_second(fast_strategy.retrieve_replay, locations, args.repeat)
+    print(f'files:        {len(locations) * args.repeat}')
+    print(f'bs4:          {before:10.1f} files/s')
+    print(f'byte scan:    {after:10.1f} files/s')
+    print(f'speedup:      {after / before:10.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Benchmark rejecting replays with a filter while they are parsed.
+
+Parsing a replay a filter rejects is timed against parsing it fully and then
+checking the players and teams, which is what main.py did before filters
+were evaluated by the parser.
+
+Example usage:
+
+    python -m benchmarks.bench_filters --turn-repeats 10
+"""
+import argparse
+
+from showdown_replay_analyzer import filters, showdown
+
+from .bench_extraction import _DEFAULT_REPLAY
+from .bench_parse_replay import _time
+from .bench_team_lookup import build_long_battle_log
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--turn-repeats', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=10)
+    args = parser.parse_args()
+
+    battle_logs = {
+        'fixture': showdown.ShowdownDownloadReplayRetrievalStrategy().retrieve_replay(_DEFAULT_REPLAY),
+        'long': build_long_battle_log(args.turn_repeats),
+    }
+    conditions = {
+        'player': filters.player_not_in('Tears ricochet'),
+        'team': filters.team_lacks('Flutter Mane', players=['Quarter Machine']),
+        'format': filters.format_in('gen9ou'),
+    }
+    for name, battle_log in battle_logs.items():
+        for condition, replay_filter in conditions.items():
+            def parse_then_check(log: str, replay_filter=replay_filter) -> bool:
+                return replay_filter.accepts(showdown.parse_replay(log), filters.battle_format(log))
+
+            def parse_filtered(log: str, replay_filter=replay_filter) -> bool:
+                return showdown.parse_replay(log, replay_filter=replay_filter) is not None
+
+            if parse_then_check(battle_log) or parse_filtered(battle_log):
+                raise RuntimeError(f'The {condition} filter accepts the {name} battle log')
+            full_seconds, filtered_seconds = _time(
+                [parse_then_check, parse_filtered],
+                battle_log,
+                args.repeat,
+                args.rounds
+            )
+            print(f'{name + ":":<9} {condition + ":":<8} '
+                  f'{full_seconds * 1e6:8.0f} us parse then check  '
+                  f'{filtered_seconds * 1e6:8.0f} us filtered  '
+                  f'{full_seconds / filtered_seconds:6.1f}x')
+
+
+if __name__ == '__main__':
+    main()
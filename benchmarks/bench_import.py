@@ -0,0 +1,86 @@
+"""Benchmark the time to import the parser in a new interpreter.
+
+Each module is imported in fresh subprocesses, as a worker process or a cron
+invocation of main.py would, and the median time of the import statement is
+reported. The benchmark fails if importing showdown_replay_analyzer.showdown
+takes longer than the budget or imports BeautifulSoup or requests, which are
+only imported by the retrieval strategies that need them.
+
+Example usage:
+
+    python -m benchmarks.bench_import --runs 20 --budget-ms 150
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import List, Tuple
+
+_BUDGETED_MODULE = 'showdown_replay_analyzer.showdown'
+_MODULES = [
+    _BUDGETED_MODULE,
+    'showdown_replay_analyzer.serialization',
+    'showdown_replay_analyzer.pokepaste',
+    'main',
+]
+_HEAVY_MODULES = ['bs4', 'requests']
+
+_IMPORT_SCRIPT = '''
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps([seconds, [name for name in {heavy_modules!r} if name in sys.modules]]))
+'''
+
+
+def time_import(module: str) -> Tuple[float, List[str]]:
+    """Imports a module in a new interpreter.
+
+    Args:
+        module: The name of the module.
+
+    Returns:
+        The seconds the import took and the heavy modules it imported.
+    """
+    output = subprocess.run(
+        [sys.executable, '-c', _IMPORT_SCRIPT.format(module=module, heavy_modules=_HEAVY_MODULES)],
+        check=True,
+        capture_output=True,
+        text=True
+    ).stdout
+    seconds, heavy_modules = json.loads(output)
+    return seconds, heavy_modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--budget-ms', type=float, default=150,
+                        help=f'Maximum median time to import {_BUDGETED_MODULE}')
+    args = parser.parse_args()
+
+    failures = []
+    for module in _MODULES:
+        timings = []
+        heavy_modules = set()
+        for _ in range(args.runs):
+            seconds, imported = time_import(module)
+            timings.append(seconds)
+            heavy_modules.update(imported)
+        median_ms = statistics.median(timings) * 1e3
+        print(f'{module + ":":<40} {median_ms:7.1f} ms median  '
+              f'{min(timings) * 1e3:7.1f} ms min  '
+              f'imports {", ".join(sorted(heavy_modules)) or "no heavy modules"}')
+        if module == _BUDGETED_MODULE:
+            if median_ms > args.budget_ms:
+                failures.append(f'{module} took {median_ms:.1f} ms, over the budget of {args.budget_ms:.0f} ms')
+            if heavy_modules:
+                failures.append(f'{module} imports {", ".join(sorted(heavy_modules))}')
+    if failures:
+        sys.exit('\n'.join(failures))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Benchmark building species matchup matrices.
+
+Random games between teams drawn from hundreds of species are matched.
+MatchupMatrix is timed against counting every pair of opposing species in
+nested Python loops.
+
+Example usage:
+
+    python -m benchmarks.bench_matchups --replays 200000 --species 300
+"""
+import argparse
+import collections
+import time
+
+import numpy as np
+
+from showdown_replay_analyzer import matchups
+
+from .bench_cores import _random_teams
+
+
+def _loop_matchups(games: list, selection: str) -> collections.Counter:
+    counts = collections.Counter()
+    for player_info, opponent_info in games:
+        player = [p.species for p in player_info.team.pokemon if selection == 'team' or p.was_lead]
+        opponent = [p.species for p in opponent_info.team.pokemon if selection == 'team' or p.was_lead]
+        for species in player:
+            for opponent_species in opponent:
+                counts[species, opponent_species] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--replays', type=int, default=200000)
+    parser.add_argument('--species', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    player_infos = _random_teams(2 * args.replays, args.species, args.seed)
+    for player_info in player_infos[1::2]:
+        player_info.is_winner = False
+    # Both points of view of every replay.
+    games = list(zip(player_infos[::2], player_infos[1::2])) + list(zip(player_infos[1::2], player_infos[::2]))
+
+    print(f'replays: {args.replays}, species: {args.species}')
+    for selection in ('team', 'lead'):
+        start = time.perf_counter()
+        expected = _loop_matchups(games, selection)
+        loop = time.perf_counter() - start
+
+        start = time.perf_counter()
+        matrix = matchups.MatchupMatrix(selection)
+        for player_info, opponent_info in games:
+            matrix.add(player_info, opponent_info)
+        added = time.perf_counter() - start
+        start = time.perf_counter()
+        played = matrix.games()
+        matrix.win_rates()
+        counted = time.perf_counter() - start
+
+        if int(played.sum()) != sum(expected.values()) or len(expected) != np.count_nonzero(played):
+            raise RuntimeError('MatchupMatrix disagrees with the nested loops')
+        print(f'{selection}: nested loops {loop:6.2f} s, MatchupMatrix add {added:6.2f} s '
+              f'+ count {counted:5.2f} s, {loop / (added + counted):4.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark decoding the packed teams of showteam lines.
+
+unpack_team is timed against the previous showteam handling, which sliced
+the split line once per Pokemon and only read the species, moves and Tera
+type.
+
+Example usage:
+
+    python -m benchmarks.bench_packed_team
+"""
+import argparse
+import time
+from typing import List, Tuple
+
+from showdown_replay_analyzer import packed_team, showdown
+
+from .bench_extraction import _DEFAULT_REPLAY
+
+
+def _slice_showteam(command_parts: List[str]) -> List[Tuple[str, List[str], str]]:
+    pokemon = []
+    next_pokemon = command_parts[3]
+    command_parts = command_parts[4:]
+    index_buffer = 0
+    while next_pokemon:
+        species = next_pokemon
+        moves = command_parts[3 - index_buffer].split(',')
+        tera_type_and_next_pokemon = command_parts[10 - index_buffer] \
+            .split(',')[-1] \
+            .split(']')
+        tera_type = tera_type_and_next_pokemon[0]
+        next_pokemon = tera_type_and_next_pokemon[1] \
+            if len(tera_type_and_next_pokemon) > 1 \
+            else None
+        command_parts = command_parts[12 - index_buffer:]
+        index_buffer = 1
+        pokemon.append((species, moves, tera_type))
+    return pokemon
+
+
+def _time(function, values, repeat: int, rounds: int) -> float:
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for value in values:
+                function(value)
+        best = min(best, (time.perf_counter() - start) / repeat / len(values))
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    battle_log = showdown.ShowdownDownloadReplayRetrievalStrategy().retrieve_replay(_DEFAULT_REPLAY)
+    lines = [line for line in battle_log.split('\n') if line.startswith('|showteam|')]
+    offsets = [line.index('|', len('|showteam|')) + 1 for line in lines]
+
+    for line, offset in zip(lines, offsets):
+        decoded = [
+            (p.species, p.moves, p.tera_type)
+            for p in packed_team.unpack_team(line, offset)
+        ]
+        if decoded != _slice_showteam(line.split('|')):
+            raise RuntimeError('The decoders disagree')
+
+    sliced = _time(lambda line: _slice_showteam(line.split('|')), lines, args.repeat, args.rounds)
+    unpacked = _time(
+        lambda line: packed_team.unpack_team(line, line.index('|', 10) + 1),
+        lines,
+        args.repeat,
+        args.rounds
+    )
+    print(f'showteam lines:  {len(lines)} with 6 Pokemon each')
+    print(f'split and slice: {sliced * 1e6:8.2f} us per line (species, moves and Tera type)')
+    print(f'unpack_team:     {unpacked * 1e6:8.2f} us per line (every field)')
+
+
+if __name__ == '__main__':
+    main()
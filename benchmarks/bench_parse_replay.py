@@ -0,0 +1,230 @@
+"""Benchmark parse_replay on full-length battle logs.
+
+The handler-dispatch parser is timed against the previous parser, which split
+every line of the battle log before matching its command. The long log repeats
+the turns of the fixture replay. The target is a 2x speedup on the long log,
+and whether it was met is reported. The short fixture log is dominated by its
+showteam lines and gains less.
+
+Example usage:
+
+    python -m benchmarks.bench_parse_replay --turn-repeats 10
+"""
+# pylint: disable=protected-access
+import argparse
+import collections
+import time
+
+from showdown_replay_analyzer import showdown
+from showdown_replay_analyzer.pokemon import Pokemon, Team
+from showdown_replay_analyzer.showdown import (
+    PlayerInfo,
+    ShowdownReplay,
+    _is_player1,
+    _resolve_leads,
+    _resolve_nickname,
+    _resolve_player,
+    _resolve_species
+)
+
+from .bench_extraction import _DEFAULT_REPLAY
+from .bench_team_lookup import build_long_battle_log
+
+_TARGET_SPEEDUP = 2.0
+
+
+def _split_every_line_parse_replay(battle_log: str) -> ShowdownReplay:
+    # The previous parse_replay, with the current Team API.
+    player1: str = None
+    player2: str = None
+    player1_team: Team = Team(pokemon=[])
+    player2_team: Team = Team(pokemon=[])
+    player1_brought = collections.OrderedDict()
+    player2_brought = collections.OrderedDict()
+
+    is_ots = '|showteam|' in battle_log
+
+    for line in battle_log.split('\n'):
+        if not line:
+            continue
+
+        command_parts = line.split('|')
+        if len(command_parts) == 1:
+            continue
+
+        command = command_parts[1]
+
+        match command:
+            case 'player':
+                # |player|p1|player|avatar|elo
+                if player1 and player2:
+                    continue
+                player_number = _resolve_player(command_parts)
+                player_name = command_parts[3]
+                if _is_player1(player_number):
+                    player1 = player_name
+                else:
+                    player2 = player_name
+
+            case 'poke':
+                # |poke|p1|Species, Level, Gender|
+                # only useful if not OTS
+                if is_ots:
+                    continue
+                player_number = _resolve_player(command_parts)
+                species = _resolve_species(command_parts)
+                team = player1_team \
+                    if _is_player1(player_number)\
+                    else player2_team
+                pokemon = Pokemon(species=species)
+                team.add_pokemon(pokemon)
+
+            case 'showteam':
+                # |showteam|p1|Species|?|Item|Ability|Move1,Move2,Move3,Move4|?|?|Gender|?|?|50|,,,,,Tera]...
+                # only useful if OTS
+                if not is_ots:
+                    continue
+                player_number = _resolve_player(command_parts)
+                next_pokemon = command_parts[3]
+                command_parts = command_parts[4:]
+                index_buffer = 0
+                while next_pokemon:
+                    species = next_pokemon
+                    moves = command_parts[3 - index_buffer].split(',')
+                    tera_type_and_next_pokemon = command_parts[10 - index_buffer] \
+                        .split(',')[-1] \
+                        .split(']')
+                    tera_type = tera_type_and_next_pokemon[0]
+                    next_pokemon = tera_type_and_next_pokemon[1] \
+                        if len(tera_type_and_next_pokemon) > 1 \
+                        else None
+                    command_parts = command_parts[12 - index_buffer:]
+                    index_buffer = 1
+                    pokemon = Pokemon(
+                        species=species,
+                        nickname=species.split('-')[0],
+                        tera_type=tera_type
+                    )
+                    for move in moves:
+                        pokemon.add_move(move_name=move)
+                    team = player1_team \
+                        if _is_player1(player_number) \
+                        else player2_team
+                    team.add_pokemon(pokemon)
+
+            case 'switch':
+                # |switch|p1a: nickname|Species, Level|CurrentHp\/TotalHp|
+                player_number = _resolve_player(command_parts)
+                nickname = _resolve_nickname(command_parts)
+                species = _resolve_species(command_parts).split('-Tera')[0]
+                team = player1_team \
+                    if _is_player1(player_number) \
+                    else player2_team
+                brought = player1_brought \
+                    if _is_player1(player_number) \
+                    else player2_brought
+                pokemon = team.find_by_species(species)
+                team.assign_nickname(pokemon, nickname)
+                brought[pokemon.species] = pokemon
+
+            case 'move':
+                # |move|p1a: nickname|move name|p2a: nickname|
+                player_number = _resolve_player(command_parts)
+                nickname = _resolve_nickname(command_parts)
+                team = player1_team if player_number == 'p1' else player2_team
+                move_name = command_parts[3]
+                pokemon = team.find_by_nickname(nickname)
+
+                move = pokemon.find_move(move_name)
+                if not move:
+                    move = pokemon.add_move(move_name)
+                move.increment_count()
+
+            case '-terastallize':
+                # |-terastallize|p1a: nickname|type|
+                player_number = _resolve_player(command_parts)
+                nickname = _resolve_nickname(command_parts)
+                team = player1_team \
+                    if _is_player1(player_number) \
+                    else player2_team
+                pokemon = team.find_by_nickname(nickname)
+                pokemon.was_terastallized = True
+
+            case 'win':
+                # |win|player|
+                winner_name = command_parts[2]
+                winner = int(winner_name == player2) + 1
+
+    player1_info = PlayerInfo(
+        player_name=player1,
+        team=player1_team,
+        is_winner=winner_name == player1
+    )
+
+    for player1_lead in _resolve_leads(player1_brought):
+        player1_team.find_by_species(player1_lead.species).was_lead = True
+
+    for player2_lead in _resolve_leads(player2_brought):
+        player2_team.find_by_species(player2_lead.species).was_lead = True
+
+    for p1_b in player1_brought:
+        player1_team.find_by_species(p1_b).was_brought = True
+
+    for p2_b in player2_brought:
+        player2_team.find_by_species(p2_b).was_brought = True
+
+    player2_info = PlayerInfo(
+        player_name=player2,
+        team=player2_team,
+        is_winner=winner_name == player2
+    )
+
+    return ShowdownReplay(player1_info=player1_info,
+                          player2_info=player2_info,
+                          winner=winner)
+
+
+def _time(functions, battle_log: str, repeat: int, rounds: int) -> list:
+    # Rounds alternate between the parsers and the best round of each is kept,
+    # which is the least disturbed by other processes.
+    best = [float('inf')] * len(functions)
+    for _ in range(rounds):
+        for i, function in enumerate(functions):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                function(battle_log)
+            best[i] = min(best[i], (time.perf_counter() - start) / repeat)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--turn-repeats', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=10)
+    args = parser.parse_args()
+
+    battle_logs = {
+        'fixture': showdown.ShowdownDownloadReplayRetrievalStrategy().retrieve_replay(_DEFAULT_REPLAY),
+        'long': build_long_battle_log(args.turn_repeats),
+    }
+    for name, battle_log in battle_logs.items():
+        if _split_every_line_parse_replay(battle_log) != showdown.parse_replay(battle_log):
+            raise RuntimeError(f'The parsers disagree on the {name} battle log')
+        split_seconds, dispatch_seconds = _time(
+            [_split_every_line_parse_replay, showdown.parse_replay],
+            battle_log,
+            args.repeat,
+            args.rounds
+        )
+        print(f'{name + ":":<9} {battle_log.count(chr(10)):5d} lines  '
+              f'{split_seconds * 1e6:8.0f} us split every line  '
+              f'{dispatch_seconds * 1e6:8.0f} us dispatch  '
+              f'{split_seconds / dispatch_seconds:5.2f}x')
+    speedup = split_seconds / dispatch_seconds
+    print(f'target:   {_TARGET_SPEEDUP:.2f}x on the long log, '
+          f'{"met" if speedup >= _TARGET_SPEEDUP else "not met"} with {speedup:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""Benchmark every stage of the analysis pipeline on synthetic replays.
+
+A corpus of downloaded-replay HTML files is generated with
+synthetic.BattleLogGenerator, then each stage of main.py is run over it on
+its own: walking the directory, resolving the retrieval strategies,
+extracting the battle logs, parsing them in full and summary mode,
+aggregating the usage and writing usage.csv, followed by analyze_directory
+end to end. The throughput and the peak memory allocated by Python are
+recorded for each stage, and can be saved as JSON to compare versions.
+
+Example usage:
+
+    python -m benchmarks.bench_pipeline --replays 100000 --out .out/bench-pipeline.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, List, Tuple
+
+import main
+from showdown_replay_analyzer import aggregate, showdown, synthetic
+
+
+def _measure(function: Callable[[], object], memory: bool) -> Tuple[float, int, object]:
+    # The stage is timed without tracemalloc, which slows allocations down,
+    # and run again under it for the peak memory.
+    start = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - start
+    peak = None
+    if memory:
+        tracemalloc.start()
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return seconds, peak, result
+
+
+def _write_corpus(directory: str, battle_logs: List[str], seed: int) -> List[str]:
+    paths = []
+    for index, battle_log in enumerate(battle_logs):
+        path = os.path.join(directory, f'synthetic-{seed}-{index}.html')
+        with open(path, 'w', encoding='utf-8') as replay_file:
+            replay_file.write(synthetic.wrap_html(battle_log, replay_id=f'synthetic-{seed}-{index}'))
+        paths.append(path)
+    return paths
+
+
+def _aggregate(replays: List[showdown.ShowdownReplay]) -> aggregate.UsageAggregate:
+    statistics = aggregate.UsageAggregate()
+    for replay in replays:
+        main._add_players(statistics, replay.player1_info, replay.player2_info)  # pylint: disable=protected-access
+    return statistics
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--replays', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes of the end to end analyze_directory stage')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='Skip measuring peak memory, which runs every stage twice')
+    parser.add_argument('--out', help='Also save the results to this JSON file')
+    args = parser.parse_args()
+
+    memory = not args.no_memory
+    generator = synthetic.BattleLogGenerator(seed=args.seed)
+    factory = showdown.ShowdownReplayRetrievalStrategyFactory()
+    stages = []
+
+    def record(stage: str, function: Callable[[], object], items: int = args.replays, size: int = None):
+        seconds, peak, result = _measure(function, memory)
+        stages.append({
+            'stage': stage,
+            'items': items,
+            'seconds': seconds,
+            'items_per_second': items / seconds if seconds else None,
+            'megabytes_per_second': size / seconds / 1e6 if size and seconds else None,
+            'peak_memory_bytes': peak,
+        })
+        return result
+
+    with tempfile.TemporaryDirectory() as directory:
+        battle_logs = record('generate', lambda: list(generator.battle_logs(args.replays)))
+        log_size = sum(len(battle_log.encode('utf-8')) for battle_log in battle_logs)
+        paths = record('write html', lambda: _write_corpus(directory, battle_logs, args.seed), size=log_size)
+        html_size = sum(os.path.getsize(path) for path in paths)
+        locations = record('walk', lambda: main._find_replays(directory))  # pylint: disable=protected-access
+        strategies = record('resolve strategy', lambda: [factory.resolve_strategy(location) for location in locations])
+        extracted = record(
+            'extract',
+            lambda: [strategy.retrieve_replay(location) for strategy, location in zip(strategies, locations)],
+            size=html_size
+        )
+        replays = record('parse full', lambda: [showdown.parse_replay(log) for log in extracted], size=log_size)
+        record('parse summary', lambda: [showdown.parse_replay(log, 'summary') for log in extracted], size=log_size)
+        rows = record('aggregate', lambda: _aggregate(replays)).rows
+        record(
+            'write csv',
+            lambda: main._write_usage_csv(rows, io.StringIO()),  # pylint: disable=protected-access
+            items=len(rows)
+        )
+        record('analyze directory', lambda: main.analyze_directory(directory, workers=args.workers))
+
+    print(f'replays: {args.replays}, battle logs: {log_size / 1e6:.1f} MB, html: {html_size / 1e6:.1f} MB')
+    print(f'{"stage":<18} {"items":>9} {"seconds":>9} {"items/s":>11} {"MB/s":>8} {"peak MiB":>9}')
+    for stage in stages:
+        megabytes_per_second = stage['megabytes_per_second']
+        peak = stage['peak_memory_bytes']
+        print(f'{stage["stage"]:<18} {stage["items"]:9d} {stage["seconds"]:9.3f} '
+              f'{stage["items_per_second"] or 0:11.0f} '
+              f'{f"{megabytes_per_second:8.1f}" if megabytes_per_second else "":>8} '
+              f'{f"{peak / 2 ** 20:9.1f}" if peak is not None else "":>9}')
+
+    if args.out:
+        results = {
+            'replays': args.replays,
+            'seed': args.seed,
+            'workers': args.workers,
+            'python': platform.python_version(),
+            'battle_log_bytes': log_size,
+            'html_bytes': html_size,
+            'stages': stages,
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, 'w', encoding='utf-8') as out_file:
+            json.dump(results, out_file, indent=2)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,50 @@
+"""Benchmark loading parsed replays from binary records instead of re-parsing.
+
+Example usage:
+
+    python -m benchmarks.bench_serialization
+"""
+import argparse
+import tempfile
+import time
+
+from showdown_replay_analyzer import serialization, showdown
+
+from .bench_extraction import _DEFAULT_REPLAY
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    battle_log = showdown.ShowdownDownloadReplayRetrievalStrategy().retrieve_replay(_DEFAULT_REPLAY)
+    record = serialization.encode_replay(showdown.parse_replay(battle_log))
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        showdown.parse_replay(battle_log)
+    parse_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        serialization.decode_replay(record)
+    decode_seconds = time.perf_counter() - start
+
+    battle_logs = [f'{battle_log}|t:|{i}\n' for i in range(args.repeat)]
+    with tempfile.TemporaryDirectory() as directory:
+        with serialization.ParsedReplayCache(f'{directory}/cache.sqlite3') as parsed_cache:
+            parsed_cache.parse_replays(battle_logs)
+            start = time.perf_counter()
+            parsed_cache.parse_replays(battle_logs)
+            bulk_seconds = time.perf_counter() - start
+
+    print(f'record size:  {len(record):10d} bytes ({len(battle_log)} byte battle log)')
+    print(f'parse:        {args.repeat / parse_seconds:10.1f} replays/s')
+    print(f'decode:       {args.repeat / decode_seconds:10.1f} replays/s')
+    print(f'bulk load:    {args.repeat / bulk_seconds:10.1f} replays/s (hash, query and decode)')
+    print(f'speedup:      {parse_seconds / decode_seconds:10.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Benchmark filtered queries against a ReplayStore.
+
+Random replays between teams drawn from hundreds of species and a thousand
+players are stored, with Tera types, terastallization and moves. Each query
+is timed against scanning the parsed replays in Python, which is the least
+that answering it without the store costs.
+
+Example usage:
+
+    python -m benchmarks.bench_store --replays 100000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from showdown_replay_analyzer import dex, pokemon, showdown, store
+
+from .bench_cores import _random_teams
+
+
+def _random_replays(count: int, species_count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    types = dex.default_dex().types.names
+    moves = dex.default_dex().moves.names[:400]
+    player_infos = _random_teams(2 * count, species_count, seed)
+    for player_info in player_infos:
+        player_info.player_name = f'player{rng.randrange(1000)}'
+        terastallized = rng.choice([p for p in player_info.team.pokemon if p.was_brought])
+        for p in player_info.team.pokemon:
+            p.tera_type = rng.choice(types)
+            p.was_terastallized = p is terastallized
+            p.moves = [pokemon.Move(name, rng.randrange(4)) for name in rng.sample(moves, 4)]
+    replays = []
+    for i in range(count):
+        player1_info, player2_info = player_infos[2 * i:2 * i + 2]
+        player2_info.is_winner = not player1_info.is_winner
+        replays.append((f'replay{i}', showdown.ShowdownReplay(
+            player1_info, player2_info, 1 if player1_info.is_winner else 2
+        )))
+    return replays
+
+
+def _scan(replays: list, species: str, opponent: str) -> int:
+    count = 0
+    for _, replay in replays:
+        players = (replay.player1_info, replay.player2_info)
+        for side, player_info in enumerate(players):
+            if players[1 - side].player_name != opponent:
+                continue
+            if any(p.species == species and p.was_brought and p.was_terastallized
+                   for p in player_info.team.pokemon):
+                count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--replays', type=int, default=100000)
+    parser.add_argument('--species', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    replays = _random_replays(args.replays, args.species, args.seed)
+    # The Pokemon player 1 of the first replay terastallized, from the point of view of player 2.
+    first_replay = replays[0][1]
+    species = next(p.species for p in first_replay.player1_info.team.pokemon if p.was_terastallized)
+    opponent = first_replay.player2_info.player_name
+
+    with tempfile.TemporaryDirectory() as directory:
+        with store.ReplayStore(os.path.join(directory, 'replays.sqlite3')) as replay_store:
+            start = time.perf_counter()
+            replay_store.add_replays(replays)
+            ingested = time.perf_counter() - start
+            print(f'replays: {args.replays}, ingest {ingested:6.2f} s, '
+                  f'{args.replays / ingested:8.0f} replays/s')
+
+            queries = [
+                ('species', {'species': species}),
+                ('species, brought, terastallized', {'species': species, 'brought': True, 'terastallized': True}),
+                ('tera type, won', {'tera_type': 'Fairy', 'terastallized': True, 'won': True}),
+                ('player', {'player': opponent}),
+                ('species, terastallized, opponent',
+                 {'species': species, 'brought': True, 'terastallized': True, 'opponent': opponent}),
+            ]
+            for name, filters in queries:
+                start = time.perf_counter()
+                games, wins = replay_store.count(**filters)
+                counted = time.perf_counter() - start
+                start = time.perf_counter()
+                found = replay_store.find(**filters)
+                listed = time.perf_counter() - start
+                if len(found) != games:
+                    raise RuntimeError('find disagrees with count')
+                print(f'{name}: {games} sides, {wins} won, count {counted * 1000:7.2f} ms, '
+                      f'find {listed * 1000:7.2f} ms')
+
+            start = time.perf_counter()
+            expected = _scan(replays, species, opponent)
+            scanned = time.perf_counter() - start
+            start = time.perf_counter()
+            games, _ = replay_store.count(species=species, brought=True, terastallized=True, opponent=opponent)
+            counted = time.perf_counter() - start
+            if games != expected:
+                raise RuntimeError('ReplayStore disagrees with scanning the replays')
+            print(f'opponent query: scanning replays {scanned * 1000:7.2f} ms, '
+                  f'ReplayStore {counted * 1000:7.2f} ms, {scanned / counted:6.0f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark Team lookups on a long best-of-3 battle log.
+
+The turns of the fixture replay are repeated to build a long log, then the
+nickname and species lookups made while parsing it are timed against the
+previous linear scans.
+
+Example usage:
+
+    python -m benchmarks.bench_team_lookup --turn-repeats 50
+"""
+import argparse
+import time
+
+from showdown_replay_analyzer import pokemon, showdown
+
+from .bench_extraction import _DEFAULT_REPLAY
+
+
+def _linear_find_by_nickname(team: pokemon.Team, nickname: str) -> pokemon.Pokemon:
+    return next(
+        (p for p in team.pokemon if nickname == p.nickname.split('-Tera')[0]),
+        None
+    )
+
+
+def _linear_find_by_species(team: pokemon.Team, species: str) -> pokemon.Pokemon:
+    return next(
+        (p for p in team.pokemon if p.species in (species or p.species.split('-')[0])),
+        None
+    )
+
+
+def build_long_battle_log(turn_repeats: int) -> str:
+    """Repeats the turns of the fixture replay between its start and win lines."""
+    battle_log = showdown.ShowdownDownloadReplayRetrievalStrategy().retrieve_replay(_DEFAULT_REPLAY)
+    start = battle_log.index('|start\n') + len('|start\n')
+    end = battle_log.index('|win|')
+    return battle_log[:start] + battle_log[start:end] * turn_repeats + battle_log[end:]
+
+
+def _lookups(battle_log: str, team: pokemon.Team, player: str):
+    nicknames = []
+    species = []
+    for line in battle_log.split('\n'):
+        command_parts = line.split('|')
+        if len(command_parts) < 4 or not command_parts[2].startswith(player):
+            continue
+        if command_parts[1] in ('move', '-terastallize'):
+            nicknames.append(command_parts[2][5:])
+        elif command_parts[1] == 'switch':
+            species.append(command_parts[3].split(',')[0].split('-Tera')[0])
+    return nicknames, species
+
+
+def _time(function, team, keys) -> float:
+    start = time.perf_counter()
+    for key in keys:
+        function(team, key)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--turn-repeats', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    battle_log = build_long_battle_log(args.turn_repeats)
+    replay = showdown.parse_replay(battle_log)
+    team = replay.player1_info.team
+    nicknames, species = _lookups(battle_log, team, 'p1')
+    nicknames *= args.repeat
+    species *= args.repeat
+
+    linear_nickname = _time(_linear_find_by_nickname, team, nicknames)
+    indexed_nickname = _time(pokemon.Team.find_by_nickname, team, nicknames)
+    linear_species = _time(_linear_find_by_species, team, species)
+    indexed_species = _time(pokemon.Team.find_by_species, team, species)
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        showdown.parse_replay(battle_log)
+    parse_seconds = (time.perf_counter() - start) / args.repeat
+
+    print(f'battle log:           {battle_log.count(chr(10))} lines')
+    print(f'find_by_nickname:     {linear_nickname / len(nicknames) * 1e9:8.0f} ns linear  '
+          f'{indexed_nickname / len(nicknames) * 1e9:8.0f} ns indexed')
+    print(f'find_by_species:      {linear_species / len(species) * 1e9:8.0f} ns linear  '
+          f'{indexed_species / len(species) * 1e9:8.0f} ns indexed')
+    print(f'parse_replay:         {parse_seconds * 1e3:8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
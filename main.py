@@ -1,122 +1,619 @@
-import collections
+import argparse
+import concurrent.futures
+import functools
+import hashlib
 import io
 import itertools
 import json
+import math
 import os
 import pathlib
+import sys
+import time
+from typing import Callable, Iterator, List, Optional, Tuple, TypeVar, Union
 
-from showdown_replay_analyzer import showdown
+from showdown_replay_analyzer import aggregate, cache, dex, filters, instrumentation, serialization, showdown, store
 
+_CACHE_PATH = '.out/replay-cache.sqlite3'
+_CACHE_MAX_SIZE = 1024 * 1024 * 1024
+_CACHE_PARSED_REPLAYS = True
 _IGNORED_POKEMON = []
 _IGNORED_USERS = []
 _REPLAYS_DIR = '/Users/dillonodonovan/Downloads/replays/2024-04-22-shadow-rider'
+_STATE_PATH = '.out/manifest.json'
+_STATE_VERSION = 2
 _USERNAMES = ['ironpumpernickel']
+# Each worker is given several contiguous chunks of files to balance uneven file sizes.
+_CHUNKS_PER_WORKER = 4
 
+T = TypeVar('T')
 
-def _generate_pokemon_statistics(
-        player_usage: dict,
-        player_info: showdown.PlayerInfo,
-        c: itertools.count,
-        out_csv: io.TextIOWrapper
-):
+
+def _append_rows(rows: List[str], player_info: showdown.PlayerInfo) -> None:
     for pokemon in player_info.team.pokemon:
-        if pokemon.species not in player_usage:
-            player_usage[pokemon.species] = {
-                'lead': 0,
-                'brought': 0,
-                'moves': collections.Counter(),
-                'wins': 0,
-                'tera': {}
+        rows.append(f'{player_info.player_name},{pokemon},{
+            player_info.is_winner and pokemon.was_brought}')
+
+
+def _add_players(
+        statistics: aggregate.UsageAggregate,
+        user_info: showdown.PlayerInfo,
+        opponent_info: showdown.PlayerInfo
+) -> None:
+    statistics.add(user_info, opponent_info)
+    _append_rows(statistics.rows, user_info)
+    _append_rows(statistics.rows, opponent_info)
+
+
+def _find_replays(path: str) -> List[str]:
+    start = time.perf_counter_ns()
+    locations = [
+        os.path.join(root, file)
+        for root, dirs, files in os.walk(os.path.abspath(path))
+        for file in files
+    ]
+    instrumentation.current().add_time('walk', time.perf_counter_ns() - start, len(locations))
+    return locations
+
+
+def _select_players(
+        locations: List[str],
+        cache_path: str = None,
+        mode: str = 'full'
+) -> Iterator[Optional[Tuple[showdown.PlayerInfo, showdown.PlayerInfo]]]:
+    # Yields the user's and the opponent's information of every replay in
+    # order, or None for a replay that is ignored.
+    factory = showdown.ShowdownReplayRetrievalStrategyFactory()
+    replay_cache = cache.ReplayCache(cache_path, max_size=_CACHE_MAX_SIZE) \
+        if cache_path \
+        else None
+    parsed_cache = serialization.ParsedReplayCache(
+        cache_path,
+        max_size=_CACHE_MAX_SIZE
+    ) if cache_path and _CACHE_PARSED_REPLAYS else None
+    # Replays of ignored users are rejected while they are parsed, before
+    # their battles. Ignored Pokemon are only checked on the user's team once
+    # the user is known, which is Player 2 unless Player 1 is a username.
+    replay_filter = filters.player_not_in(*_IGNORED_USERS)
+    profile = instrumentation.current()
+
+    try:
+        for location in locations:
+            profile.count('replays')
+            with profile.stage('resolve strategy'):
+                strategy = factory.resolve_strategy(
+                    location,
+                    cache=replay_cache
+                )
+            with profile.stage('retrieve'):
+                try:
+                    battle_log = strategy.retrieve_replay(location)
+                finally:
+                    strategy.close()
+            with profile.stage('parse'):
+                replay = parsed_cache.parse_replay(battle_log, mode, replay_filter) \
+                    if parsed_cache is not None \
+                    else showdown.parse_replay(battle_log, mode, replay_filter=replay_filter)
+            if replay is None:
+                profile.count('replays.rejected')
+                yield None
+                continue
+
+            user_info: showdown.PlayerInfo
+            opponent_info: showdown.PlayerInfo
+
+            if replay.player1_info.player_name in _USERNAMES:
+                user_info = replay.player1_info
+                opponent_info = replay.player2_info
+            else:
+                opponent_info = replay.player1_info
+                user_info = replay.player2_info
+
+            if any(p.species in _IGNORED_POKEMON for p in user_info.team.pokemon):
+                profile.count('replays.rejected')
+                yield None
+                continue
+
+            yield user_info, opponent_info
+    finally:
+        if replay_cache is not None:
+            replay_cache.close()
+        if parsed_cache is not None:
+            parsed_cache.close()
+
+
+def _analyze_each(
+        locations: List[str],
+        cache_path: str = None,
+        mode: str = 'full'
+) -> List[aggregate.UsageAggregate]:
+    file_statistics = []
+    profile = instrumentation.current()
+    # The statistics of every replay share one dex, which is only pickled
+    # once with the list.
+    local_dex = dex.default_dex().copy()
+    for players in _select_players(locations, cache_path, mode):
+        statistics = aggregate.UsageAggregate(dex=local_dex)
+        file_statistics.append(statistics)
+        if players is None:
+            continue
+        with profile.stage('aggregate'):
+            _add_players(statistics, *players)
+    return file_statistics
+
+
+def _analyze_files(
+        locations: List[str],
+        cache_path: str = None,
+        mode: str = 'full'
+) -> aggregate.UsageAggregate:
+    statistics = aggregate.UsageAggregate()
+    profile = instrumentation.current()
+    for players in _select_players(locations, cache_path, mode):
+        if players is None:
+            continue
+        with profile.stage('aggregate'):
+            _add_players(statistics, *players)
+    return statistics
+
+
+def _profiled(function: Callable[..., T], *args) -> Tuple[T, instrumentation.Profile]:
+    # Runs a function in a worker process with a profile of its own, which is
+    # returned with the result to be merged into the profile of the parent.
+    with instrumentation.profiling() as profile:
+        return function(*args), profile
+
+
+def _map_chunks(
+        function: Callable[[List[str], str], T],
+        locations: List[str],
+        workers: int,
+        cache_path: str
+) -> Iterator[T]:
+    # Yields the results of contiguous chunks of locations in order.
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(locations) <= 1:
+        yield function(locations, cache_path)
+        return
+
+    chunk_size = math.ceil(len(locations) / (workers * _CHUNKS_PER_WORKER))
+    chunks = [
+        locations[i:i + chunk_size]
+        for i in range(0, len(locations), chunk_size)
+    ]
+    profile = instrumentation.current()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        if not profile.enabled:
+            yield from executor.map(
+                function,
+                chunks,
+                [cache_path] * len(chunks)
+            )
+            return
+        for result, worker_profile in executor.map(
+                functools.partial(_profiled, function),
+                chunks,
+                [cache_path] * len(chunks)):
+            profile.merge(worker_profile)
+            yield result
+
+
+def analyze_directory(
+        path: str,
+        workers: int = None,
+        cache_path: str = None,
+        mode: str = 'full'
+) -> aggregate.UsageAggregate:
+    """Analyzes every replay in a directory.
+
+    Replays are split into contiguous chunks in os.walk order, analyzed by a
+    pool of processes and merged in the same order, so the result is identical
+    to analyzing every replay serially.
+
+    Arguments:
+        path: The directory of replays.
+        workers: The number of worker processes. Defaults to the number of CPUs.
+            With a single worker the replays are analyzed in this process.
+        cache_path: The location of the replay cache, or None to disable caching.
+        mode: full, or summary to skip counting move uses. See showdown.parse_replay.
+
+    Returns:
+        The usage statistics of the replays.
+    """
+    statistics = aggregate.UsageAggregate()
+    analyze_files = functools.partial(_analyze_files, mode=mode)
+    profile = instrumentation.current()
+    for partial in _map_chunks(analyze_files, _find_replays(path), workers, cache_path):
+        with profile.stage('merge'):
+            statistics.merge(partial)
+    return statistics
+
+
+def analyze_directory_incremental(
+        path: str,
+        state_path: str,
+        workers: int = None,
+        cache_path: str = None,
+        mode: str = 'full'
+) -> aggregate.UsageAggregate:
+    """Analyzes the replays in a directory that changed since the previous analysis.
+
+    The state file records the size, modification time, content hash and
+    contribution of every analyzed replay, together with the aggregated usage.
+    Only new and modified replays are analyzed and added to the aggregated
+    usage; the contributions of modified and deleted replays are subtracted.
+    Usage counts and usage.csv rows are identical to a full analysis, but
+    species first seen in a later run are ordered after existing species.
+
+    The state is rebuilt from scratch if it was created for another directory,
+    parser version, parse mode or configuration.
+
+    Arguments:
+        path: The directory of replays.
+        state_path: The location of the state file.
+        workers: The number of worker processes. Defaults to the number of CPUs.
+        cache_path: The location of the replay cache, or None to disable caching.
+        mode: full, or summary to skip counting move uses. See showdown.parse_replay.
+
+    Returns:
+        The usage statistics of every replay in the directory.
+    """
+    profile = instrumentation.current()
+    with profile.stage('load state'):
+        state = _load_state(state_path, path, mode)
+        files: dict = state['files']
+        aggregate_state = _AggregateState(state)
+
+    locations = _find_replays(path)
+    changed = []
+    detect_start = time.perf_counter_ns()
+    for location in locations:
+        stat = os.stat(location)
+        record = files.get(location)
+        if record and record['size'] == stat.st_size and record['mtime_ns'] == stat.st_mtime_ns:
+            continue
+        digest = _hash_file(location)
+        if record and record['hash'] == digest:
+            record['size'] = stat.st_size
+            record['mtime_ns'] = stat.st_mtime_ns
+            continue
+        if record:
+            aggregate_state.subtract(_statistics_from_record(record, aggregate_state.statistics.dex))
+        files[location] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'hash': digest
+        }
+        changed.append(location)
+
+    for location in set(files) - set(locations):
+        aggregate_state.subtract(_statistics_from_record(files.pop(location), aggregate_state.statistics.dex))
+    profile.add_time('detect changes', time.perf_counter_ns() - detect_start, len(locations))
+    profile.count('replays.unchanged', len(locations) - len(changed))
+
+    analyzed = itertools.chain.from_iterable(
+        _map_chunks(functools.partial(_analyze_each, mode=mode), changed, workers, cache_path)
+    )
+    for location, file_statistics in zip(changed, analyzed):
+        with profile.stage('merge'):
+            aggregate_state.add(file_statistics)
+            files[location].update(_statistics_to_record(file_statistics))
+
+    with profile.stage('save state'):
+        state['files'] = {location: files[location] for location in locations}
+        aggregate_state.save(state)
+        _save_state(state_path, state)
+
+    statistics = aggregate_state.statistics
+    statistics.rows = [
+        row
+        for location in locations
+        for row in files[location]['rows']
+    ]
+    return statistics
+
+
+class _AggregateState:
+    # Aggregated usage plus how many analyzed replays each species and move
+    # appears in, so entries can be removed once no replay contributes to them.
+    # Both are keyed by the IDs of the dex of statistics, and by name in the
+    # state file.
+
+    def __init__(self, state: dict):
+        self.statistics = aggregate.UsageAggregate()
+        local_dex = self.statistics.dex
+        self.statistics.user_usage = self.statistics.usage_from_names(_usage_from_json(state['user_usage']))
+        self.statistics.opponent_usage = self.statistics.usage_from_names(
+            _usage_from_json(state['opponent_usage'])
+        )
+        self.user_seen = _seen_from_json(state['user_seen'], local_dex)
+        self.opponent_seen = _seen_from_json(state['opponent_seen'], local_dex)
+
+    def add(self, statistics: aggregate.UsageAggregate) -> None:
+        user_usage = self.statistics.translate_usage(statistics.user_usage, statistics.dex)
+        opponent_usage = self.statistics.translate_usage(statistics.opponent_usage, statistics.dex)
+        aggregate.merge_usage(self.statistics.user_usage, user_usage)
+        aggregate.merge_usage(self.statistics.opponent_usage, opponent_usage)
+        _count_seen(self.user_seen, user_usage, 1)
+        _count_seen(self.opponent_seen, opponent_usage, 1)
+
+    def subtract(self, statistics: aggregate.UsageAggregate) -> None:
+        user_usage = self.statistics.translate_usage(statistics.user_usage, statistics.dex)
+        opponent_usage = self.statistics.translate_usage(statistics.opponent_usage, statistics.dex)
+        _subtract_usage(self.statistics.user_usage, user_usage)
+        _subtract_usage(self.statistics.opponent_usage, opponent_usage)
+        _count_seen(self.user_seen, user_usage, -1)
+        _count_seen(self.opponent_seen, opponent_usage, -1)
+        _prune_usage(self.statistics.user_usage, self.user_seen)
+        _prune_usage(self.statistics.opponent_usage, self.opponent_seen)
+
+    def save(self, state: dict) -> None:
+        local_dex = self.statistics.dex
+        state['user_usage'] = _usage_to_json(self.statistics.usage_by_name(self.statistics.user_usage))
+        state['opponent_usage'] = _usage_to_json(self.statistics.usage_by_name(self.statistics.opponent_usage))
+        state['user_seen'] = _seen_to_json(self.user_seen, local_dex)
+        state['opponent_seen'] = _seen_to_json(self.opponent_seen, local_dex)
+
+
+def _subtract_usage(player_usage: dict, other_usage: dict) -> None:
+    for species, other in other_usage.items():
+        if species == 'total':
+            player_usage['total'] -= other
+            continue
+        pokemon_usage = player_usage[species]
+        pokemon_usage['lead'] -= other['lead']
+        pokemon_usage['brought'] -= other['brought']
+        pokemon_usage['wins'] -= other['wins']
+        for move_name, times_used in other['moves'].items():
+            pokemon_usage['moves'][move_name] -= times_used
+        for tera_type, tera in other['tera'].items():
+            pokemon_usage['tera'][tera_type]['used'] -= tera['used']
+            pokemon_usage['tera'][tera_type]['wins'] -= tera['wins']
+            if not pokemon_usage['tera'][tera_type]['used']:
+                del pokemon_usage['tera'][tera_type]
+
+
+def _count_seen(seen: dict, player_usage: dict, delta: int) -> None:
+    for species, pokemon_usage in player_usage.items():
+        if species == 'total':
+            continue
+        species_seen = seen.setdefault(species, {'replays': 0, 'moves': {}})
+        species_seen['replays'] += delta
+        for move_name in pokemon_usage['moves']:
+            species_seen['moves'][move_name] = species_seen['moves'].get(move_name, 0) + delta
+
+
+def _prune_usage(player_usage: dict, seen: dict) -> None:
+    for species in list(seen):
+        species_seen = seen[species]
+        if not species_seen['replays']:
+            del seen[species]
+            del player_usage[species]
+            continue
+        for move_name in list(species_seen['moves']):
+            if not species_seen['moves'][move_name]:
+                del species_seen['moves'][move_name]
+                del player_usage[species]['moves'][move_name]
+
+
+def _seen_to_json(seen: dict, local_dex: dex.Dex) -> dict:
+    return {
+        local_dex.species.name(species_id): {
+            'replays': species_seen['replays'],
+            'moves': {
+                local_dex.moves.name(move_id): count
+                for move_id, count in species_seen['moves'].items()
+            }
+        }
+        for species_id, species_seen in seen.items()
+    }
+
+
+def _seen_from_json(seen: dict, local_dex: dex.Dex) -> dict:
+    return {
+        local_dex.species.id(species): {
+            'replays': species_seen['replays'],
+            'moves': {
+                local_dex.moves.id(move_name): count
+                for move_name, count in species_seen['moves'].items()
             }
-        pokemon_usage = player_usage[pokemon.species]
-        if pokemon.was_lead:
-            pokemon_usage['lead'] += 1
-        if pokemon.was_brought:
-            pokemon_usage['brought'] += 1
-            if player_info.is_winner:
-                pokemon_usage['wins'] += 1
-        for move in pokemon.moves:
-            pokemon_usage['moves'][move.name] += move.times_used
-        if pokemon.was_terastallized:
-            if pokemon.tera_type not in pokemon_usage['tera']:
-                pokemon_usage['tera'][pokemon.tera_type] = {
-                    'used': 0,
-                    'wins': 0
-                }
-            pokemon_usage['tera'][pokemon.tera_type]['used'] += 1
-            if player_info.is_winner:
-                pokemon_usage['tera'][pokemon.tera_type]['wins'] += 1
-
-        out_csv.write(f'{next(c)},{player_info.player_name},{pokemon},{
-            player_info.is_winner and pokemon.was_brought}\n')
+        }
+        for species, species_seen in seen.items()
+    }
 
 
-if __name__ == '__main__':
-    flat = []
-    user_usage = {
-        'total': 0
+def _hash_file(location: str) -> str:
+    with open(location, 'rb') as f:
+        return hashlib.blake2b(f.read(), digest_size=20).hexdigest()
+
+
+def _state_config(path: str, mode: str) -> dict:
+    return {
+        'replays_dir': os.path.abspath(path),
+        'parser_version': showdown.PARSER_VERSION,
+        'parse_mode': mode,
+        'ignored_pokemon': list(_IGNORED_POKEMON),
+        'ignored_users': list(_IGNORED_USERS),
+        'usernames': list(_USERNAMES),
     }
-    opponent_usage = {
-        'total': 0
+
+
+def _new_state(path: str, mode: str) -> dict:
+    return {
+        'version': _STATE_VERSION,
+        'config': _state_config(path, mode),
+        'files': {},
+        'user_usage': _usage_to_json({'total': 0}),
+        'opponent_usage': _usage_to_json({'total': 0}),
+        'user_seen': {},
+        'opponent_seen': {},
     }
-    factory = showdown.ShowdownReplayRetrievalStrategyFactory()
 
-    counter = itertools.count(1)
-
-    with open('.out/usage.csv', 'w', encoding='utf-8') as usage_csv:
-        for root, dirs, files in os.walk(os.path.abspath(_REPLAYS_DIR)):
-            for file in files:
-                location = os.path.join(root, file)
-                strategy = factory.resolve_strategy(location)
-                battle_log = strategy.retrieve_replay(location)
-                replay = showdown.parse_replay(battle_log)
-                winner_name = replay.player1_info.player_name \
-                    if replay.winner == 1 \
-                    else replay.player2_info.player_name
-
-                if replay.player1_info.player_name in _IGNORED_USERS \
-                        or replay.player2_info.player_name in _IGNORED_USERS:
-                    continue
-
-                user_info: showdown.PlayerInfo
-                opponent_info: showdown.PlayerInfo
-
-                if replay.player1_info.player_name in _USERNAMES:
-                    user_info = replay.player1_info
-                    opponent_info = replay.player2_info
-                else:
-                    opponent_info = replay.player1_info
-                    user_info = replay.player2_info
-
-                should_continue = False
-                for p in user_info.team.pokemon:
-                    if p.species in _IGNORED_POKEMON:
-                        should_continue = True
-                        break
-                if should_continue:
-                    continue
-
-                user_usage['total'] += 1
-                opponent_usage['total'] += 1
-
-                _generate_pokemon_statistics(
-                    user_usage,
-                    user_info,
-                    counter,
-                    usage_csv
-                )
 
-                _generate_pokemon_statistics(
-                    opponent_usage,
-                    opponent_info,
-                    counter,
-                    usage_csv
+def _load_state(state_path: str, path: str, mode: str) -> dict:
+    state_file = pathlib.Path(state_path)
+    if not state_file.is_file():
+        return _new_state(path, mode)
+    state = json.loads(state_file.read_text(encoding='utf-8'))
+    if state.get('version') != _STATE_VERSION or state.get('config') != _state_config(path, mode):
+        return _new_state(path, mode)
+    return state
+
+
+def _save_state(state_path: str, state: dict) -> None:
+    state_file = pathlib.Path(state_path)
+    state_file.parent.mkdir(parents=True, exist_ok=True)
+    temporary_file = state_file.with_suffix(f'{state_file.suffix}.tmp')
+    temporary_file.write_text(json.dumps(state), encoding='utf-8')
+    temporary_file.replace(state_file)
+
+
+def _usage_to_json(player_usage: dict) -> dict:
+    # Usage is stored in the layout of shard files, which keeps the unknown
+    # Tera type None apart from a type named 'null'.
+    return aggregate._usage_to_record(player_usage)  # pylint: disable=protected-access
+
+
+def _usage_from_json(record: dict) -> dict:
+    return aggregate._usage_from_record(record)  # pylint: disable=protected-access
+
+
+def _statistics_to_record(statistics: aggregate.UsageAggregate) -> dict:
+    return {
+        'user_usage': _usage_to_json(statistics.usage_by_name(statistics.user_usage)),
+        'opponent_usage': _usage_to_json(statistics.usage_by_name(statistics.opponent_usage)),
+        'rows': statistics.rows,
+    }
+
+
+def _statistics_from_record(record: dict, local_dex: dex.Dex) -> aggregate.UsageAggregate:
+    statistics = aggregate.UsageAggregate(rows=record['rows'], dex=local_dex)
+    statistics.user_usage = statistics.usage_from_names(_usage_from_json(record['user_usage']))
+    statistics.opponent_usage = statistics.usage_from_names(_usage_from_json(record['opponent_usage']))
+    return statistics
+
+
+def _write_usage_csv(rows: List[str], out_csv: io.TextIOWrapper) -> None:
+    for i, row in enumerate(rows, start=1):
+        out_csv.write(f'{i},{row}\n')
+
+
+def merge_shards(paths: List[str]) -> Union[aggregate.UsageAggregate, aggregate.PokepasteAggregate]:
+    """Merges shard files saved by separate runs, in the given order.
+
+    Arguments:
+        paths: The locations of the shard files, all of the same kind.
+
+    Returns:
+        The merged statistics.
+
+    Raises:
+        ValueError: If a file is not a shard file or the shards are of different kinds.
+    """
+    merged = None
+    for path in paths:
+        shard = aggregate.load_aggregate(path)
+        if merged is None:
+            merged = shard
+        elif type(shard) is not type(merged):
+            raise ValueError(f'Cannot merge {path} with shards of another kind')
+        else:
+            merged.merge(shard)
+    return merged
+
+
+def _write_outputs(statistics: aggregate.UsageAggregate) -> None:
+    profile = instrumentation.current()
+    usage_file = pathlib.Path('.out/usage.csv')
+    usage_file.parent.mkdir(parents=True, exist_ok=True)
+    with profile.stage('write csv', len(statistics.rows)), \
+            open(usage_file, 'w', encoding='utf-8') as usage_csv:
+        _write_usage_csv(statistics.rows, usage_csv)
+
+    with profile.stage('write json', 2):
+        player_file = pathlib.Path('.out/player-usage.json')
+        player_file.parent.mkdir(parents=True, exist_ok=True)
+        player_file.write_text(json.dumps(statistics.usage_by_name(statistics.user_usage)), encoding='utf-8')
+
+        opponent_file = pathlib.Path('.out/opponent-usage.json')
+        opponent_file.parent.mkdir(parents=True, exist_ok=True)
+        opponent_file.write_text(json.dumps(statistics.usage_by_name(statistics.opponent_usage)), encoding='utf-8')
+
+
+def _merge_main(argv: List[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog='main.py merge',
+        description='Merges the shard files saved with --shard-out by separate runs'
+    )
+    parser.add_argument('shards', nargs='+', help='Shard files, merged in this order')
+    parser.add_argument('--shard-out', help='Also save the merged statistics to this shard file')
+    args = parser.parse_args(argv)
+
+    merged = merge_shards(args.shards)
+    if isinstance(merged, aggregate.PokepasteAggregate):
+        print(merged.to_json())
+    else:
+        _write_outputs(merged)
+    if args.shard_out:
+        merged.save(args.shard_out)
+
+
+def _analyze_main(argv: List[str]) -> None:
+    parser = argparse.ArgumentParser(epilog='Run "main.py merge -h" to merge shard files instead.')
+    parser.add_argument('replays_dir', nargs='?', default=_REPLAYS_DIR)
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of worker processes (default: number of CPUs)')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Analyze every replay instead of only new or modified replays')
+    parser.add_argument('--no-move-stats', action='store_true',
+                        help='Skip counting move uses, which parses replays in summary mode')
+    parser.add_argument('--shard-out',
+                        help='Also save the statistics to this shard file, to merge with other runs')
+    parser.add_argument('--store',
+                        help='Also store the parsed replays in this SQLite database for querying. '
+                             'Replays already in it are skipped')
+    parser.add_argument('--profile', action='store_true',
+                        help='Print the time spent in each stage and the parser command counts')
+    parser.add_argument('--profile-out',
+                        help='Also save the profile to this JSON file, to compare runs')
+    args = parser.parse_args(argv)
+
+    profile = instrumentation.Profile() \
+        if args.profile or args.profile_out \
+        else instrumentation.NullProfile()
+    with instrumentation.profiling(profile):
+        if args.rebuild:
+            pathlib.Path(_STATE_PATH).unlink(missing_ok=True)
+        statistics = analyze_directory_incremental(
+            args.replays_dir,
+            _STATE_PATH,
+            workers=args.workers,
+            cache_path=_CACHE_PATH,
+            mode='summary' if args.no_move_stats else 'full'
+        )
+
+        _write_outputs(statistics)
+        if args.shard_out:
+            with profile.stage('write shard'):
+                statistics.save(args.shard_out)
+        if args.store:
+            with profile.stage('store'), \
+                    store.ReplayStore(args.store) as replay_store, \
+                    cache.ReplayCache(_CACHE_PATH, max_size=_CACHE_MAX_SIZE) as replay_cache:
+                replay_store.ingest(
+                    _find_replays(args.replays_dir),
+                    cache=replay_cache,
+                    mode='summary' if args.no_move_stats else 'full'
                 )
 
-    player_file = pathlib.Path('.out/player-usage.json')
-    player_file.parent.mkdir(parents=True, exist_ok=True)
-    player_file.write_text(json.dumps(user_usage), encoding='utf-8')
+    if args.profile:
+        print(profile.summary(), file=sys.stderr)
+    if args.profile_out:
+        profile.save(args.profile_out, parser_version=showdown.PARSER_VERSION)
+
 
-    opponent_file = pathlib.Path('.out/opponent-usage.json')
-    opponent_file.parent.mkdir(parents=True, exist_ok=True)
-    opponent_file.write_text(json.dumps(opponent_usage), encoding='utf-8')
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['merge']:
+        _merge_main(sys.argv[2:])
+    else:
+        _analyze_main(sys.argv[1:])
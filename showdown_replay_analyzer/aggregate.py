@@ -0,0 +1,512 @@
+"""Mergeable usage aggregates and their shard files
+
+An aggregate holds the statistics of a set of replays or pokepastes. Merging
+is associative, so a corpus can be split into shards analyzed on different
+machines or at different times, and the shard aggregates combined in any
+grouping give the same result as analyzing the whole corpus in order.
+
+Aggregates count species, moves, items, abilities and types by dex ID. The IDs
+come from a copy of the bundled dex owned by the aggregate, so names missing
+from the dex data are only interned for as long as the aggregate lives. Names
+are only restored for output and shard files.
+
+A shard file is a small header with the format version and the kind of
+aggregate, followed by the zlib-compressed statistics.
+
+Example usage:
+
+    merged = UsageAggregate()
+    for path in shard_paths:
+        merged.merge(load_aggregate(path))
+    merged.save('.out/merged.sra')
+"""
+import collections
+import dataclasses
+import json
+import pathlib
+import struct
+import zlib
+from typing import List, Union
+
+from .dex import Dex, SymbolTable, default_dex
+from .pokemon import Team
+from .showdown import PlayerInfo
+
+_MAGIC = b'SRAG'
+FORMAT_VERSION = 1
+_HEADER = struct.Struct('<4sBB')
+
+_USAGE = 1
+_POKEPASTE = 2
+_KIND_NAMES = {_USAGE: 'replay usage', _POKEPASTE: 'pokepaste'}
+
+# The name counters of a species in pokepaste statistics.
+_POKEPASTE_COUNTERS = ('ability', 'item', 'moves', 'tera')
+# Pokemon without an item, ability or Tera type are counted under this ID.
+_NO_NAME = -1
+
+
+def new_pokemon_usage() -> dict:
+    """Returns the usage of a species that was not seen yet."""
+    return {
+        'lead': 0,
+        'brought': 0,
+        'moves': collections.Counter(),
+        'wins': 0,
+        'tera': {}
+    }
+
+
+def merge_usage(player_usage: dict, other_usage: dict) -> None:
+    """Adds the usage of other replays to a player's usage.
+
+    Species, moves and Tera types keep the order in which they were first seen.
+    Both usages must be keyed the same way, by name or by the IDs of one dex.
+
+    Arguments:
+        player_usage: The usage to add to, by species, with the number of teams under 'total'.
+        other_usage: The usage to add.
+    """
+    for species, other in other_usage.items():
+        if species == 'total':
+            player_usage['total'] += other
+            continue
+        if species not in player_usage:
+            player_usage[species] = new_pokemon_usage()
+        pokemon_usage = player_usage[species]
+        pokemon_usage['lead'] += other['lead']
+        pokemon_usage['brought'] += other['brought']
+        pokemon_usage['wins'] += other['wins']
+        pokemon_usage['moves'].update(other['moves'])
+        for tera_type, tera in other['tera'].items():
+            if tera_type not in pokemon_usage['tera']:
+                pokemon_usage['tera'][tera_type] = {
+                    'used': 0,
+                    'wins': 0
+                }
+            pokemon_usage['tera'][tera_type]['used'] += tera['used']
+            pokemon_usage['tera'][tera_type]['wins'] += tera['wins']
+
+
+@dataclasses.dataclass
+class UsageAggregate:
+    """Usage statistics of the user's and opponents' Pokemon over a set of replays.
+
+    The usage of a player is keyed by species ID, with the number of teams
+    under 'total', and counts moves by move ID and Tera types by type ID, see
+    usage_by_name. Aggregates can share a dex, e.g. the per-replay aggregates
+    of one worker, so it is only copied once.
+
+    Attributes:
+        user_usage: Usage of the user's Pokemon by species ID.
+        opponent_usage: Usage of the opponents' Pokemon by species ID.
+        rows: The rows of usage.csv without their row numbers.
+        dex: The dex of the IDs in the usage.
+    """
+    user_usage: dict = dataclasses.field(default_factory=lambda: {'total': 0})
+    opponent_usage: dict = dataclasses.field(default_factory=lambda: {'total': 0})
+    rows: List[str] = dataclasses.field(default_factory=lambda: [])
+    dex: Dex = dataclasses.field(default_factory=lambda: default_dex().copy(), repr=False, compare=False)
+
+    def add(self, user_info: PlayerInfo, opponent_info: PlayerInfo) -> None:
+        """Counts the Pokemon of the user and the opponent of a replay.
+
+        Arguments:
+            user_info: The user's information from the parsed replay.
+            opponent_info: The opponent's information from the parsed replay.
+        """
+        self._add_player(self.user_usage, user_info)
+        self._add_player(self.opponent_usage, opponent_info)
+
+    def merge(self, other: 'UsageAggregate') -> None:
+        """Adds the statistics of replays analyzed after the replays of these statistics.
+
+        Arguments:
+            other: The statistics to add.
+        """
+        merge_usage(self.user_usage, self.translate_usage(other.user_usage, other.dex))
+        merge_usage(self.opponent_usage, self.translate_usage(other.opponent_usage, other.dex))
+        self.rows.extend(other.rows)
+
+    def translate_usage(self, player_usage: dict, dex: Dex) -> dict:
+        """Keys a player's usage by the IDs of this aggregate's dex.
+
+        Arguments:
+            player_usage: The usage, keyed by the IDs of dex.
+            dex: The dex of the IDs in player_usage.
+
+        Returns:
+            The usage keyed by the IDs of this aggregate's dex, which is
+            player_usage itself if both dexes are the same.
+        """
+        if dex is self.dex:
+            return player_usage
+        return self.usage_from_names(_usage_by_name(player_usage, dex))
+
+    def usage_by_name(self, player_usage: dict) -> dict:
+        """Turns the IDs of a player's usage back into names, as written to player-usage.json.
+
+        Arguments:
+            player_usage: The usage of the user or the opponents.
+
+        Returns:
+            The usage by species name, with moves and Tera types by name and
+            the unknown Tera type of replays without team sheets as None.
+        """
+        return _usage_by_name(player_usage, self.dex)
+
+    def usage_from_names(self, player_usage: dict) -> dict:
+        """Keys a player's usage by name, as returned by usage_by_name, by the IDs of this aggregate's dex.
+
+        Arguments:
+            player_usage: The usage by species name.
+
+        Returns:
+            The usage by species ID, with moves and Tera types by ID.
+        """
+        dex = self.dex
+        usage = {'total': player_usage['total']}
+        for species, pokemon_usage in player_usage.items():
+            if species == 'total':
+                continue
+            usage[dex.species.id(species)] = {
+                'lead': pokemon_usage['lead'],
+                'brought': pokemon_usage['brought'],
+                'moves': collections.Counter({
+                    dex.moves.id(move_name): times_used
+                    for move_name, times_used in pokemon_usage['moves'].items()
+                }),
+                'wins': pokemon_usage['wins'],
+                'tera': {
+                    _symbol_id(dex.types, tera_type): dict(tera)
+                    for tera_type, tera in pokemon_usage['tera'].items()
+                }
+            }
+        return usage
+
+    def save(self, path: str) -> None:
+        """Saves the statistics to a shard file.
+
+        Arguments:
+            path: The location of the shard file.
+        """
+        _save(path, _USAGE, {
+            'user_usage': _usage_to_record(self.usage_by_name(self.user_usage)),
+            'opponent_usage': _usage_to_record(self.usage_by_name(self.opponent_usage)),
+            'rows': self.rows,
+        })
+
+    @classmethod
+    def load(cls, path: str) -> 'UsageAggregate':
+        """Loads the statistics saved to a shard file.
+
+        Arguments:
+            path: The location of the shard file.
+
+        Returns:
+            The statistics.
+
+        Raises:
+            ValueError: If the file is not a shard file of usage statistics or
+                has an unsupported format version.
+        """
+        return _usage_aggregate(_load(path, _USAGE))
+
+    def _add_player(self, player_usage: dict, player_info: PlayerInfo) -> None:
+        dex = self.dex
+        player_usage['total'] += 1
+        for pokemon in player_info.team.pokemon:
+            species_id = dex.species.id(pokemon.species)
+            pokemon_usage = player_usage.get(species_id)
+            if pokemon_usage is None:
+                pokemon_usage = player_usage[species_id] = new_pokemon_usage()
+            if pokemon.was_lead:
+                pokemon_usage['lead'] += 1
+            if pokemon.was_brought:
+                pokemon_usage['brought'] += 1
+                if player_info.is_winner:
+                    pokemon_usage['wins'] += 1
+            for move in pokemon.moves:
+                pokemon_usage['moves'][dex.moves.id(move.name)] += move.times_used
+            if pokemon.was_terastallized:
+                tera_type_id = _symbol_id(dex.types, pokemon.tera_type)
+                if tera_type_id not in pokemon_usage['tera']:
+                    pokemon_usage['tera'][tera_type_id] = {
+                        'used': 0,
+                        'wins': 0
+                    }
+                pokemon_usage['tera'][tera_type_id]['used'] += 1
+                if player_info.is_winner:
+                    pokemon_usage['tera'][tera_type_id]['wins'] += 1
+
+
+class PokepasteAggregate:
+    """The species, abilities, items, moves and Tera types of a set of pokepastes.
+
+    Attributes:
+        pokemon_stats: The statistics of every species by species ID.
+        dex: The dex of the IDs in the statistics.
+    """
+
+    def __init__(self):
+        self.pokemon_stats = {}
+        self.dex = default_dex().copy()
+
+    def add_team(self, team: Team) -> None:
+        """Counts the Pokemon of a team.
+
+        Arguments:
+            team: The team of a pokepaste.
+        """
+        dex = self.dex
+        for p in team.pokemon:
+            pokemon = self._species_stats(dex.species_id(p.species))
+            pokemon['count'] += 1
+            for move in p.moves:
+                pokemon['moves'][dex.moves.id(move.name)] += 1
+            pokemon['tera'][_symbol_id(dex.types, p.tera_type)] += 1
+            pokemon['ability'][_symbol_id(dex.abilities, p.ability)] += 1
+            pokemon['item'][_symbol_id(dex.items, p.item)] += 1
+
+    def merge(self, other: 'PokepasteAggregate') -> None:
+        """Adds the statistics of other pokepastes.
+
+        Arguments:
+            other: The statistics to add.
+        """
+        # The IDs of names missing from the dex data differ between aggregates.
+        dex = self.dex
+        other_dex = other.dex
+        tables = _pokepaste_tables(dex)
+        other_tables = _pokepaste_tables(other_dex)
+        for species_id, other_stats in other.pokemon_stats.items():
+            pokemon = self._species_stats(dex.species.id(other_dex.species.name(species_id)))
+            pokemon['count'] += other_stats['count']
+            for key in _POKEPASTE_COUNTERS:
+                table = tables[key]
+                other_table = other_tables[key]
+                for symbol_id, count in other_stats[key].items():
+                    pokemon[key][_symbol_id(table, _name(other_table, symbol_id))] += count
+
+    def summary(self) -> List[dict]:
+        """Lists the statistics of every species by name, most used first.
+
+        Returns:
+            The species and count of each species, with its abilities, items,
+            moves and Tera types by name, most used first.
+        """
+        dex = self.dex
+        return [
+            {
+                'species': dex.species.name(species_id),
+                'count': pokemon['count'],
+                'ability': _sort_dict(_names(dex.abilities, pokemon['ability'])),
+                'item': _sort_dict(_names(dex.items, pokemon['item'])),
+                'moves': _sort_dict(_names(dex.moves, pokemon['moves'])),
+                'tera': _sort_dict(_names(dex.types, pokemon['tera'])),
+            }
+            for species_id, pokemon in sorted(
+                self.pokemon_stats.items(),
+                key=lambda item: item[1]['count'],
+                reverse=True
+            )
+        ]
+
+    def to_json(self) -> str:
+        """Formats the summary as the JSON printed by parse_pokepastes.
+
+        Returns:
+            A JSON array with one object per species, most used first.
+        """
+        return '[' + ','.join(
+            '{'
+            f'"species": "{stats["species"]}",'
+            f'"count": {stats["count"]},'
+            f'"ability": {json.dumps(stats["ability"])},'
+            f'"item": {json.dumps(stats["item"])},'
+            f'"moves": {json.dumps(stats["moves"])},'
+            f'"tera": {json.dumps(stats["tera"])}'
+            '}'
+            for stats in self.summary()
+        ) + ']'
+
+    def save(self, path: str) -> None:
+        """Saves the statistics to a shard file.
+
+        Arguments:
+            path: The location of the shard file.
+        """
+        dex = self.dex
+        tables = _pokepaste_tables(dex)
+        _save(path, _POKEPASTE, [
+            [dex.species.name(species_id), pokemon['count']] + [
+                [[_name(tables[key], symbol_id), count] for symbol_id, count in pokemon[key].items()]
+                for key in _POKEPASTE_COUNTERS
+            ]
+            for species_id, pokemon in self.pokemon_stats.items()
+        ])
+
+    @classmethod
+    def load(cls, path: str) -> 'PokepasteAggregate':
+        """Loads the statistics saved to a shard file.
+
+        Arguments:
+            path: The location of the shard file.
+
+        Returns:
+            The statistics.
+
+        Raises:
+            ValueError: If the file is not a shard file of pokepaste statistics
+                or has an unsupported format version.
+        """
+        return _pokepaste_aggregate(_load(path, _POKEPASTE))
+
+    def _species_stats(self, species_id: int) -> dict:
+        pokemon = self.pokemon_stats.get(species_id)
+        if pokemon is None:
+            pokemon = self.pokemon_stats[species_id] = {
+                'count': 0,
+                'ability': collections.Counter(),
+                'item': collections.Counter(),
+                'moves': collections.Counter(),
+                'tera': collections.Counter(),
+            }
+        return pokemon
+
+
+def load_aggregate(path: str) -> Union[UsageAggregate, PokepasteAggregate]:
+    """Loads a shard file of either kind of aggregate.
+
+    Arguments:
+        path: The location of the shard file.
+
+    Returns:
+        The aggregate saved to the file.
+
+    Raises:
+        ValueError: If the file is not a shard file or has an unsupported format version.
+    """
+    kind, record = _load(path)
+    if kind == _USAGE:
+        return _usage_aggregate(record)
+    return _pokepaste_aggregate(record)
+
+
+def _save(path: str, kind: int, record) -> None:
+    payload = zlib.compress(json.dumps(record, separators=(',', ':')).encode('utf8'))
+    shard_file = pathlib.Path(path)
+    shard_file.parent.mkdir(parents=True, exist_ok=True)
+    shard_file.write_bytes(_HEADER.pack(_MAGIC, FORMAT_VERSION, kind) + payload)
+
+
+def _load(path: str, expected_kind: int = None):
+    # Returns the record of the shard, or its kind and record if any kind is expected.
+    data = pathlib.Path(path).read_bytes()
+    if len(data) < _HEADER.size or data[:len(_MAGIC)] != _MAGIC:
+        raise ValueError(f'{path} is not a shard file')
+    _, version, kind = _HEADER.unpack_from(data)
+    if version != FORMAT_VERSION:
+        raise ValueError(f'{path} has shard format version {version}, expected {FORMAT_VERSION}')
+    if kind not in _KIND_NAMES:
+        raise ValueError(f'{path} is a shard of unknown kind {kind}')
+    if expected_kind not in (None, kind):
+        raise ValueError(f'{path} is a shard of {_KIND_NAMES[kind]} statistics, '
+                         f'expected {_KIND_NAMES[expected_kind]} statistics')
+    record = json.loads(zlib.decompress(data[_HEADER.size:]).decode('utf8'))
+    return record if expected_kind else (kind, record)
+
+
+def _usage_aggregate(record: dict) -> UsageAggregate:
+    statistics = UsageAggregate(rows=record['rows'])
+    statistics.user_usage = statistics.usage_from_names(_usage_from_record(record['user_usage']))
+    statistics.opponent_usage = statistics.usage_from_names(_usage_from_record(record['opponent_usage']))
+    return statistics
+
+
+def _pokepaste_aggregate(record: list) -> PokepasteAggregate:
+    aggregate = PokepasteAggregate()
+    dex = aggregate.dex
+    tables = _pokepaste_tables(dex)
+    for species, count, *counters in record:
+        pokemon = aggregate._species_stats(dex.species.id(species))  # pylint: disable=protected-access
+        pokemon['count'] += count
+        for key, counts in zip(_POKEPASTE_COUNTERS, counters):
+            for name, name_count in counts:
+                pokemon[key][_symbol_id(tables[key], name)] += name_count
+    return aggregate
+
+
+def _usage_to_record(player_usage: dict) -> dict:
+    # Names are listed rather than used as JSON keys, which would turn the
+    # unknown Tera type None into the string 'null'.
+    return {
+        'total': player_usage['total'],
+        'species': [
+            [
+                species,
+                pokemon_usage['lead'],
+                pokemon_usage['brought'],
+                pokemon_usage['wins'],
+                list(pokemon_usage['moves'].items()),
+                [[tera_type, tera['used'], tera['wins']] for tera_type, tera in pokemon_usage['tera'].items()]
+            ]
+            for species, pokemon_usage in player_usage.items()
+            if species != 'total'
+        ]
+    }
+
+
+def _usage_from_record(record: dict) -> dict:
+    player_usage = {'total': record['total']}
+    for species, lead, brought, wins, moves, tera in record['species']:
+        player_usage[species] = {
+            'lead': lead,
+            'brought': brought,
+            'moves': collections.Counter(dict(moves)),
+            'wins': wins,
+            'tera': {tera_type: {'used': used, 'wins': won} for tera_type, used, won in tera}
+        }
+    return player_usage
+
+
+def _usage_by_name(player_usage: dict, dex: Dex) -> dict:
+    usage = {'total': player_usage['total']}
+    for species_id, pokemon_usage in player_usage.items():
+        if species_id == 'total':
+            continue
+        usage[dex.species.name(species_id)] = {
+            'lead': pokemon_usage['lead'],
+            'brought': pokemon_usage['brought'],
+            'moves': collections.Counter({
+                dex.moves.name(move_id): times_used
+                for move_id, times_used in pokemon_usage['moves'].items()
+            }),
+            'wins': pokemon_usage['wins'],
+            'tera': {
+                _name(dex.types, tera_type_id): dict(tera)
+                for tera_type_id, tera in pokemon_usage['tera'].items()
+            }
+        }
+    return usage
+
+
+def _pokepaste_tables(dex) -> dict:
+    return {'ability': dex.abilities, 'item': dex.items, 'moves': dex.moves, 'tera': dex.types}
+
+
+def _symbol_id(table: SymbolTable, name: str) -> int:
+    return _NO_NAME if name is None else table.id(name)
+
+
+def _name(table: SymbolTable, symbol_id: int) -> str:
+    return None if symbol_id == _NO_NAME else table.name(symbol_id)
+
+
+def _names(table: SymbolTable, counts: collections.Counter) -> dict:
+    return {_name(table, symbol_id): count for symbol_id, count in counts.items()}
+
+
+def _sort_dict(d):
+    # Most counted first, then by name with None last.
+    return dict(sorted(d.items(), key=lambda item: (-item[1], item[0] is None, item[0] or '')))
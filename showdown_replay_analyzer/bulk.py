@@ -0,0 +1,152 @@
+"""Parse many Showdown battle logs in large regular expression passes
+
+parse_battle_logs concatenates battle logs into large buffers and
+parse_concatenated_file memory-maps a file of concatenated battle logs. Both
+find every line with a handler in one scan and dispatch it to the
+ReplayParser of its replay, so the results are identical to calling
+showdown.parse_replay on each battle log.
+
+Example usage:
+
+    replays = parse_battle_logs(battle_logs, mode='summary')
+"""
+import bisect
+import itertools
+import mmap
+import os
+from typing import Iterable, List
+
+from .handlers import compile_line_patterns
+from .showdown import PARSE_MODES, ReplayParser, ShowdownReplay
+
+# The number of characters of battle logs parse_battle_logs scans at once.
+_BULK_BATCH_SIZE = 8 * 1024 * 1024
+
+
+def parse_battle_logs(battle_logs: Iterable[str], mode: str = 'full') -> List[ShowdownReplay]:
+    """Parses many Showdown Replays at once.
+
+    The battle logs are concatenated into large buffers and every line with a
+    handler is found in a single regular expression pass over each buffer.
+    The matched lines are grouped into replays by their offset in the buffer,
+    so the results are identical to calling parse_replay on each battle log.
+
+    Args:
+        battle_logs: The raw battle logs of the Showdown Replays.
+        mode: full or summary, see showdown.parse_replay.
+
+    Returns:
+        The parsed ShowdownReplay objects in the order of the battle logs.
+
+    Raises:
+        ValueError: If the mode is unknown.
+    """
+    replays = []
+    batch = []
+    batch_size = 0
+    if mode not in PARSE_MODES:
+        raise ValueError(f'Unknown parse mode {mode}. Expected one of {PARSE_MODES}')
+    for battle_log in battle_logs:
+        batch.append(battle_log)
+        batch_size += len(battle_log) + 1
+        if batch_size >= _BULK_BATCH_SIZE:
+            replays.extend(_parse_battle_log_batch(batch, mode))
+            batch.clear()
+            batch_size = 0
+    if batch:
+        replays.extend(_parse_battle_log_batch(batch, mode))
+    return replays
+
+
+def parse_concatenated_file(path: str, mode: str = 'full') -> List[ShowdownReplay]:
+    """Parses a file of concatenated Showdown Replays.
+
+    The file is memory-mapped and scanned in a single regular expression pass,
+    so only the lines with a handler are ever decoded. As with
+    showdown.iter_replays, a replay ends when a player line follows its win or
+    tie line.
+
+    Args:
+        path: The location of the UTF-8 file of concatenated battle logs.
+        mode: full or summary, see showdown.parse_replay.
+
+    Returns:
+        The parsed ShowdownReplay objects in file order.
+
+    Raises:
+        ValueError: If the mode is unknown.
+    """
+    # pylint: disable=protected-access
+    parser = ReplayParser(mode=mode)
+    if os.path.getsize(path) == 0:
+        return []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        handlers = parser._handlers
+        first_line, next_lines = compile_line_patterns(frozenset(handlers), binary=True)
+        first_match = first_line.match(buffer)
+        lines = itertools.chain(
+            [first_match.group()] if first_match else [],
+            (match.group(1) for match in next_lines.finditer(buffer))
+        )
+        replays = []
+        for line in lines:
+            command_parts = line.decode('utf8').split('|')
+            command = command_parts[1]
+            if parser.is_finished and command == 'player':
+                replays.append(parser.finish())
+                parser = ReplayParser(mode=mode)
+            elif mode == 'summary' and parser._winner_name is not None:
+                # Nothing after the result matters to a summary.
+                continue
+            handlers[command](parser, command_parts)
+    replays.append(parser.finish())
+    return replays
+
+
+def _parse_battle_log_batch(battle_logs: List[str], mode: str) -> List[ShowdownReplay]:
+    # pylint: disable=protected-access
+    # Every battle log is preceded by a newline in the buffer, so the first
+    # line of each log is matched like any other line. starts holds the
+    # offset of that newline for each log and ends the last offset of a line
+    # that is parsed, which is before the last win line in summary mode.
+    buffer = '\n' + '\n'.join(battle_logs)
+    starts = []
+    ends = []
+    start = 0
+    for battle_log in battle_logs:
+        starts.append(start)
+        end = start + len(battle_log)
+        if mode == 'summary':
+            win = battle_log.rfind('\n|win|')
+            if win != -1:
+                end = start + 1 + win
+        ends.append(end)
+        start += len(battle_log) + 1
+    starts.append(len(buffer) + 1)
+
+    # Each replay is finished as soon as the scan moves past its log, so only
+    # one parser is alive at a time.
+    replays = []
+    parser = ReplayParser(mode=mode)
+    handlers = parser._handlers
+    _, next_lines = parser._line_patterns
+    index = 0
+    next_start = starts[1]
+    end = ends[0]
+    for match in next_lines.finditer(buffer):
+        position = match.start()
+        if position >= next_start:
+            next_index = bisect.bisect_right(starts, position, index + 1) - 1
+            replays.append(parser.finish())
+            replays.extend(ReplayParser(mode=mode).finish() for _ in range(index + 1, next_index))
+            index = next_index
+            parser = ReplayParser(mode=mode)
+            next_start = starts[index + 1]
+            end = ends[index]
+        if position > end:
+            continue
+        command_parts = match.group(1).split('|')
+        handlers[command_parts[1]](parser, command_parts)
+    replays.append(parser.finish())
+    replays.extend(ReplayParser(mode=mode).finish() for _ in range(index + 1, len(battle_logs)))
+    return replays
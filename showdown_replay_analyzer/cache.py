@@ -0,0 +1,353 @@
+"""Persistent on-disk caches of extracted Showdown battle logs
+
+Each cache is a table in a SQLite database so that several processes can read
+and write it at the same time. Entries are evicted in least recently used order
+once the total size of the stored values exceeds the configured maximum. The
+access times of cache hits are buffered and written in batches, so reading a
+cached value does not write to the database every time.
+
+Example usage:
+
+    cache = ReplayCache('.out/replay-cache.sqlite3', max_size=256 * 1024 * 1024)
+    strategy = ShowdownReplayRetrievalStrategyFactory.resolve_strategy(location, cache=cache)
+    battle_log = strategy.retrieve_replay(location)
+"""
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+import zlib
+from typing import Dict, Iterable
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS {table} (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_access INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS {table}_last_access ON {table} (last_access);
+CREATE TABLE IF NOT EXISTS cache_size (
+    name TEXT PRIMARY KEY,
+    total INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_size (name, total) VALUES ('{table}', 0);
+'''
+
+# SQLite limits the number of host parameters in a single statement.
+_MAX_VARIABLES = 500
+# The number of cache hits whose access times are buffered before they are written.
+_MAX_PENDING_ACCESSES = 500
+
+
+class SqliteDatabase:
+    """The connection of this process to a SQLite database shared by several processes.
+
+    The connection is opened on first use in write-ahead logging mode and the
+    schema is created if needed. Connections are not shared with forked child
+    processes, which open their own. Callers serialize access across threads.
+
+    Attributes:
+        path: The location of the database.
+    """
+
+    def __init__(self, path: str, schema: str):
+        self.path = os.fspath(path)
+        self._schema = schema
+        self._connection: sqlite3.Connection = None
+        self._pid: int = None
+
+    def connect(self) -> sqlite3.Connection:
+        """Returns the connection of this process, opening it if needed."""
+        if self._connection is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self.path,
+                timeout=60,
+                isolation_level=None,
+                check_same_thread=False
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('PRAGMA foreign_keys=ON')
+            connection.executescript(self._schema)
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def close(self) -> None:
+        """Closes the connection if this process opened it."""
+        if self._connection is not None and self._pid == os.getpid():
+            self._connection.close()
+        self._connection = None
+
+
+class LruCache:
+    """A size-bounded, multi-process safe cache of binary values in a SQLite table.
+
+    Subclasses choose the table and how values are encoded.
+
+    Attributes:
+        path: The location of the cache database.
+        max_size: The maximum total size in bytes of the cached values.
+    """
+    _TABLE = 'entries'
+
+    def __init__(self, path: str, max_size: int = 1024 * 1024 * 1024):
+        self.path = os.fspath(path)
+        self.max_size = max_size
+        self._database = SqliteDatabase(self.path, _SCHEMA.format(table=self._TABLE))
+        self._lock = threading.Lock()
+        # Access times of cache hits by key that are not written yet.
+        self._accessed: Dict[str, int] = {}
+
+    def get_bytes(self, key: str) -> bytes:
+        """Gets a cached value and marks it as recently used.
+
+        The access time is written with the next batch of access times, see
+        flush_access_times.
+
+        Args:
+            key: The cache key of the value.
+
+        Returns:
+            The cached value or None if the key is not cached.
+        """
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute(
+                f'SELECT value FROM {self._TABLE} WHERE key = ?',
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._record_accesses(connection, (key,))
+        return row[0]
+
+    def get_many_bytes(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        """Gets many cached values at once and marks them as recently used.
+
+        Args:
+            keys: The cache keys of the values.
+
+        Returns:
+            A dictionary of the cached values by key. Keys that are not cached are omitted.
+        """
+        keys = list(keys)
+        values = {}
+        with self._lock:
+            connection = self._connect()
+            for i in range(0, len(keys), _MAX_VARIABLES):
+                chunk = keys[i:i + _MAX_VARIABLES]
+                values.update(connection.execute(
+                    f'SELECT key, value FROM {self._TABLE} '
+                    f'WHERE key IN ({','.join('?' * len(chunk))})',
+                    chunk
+                ))
+            self._record_accesses(connection, values)
+        return values
+
+    def put_bytes(self, key: str, value: bytes) -> None:
+        """Stores a value, evicting least recently used entries if needed.
+
+        Args:
+            key: The cache key of the value.
+            value: The value to store.
+        """
+        self.put_many_bytes({key: value})
+
+    def put_many_bytes(self, values: Dict[str, bytes]) -> None:
+        """Stores many values in a single transaction, evicting least recently used entries if needed.
+
+        Args:
+            values: The values to store by cache key.
+        """
+        with self._lock:
+            connection = self._connect()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                # Buffered access times are written first so eviction sees them.
+                self._write_access_times(connection)
+                delta = 0
+                now = time.time_ns()
+                for key, value in values.items():
+                    previous = connection.execute(
+                        f'SELECT size FROM {self._TABLE} WHERE key = ?',
+                        (key,)
+                    ).fetchone()
+                    connection.execute(
+                        f'INSERT OR REPLACE INTO {self._TABLE} (key, value, size, last_access) '
+                        'VALUES (?, ?, ?, ?)',
+                        (key, value, len(value), now)
+                    )
+                    delta += len(value) - (previous[0] if previous else 0)
+                total = self._add_size(connection, delta)
+                if total > self.max_size:
+                    self._evict(connection, total)
+                connection.execute('COMMIT')
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+
+    def size(self) -> int:
+        """Returns the total size in bytes of the cached values."""
+        with self._lock:
+            return self._connect().execute(
+                'SELECT total FROM cache_size WHERE name = ?',
+                (self._TABLE,)
+            ).fetchone()[0]
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return self._connect().execute(
+                f'SELECT 1 FROM {self._TABLE} WHERE key = ?',
+                (key,)
+            ).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connect().execute(
+                f'SELECT COUNT(*) FROM {self._TABLE}'
+            ).fetchone()[0]
+
+    def flush_access_times(self) -> None:
+        """Writes the buffered access times of cache hits.
+
+        They are also written by the next put, on close, and whenever
+        enough of them are buffered. Until then, other processes evicting
+        entries do not see them.
+        """
+        with self._lock:
+            if self._accessed:
+                self._flush(self._connect())
+
+    def close(self) -> None:
+        """Writes the buffered access times and closes the connection to the cache database."""
+        with self._lock:
+            if self._accessed:
+                self._flush(self._connect())
+            self._database.close()
+
+    def __enter__(self) -> 'LruCache':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __getstate__(self) -> dict:
+        return {'path': self.path, 'max_size': self.max_size}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(**state)
+
+    def _connect(self) -> sqlite3.Connection:
+        return self._database.connect()
+
+    def _record_accesses(self, connection: sqlite3.Connection, keys: Iterable[str]) -> None:
+        now = time.time_ns()
+        accessed = self._accessed
+        for key in keys:
+            accessed[key] = now
+        if len(accessed) >= _MAX_PENDING_ACCESSES:
+            self._flush(connection)
+
+    def _flush(self, connection: sqlite3.Connection) -> None:
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            self._write_access_times(connection)
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def _write_access_times(self, connection: sqlite3.Connection) -> None:
+        # Entries evicted since they were read are not updated.
+        connection.executemany(
+            f'UPDATE {self._TABLE} SET last_access = ? WHERE key = ?',
+            ((access_time, key) for key, access_time in self._accessed.items())
+        )
+        self._accessed.clear()
+
+    def _add_size(self, connection: sqlite3.Connection, delta: int) -> int:
+        connection.execute(
+            'UPDATE cache_size SET total = total + ? WHERE name = ?',
+            (delta, self._TABLE)
+        )
+        return connection.execute(
+            'SELECT total FROM cache_size WHERE name = ?',
+            (self._TABLE,)
+        ).fetchone()[0]
+
+    def _evict(self, connection: sqlite3.Connection, total: int) -> None:
+        cursor = connection.execute(
+            f'SELECT key, size FROM {self._TABLE} ORDER BY last_access'
+        )
+        evicted = []
+        freed = 0
+        for key, size in cursor:
+            if total - freed <= self.max_size:
+                break
+            evicted.append((key,))
+            freed += size
+        cursor.close()
+        connection.executemany(f'DELETE FROM {self._TABLE} WHERE key = ?', evicted)
+        self._add_size(connection, -freed)
+
+
+class ReplayCache(LruCache):
+    """A size-bounded, multi-process safe cache of battle logs.
+
+    Battle logs are stored compressed. The size used for eviction is the
+    compressed size of the stored battle logs.
+    """
+    _TABLE = 'battle_logs'
+
+    def get(self, key: str) -> str:
+        """Gets a cached battle log and marks it as recently used.
+
+        Args:
+            key: The cache key of the battle log.
+
+        Returns:
+            The cached battle log or None if the key is not cached.
+        """
+        value = self.get_bytes(key)
+        if value is None:
+            return None
+        return zlib.decompress(value).decode('utf8')
+
+    def put(self, key: str, battle_log: str) -> None:
+        """Stores a battle log, evicting least recently used entries if needed.
+
+        Args:
+            key: The cache key of the battle log.
+            battle_log: The battle log to store.
+        """
+        self.put_bytes(key, zlib.compress(battle_log.encode('utf8')))
+
+
+def replay_cache_key(location: str) -> str:
+    """Resolves the cache key of a replay location.
+
+    Replays on replay.pokemonshowdown.com are keyed by their replay ID. Local
+    files are keyed by their absolute path, size and modification time, like
+    the change detection of incremental analyses, so a cached file is not
+    read to look it up. A file that is modified, renamed or copied gets a new
+    entry.
+
+    Args:
+        location: The location of the showdown replay.
+
+    Returns:
+        The cache key of the replay.
+    """
+    location = os.fspath(location)
+    if os.path.isfile(location):
+        stat = os.stat(location)
+        return f'file:{os.path.abspath(location)}:{stat.st_size}:{stat.st_mtime_ns}'
+    path = urllib.parse.urlparse(location).path
+    replay_id = path.rstrip('/').rsplit('/', 1)[-1].removesuffix('.json')
+    return f'replay:{replay_id}'
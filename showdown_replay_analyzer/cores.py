@@ -0,0 +1,235 @@
+"""Co-occurrence statistics of species on the same team
+
+Every team is encoded as an integer bitset over the species seen so far, one
+bit per species. Pair counts are computed from one bitset per species over
+the teams, where the teams with both species of a pair are the bitwise and of
+the two bitsets and their number is its popcount. Exact selections, such as
+the four Pokemon brought to a battle, are counted by their team bitset.
+
+The top-k queries only keep k results at a time and skip pairs whose species
+are not used often enough to make the top k.
+
+Example usage:
+
+    cores = CoreAggregator()
+    for replay in replays:
+        cores.add(replay.player1_info)
+    for core in cores.top_pairs(10, selection='brought'):
+        print(core.species, core.count, core.win_rate)
+"""
+import collections
+import dataclasses
+import heapq
+from typing import Callable, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from .dex import SymbolTable
+from .showdown import PlayerInfo
+
+SELECTIONS = ('team', 'lead', 'brought')
+RANKINGS = ('count', 'win_rate')
+
+# The number of teams transposed at a time, a multiple of eight.
+_TRANSPOSE_CHUNK = 1 << 16
+
+
+@dataclasses.dataclass(frozen=True)
+class Core:
+    """Species used together and how often they won.
+
+    Attributes:
+        species: The species, in the order they were first seen.
+        count: The number of teams that used the species together.
+        wins: The number of those teams that won.
+    """
+    species: Tuple[str, ...]
+    count: int
+    wins: int
+
+    @property
+    def win_rate(self) -> float:
+        """The fraction of the teams that won."""
+        return self.wins / self.count if self.count else 0.0
+
+
+class CoreAggregator:
+    """The species pairs and selections of many teams.
+
+    Attributes:
+        total: The number of teams added.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self._species = SymbolTable()
+        # The bitsets of every added team by selection.
+        self._bitsets: Dict[str, List[int]] = {selection: [] for selection in SELECTIONS}
+        self._winners: List[bool] = []
+
+    def add(self, player_info: PlayerInfo) -> None:
+        """Adds a player's team.
+
+        Arguments:
+            player_info: The player's information from a parsed replay.
+        """
+        species_id = self._species.id
+        team = lead = brought = 0
+        for pokemon in player_info.team.pokemon:
+            bit = 1 << species_id(pokemon.species)
+            team |= bit
+            if pokemon.was_lead:
+                lead |= bit
+            if pokemon.was_brought:
+                brought |= bit
+        self._bitsets['team'].append(team)
+        self._bitsets['lead'].append(lead)
+        self._bitsets['brought'].append(brought)
+        self._winners.append(player_info.is_winner)
+        self.total += 1
+
+    def top_selections(self, k: int, selection: str = 'brought', rank_by: str = 'count',
+                       min_count: int = 1) -> List[Core]:
+        """Finds the exact selections used most often or winning most often.
+
+        With selection='brought' these are the four Pokemon brought to a
+        battle, and with selection='lead' the lead pairs.
+
+        Arguments:
+            k: The number of selections to return.
+            selection: Which Pokemon of each team form a selection, one of SELECTIONS.
+            rank_by: count to rank by the number of teams, or win_rate.
+            min_count: Ignore selections used by fewer teams.
+
+        Returns:
+            The top k selections, best first. Ties keep the order the selections were first seen.
+
+        Raises:
+            ValueError: If selection or rank_by is unknown.
+        """
+        _check_query(selection, rank_by)
+        counts = collections.Counter()
+        wins = collections.Counter()
+        for bitset, is_winner in zip(self._bitsets[selection], self._winners):
+            if not bitset:
+                continue
+            counts[bitset] += 1
+            if is_winner:
+                wins[bitset] += 1
+        key = _rank_key(rank_by)
+        top = heapq.nlargest(
+            k,
+            (bitset for bitset, count in counts.items() if count >= min_count),
+            key=lambda bitset: key(counts[bitset], wins[bitset])
+        )
+        return [Core(self._names(bitset), counts[bitset], wins[bitset]) for bitset in top]
+
+    def top_pairs(self, k: int, selection: str = 'team', rank_by: str = 'count',
+                  min_count: int = 1) -> List[Core]:
+        """Finds the pairs of species used together most often or winning most often.
+
+        Arguments:
+            k: The number of pairs to return.
+            selection: Which Pokemon of each team are paired, one of SELECTIONS.
+                With selection='lead' these are the lead pairs.
+            rank_by: count to rank by the number of teams, or win_rate.
+            min_count: Ignore pairs used by fewer teams.
+
+        Returns:
+            The top k pairs, best first.
+
+        Raises:
+            ValueError: If selection or rank_by is unknown.
+        """
+        _check_query(selection, rank_by)
+        rows, winners = self._species_rows(selection)
+        counts = [row.bit_count() for row in rows]
+        order = sorted(range(len(rows)), key=counts.__getitem__, reverse=True)
+        key = _rank_key(rank_by)
+        # A min-heap of the best pairs so far. The sequence number keeps the
+        # first pair found ahead on ties.
+        top: List[Tuple[tuple, int, int, int, int, int]] = []
+        sequence = 0
+        for position, first in enumerate(order):
+            # A pair is used at most as often as either of its species.
+            if counts[first] < _min_count(top, k, rank_by, min_count):
+                break
+            first_row = rows[first]
+            for second in order[position + 1:]:
+                if counts[second] < _min_count(top, k, rank_by, min_count):
+                    break
+                both = first_row & rows[second]
+                count = both.bit_count()
+                if count < min_count:
+                    continue
+                won = (both & winners).bit_count()
+                entry = (key(count, won), -sequence, first, second, count, won)
+                sequence += 1
+                if len(top) < k:
+                    heapq.heappush(top, entry)
+                elif entry > top[0]:
+                    heapq.heapreplace(top, entry)
+        top.sort(reverse=True)
+        return [
+            Core(self._names((1 << first) | (1 << second)), count, won)
+            for _, _, first, second, count, won in top
+        ]
+
+    def _species_rows(self, selection: str) -> Tuple[List[int], int]:
+        # Transposes the team bitsets into one bitset of teams per species,
+        # bit t of which is set when team t selected the species, and the
+        # bitset of the winning teams.
+        species_count = len(self._species)
+        if not species_count:
+            return [], 0
+        species_bytes = (species_count + 7) // 8
+        teams = np.frombuffer(
+            b''.join(bitset.to_bytes(species_bytes, 'little') for bitset in self._bitsets[selection]),
+            dtype=np.uint8
+        ).reshape(-1, species_bytes)
+        # Eight teams share a byte of every species bitset, so the chunks are
+        # a multiple of eight teams.
+        columns = [
+            np.packbits(
+                np.unpackbits(teams[start:start + _TRANSPOSE_CHUNK], axis=1, count=species_count, bitorder='little'),
+                axis=0,
+                bitorder='little'
+            )
+            for start in range(0, len(teams), _TRANSPOSE_CHUNK)
+        ]
+        packed = np.concatenate(columns).T
+        rows = [int.from_bytes(row.tobytes(), 'little') for row in packed]
+        winners = np.packbits(np.array(self._winners, dtype=bool), bitorder='little')
+        return rows, int.from_bytes(winners.tobytes(), 'little')
+
+    def _names(self, bitset: int) -> Tuple[str, ...]:
+        return tuple(self._species.name(species_id) for species_id in _bits(bitset))
+
+
+def _bits(bitset: int) -> Iterator[int]:
+    # The set bits of a bitset from the lowest.
+    while bitset:
+        low = bitset & -bitset
+        yield low.bit_length() - 1
+        bitset ^= low
+
+
+def _rank_key(rank_by: str) -> Callable[[int, int], tuple]:
+    # The sort key of a core from its count and wins.
+    if rank_by == 'count':
+        return lambda count, wins: (count, wins)
+    return lambda count, wins: (wins / count, count)
+
+
+def _min_count(top: list, k: int, rank_by: str, min_count: int) -> int:
+    # The fewest uses a pair needs to enter the top k.
+    if rank_by == 'count' and len(top) == k:
+        return max(min_count, top[0][4])
+    return min_count
+
+
+def _check_query(selection: str, rank_by: str) -> None:
+    if selection not in SELECTIONS:
+        raise ValueError(f'Unknown selection {selection!r}, expected one of {SELECTIONS}')
+    if rank_by not in RANKINGS:
+        raise ValueError(f'Unknown ranking {rank_by!r}, expected one of {RANKINGS}')
@@ -0,0 +1,269 @@
+"""Symbol tables mapping species, move, ability, item and type names to integer IDs
+
+The bundled data file lists the names of Generation 9, taken from the
+Showdown pokedex, move and item data, together with the base species of every
+form. The process-wide dex loaded from it is read-only, so its IDs are the
+same in every process and it does not grow with the names of a corpus.
+Aggregators that need IDs for names missing from the data file intern them
+in a copy of the dex that lives as long as the aggregator.
+
+Parsed models keep names, which are what is pickled between processes and
+stored in caches. Their species_id and move_id are looked up in the
+process-wide dex, and are None for names outside the data file.
+
+Example usage:
+
+    dex = default_dex()
+    species_id = dex.species.id('Ogerpon-Hearthflame')
+    dex.species.name(dex.base_species_id(species_id))  # Ogerpon
+    local_dex = dex.copy()
+    local_dex.items.id('Some New Item')  # Only added to the copy
+"""
+import functools
+import json
+import pathlib
+from typing import Dict, Iterable, List, Optional
+
+_DEX_FILE = pathlib.Path(__file__).parent / 'data' / 'dex.json'
+
+# Team preview hides some forms, e.g. Urshifu-*.
+_HIDDEN_FORM_SUFFIX = '-*'
+
+
+class SymbolTable:
+    """Interns names as small consecutive integer IDs.
+
+    Attributes:
+        names: The names by ID.
+        read_only: Whether new names are rejected instead of added.
+    """
+
+    def __init__(self, names: Iterable[str] = (), read_only: bool = False):
+        self.names: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self.read_only = False
+        for name in names:
+            self.id(name)
+        self.read_only = read_only
+
+    def id(self, name: str) -> int:
+        """Resolves the ID of a name, adding the name if it is new.
+
+        Arguments:
+            name: The name.
+
+        Returns:
+            The ID of the name.
+
+        Raises:
+            KeyError: If the name is new and the table is read-only.
+        """
+        symbol_id = self._ids.get(name)
+        if symbol_id is None:
+            if self.read_only:
+                raise KeyError(f'{name!r} is not in the read-only symbol table')
+            name = str(name)
+            symbol_id = self._ids[name] = len(self.names)
+            self.names.append(name)
+        return symbol_id
+
+    def get(self, name: str) -> int:
+        """Resolves the ID of a name without adding it.
+
+        Arguments:
+            name: The name.
+
+        Returns:
+            The ID of the name or None if the name is not in the table.
+        """
+        return self._ids.get(name)
+
+    def name(self, symbol_id: int) -> str:
+        """Resolves the name of an ID.
+
+        Arguments:
+            symbol_id: The ID.
+
+        Returns:
+            The name with that ID.
+
+        Raises:
+            IndexError: If no name has that ID.
+        """
+        return self.names[symbol_id]
+
+    def copy(self) -> 'SymbolTable':
+        """Copies the table. Names added to the copy keep the IDs that follow the copied names.
+
+        Returns:
+            A table with the same names and IDs, which is never read-only.
+        """
+        return SymbolTable(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._ids
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+class Dex:
+    """The symbol tables of every kind of name, with the forms of each species.
+
+    Attributes:
+        species: The species and forms, e.g. Ogerpon-Hearthflame.
+        moves: The moves by display name.
+        abilities: The abilities by display name.
+        items: The items.
+        types: The types, including Stellar for Tera types.
+    """
+
+    def __init__(
+            self,
+            species: Iterable[str] = (),
+            base_species: Iterable[int] = (),
+            moves: Iterable[str] = (),
+            abilities: Iterable[str] = (),
+            items: Iterable[str] = (),
+            types: Iterable[str] = (),
+            read_only: bool = False
+    ):
+        """Creates a dex.
+
+        Arguments:
+            species: The names of the species and forms.
+            base_species: The ID of the base species of each species, in the
+                same order. A base species is its own base species.
+            moves: The names of the moves.
+            abilities: The names of the abilities.
+            items: The names of the items.
+            types: The names of the types.
+            read_only: Whether new names are rejected instead of added, see SymbolTable.
+        """
+        self.species = SymbolTable(species, read_only)
+        self.moves = SymbolTable(moves, read_only)
+        self.abilities = SymbolTable(abilities, read_only)
+        self.items = SymbolTable(items, read_only)
+        self.types = SymbolTable(types, read_only)
+        self._base_species: List[int] = list(base_species)
+
+    @classmethod
+    def load(cls, path: str, read_only: bool = False) -> 'Dex':
+        """Loads a dex from a data file like the bundled one.
+
+        Arguments:
+            path: The location of the data file.
+            read_only: Whether new names are rejected instead of added.
+
+        Returns:
+            The loaded dex.
+        """
+        data = json.loads(pathlib.Path(path).read_text(encoding='utf-8'))
+        return cls(
+            data['species'],
+            data['base_species'],
+            data['moves'],
+            data['abilities'],
+            data['items'],
+            data['types'],
+            read_only
+        )
+
+    def copy(self) -> 'Dex':
+        """Copies the dex, e.g. to intern names outside the data file without adding them to this dex.
+
+        Returns:
+            A dex with the same IDs, which is never read-only.
+        """
+        return Dex(
+            self.species.names,
+            self._base_species,
+            self.moves.names,
+            self.abilities.names,
+            self.items.names,
+            self.types.names
+        )
+
+    def species_id(self, species: str) -> int:
+        """Resolves the ID of a species as it appears in a battle log or team, adding it if it is new.
+
+        Hidden forms such as Urshifu-* resolve to their base species.
+
+        Arguments:
+            species: The name of the species.
+
+        Returns:
+            The species ID.
+
+        Raises:
+            KeyError: If the species is new and the dex is read-only.
+        """
+        species_id = self.find_species_id(species)
+        if species_id is None:
+            species_id = self.species.id(species.removesuffix(_HIDDEN_FORM_SUFFIX))
+        return species_id
+
+    def find_species_id(self, species: str) -> Optional[int]:
+        """Resolves the ID of a species like species_id, without adding it.
+
+        Arguments:
+            species: The name of the species.
+
+        Returns:
+            The species ID or None if the species is not in the dex.
+        """
+        species_id = self.species.get(species)
+        if species_id is None:
+            species_id = self.species.get(species.removesuffix(_HIDDEN_FORM_SUFFIX))
+        return species_id
+
+    def base_species_id(self, species_id: int) -> int:
+        """Resolves the base species of a species, e.g. Ogerpon for Ogerpon-Hearthflame.
+
+        A species that is not in the data file is a form of the species named
+        by its text before the first '-' when that species is known, which is
+        how Showdown names forms.
+
+        Arguments:
+            species_id: The species ID.
+
+        Returns:
+            The ID of the base species, which is species_id for a base species.
+        """
+        base_species = self._base_species
+        if species_id < len(base_species):
+            return base_species[species_id]
+        for i in range(len(base_species), species_id + 1):
+            base_name, _, form = self.species.name(i).partition('-')
+            base_id = self.species.get(base_name) if form else None
+            if base_id is None:
+                base_id = i
+            elif base_id < i:
+                base_id = base_species[base_id]
+            base_species.append(base_id)
+        return base_species[species_id]
+
+    def base_species(self, species: str) -> str:
+        """Resolves the name of the base species of a species, without adding it to the dex.
+
+        Arguments:
+            species: The name of the species.
+
+        Returns:
+            The name of the base species.
+        """
+        species_id = self.find_species_id(species)
+        if species_id is not None:
+            return self.species.name(self.base_species_id(species_id))
+        species = species.removesuffix(_HIDDEN_FORM_SUFFIX)
+        base_name, _, form = species.partition('-')
+        base_id = self.species.get(base_name) if form else None
+        if base_id is None:
+            return species
+        return self.species.name(self.base_species_id(base_id))
+
+
+@functools.lru_cache(maxsize=None)
+def default_dex() -> Dex:
+    """Returns the process-wide read-only dex, loaded from the bundled data file on first use."""
+    return Dex.load(_DEX_FILE, read_only=True)
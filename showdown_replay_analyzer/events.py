@@ -0,0 +1,316 @@
+"""Columnar storage of the events of parsed Showdown replays
+
+Every switch, move, terastallization and faint of a replay is recorded as one
+row of a set of column arrays, so new questions about a corpus are answered
+with vectorized NumPy queries instead of parsing the battle logs again.
+
+Species, moves and Tera types are stored as IDs into a single name table.
+The columns can be saved as .npy files and loaded back memory-mapped.
+
+Example usage:
+
+    store = EventStore()
+    for replay_id, battle_log in battle_logs.items():
+        store.add_replay(battle_log, replay_id)
+    store.save('.out/events')
+
+    store = EventStore.load('.out/events')
+    print(store.move_usage(turn=1))
+"""
+import array
+import json
+import pathlib
+from typing import Dict, List, Mapping
+
+import numpy as np
+
+from .handlers import registered_handlers
+from .showdown import ShowdownReplay, parse_replay
+
+SWITCH = 0
+MOVE = 1
+TERASTALLIZE = 2
+FAINT = 3
+
+EVENT_TYPES = ('switch', 'move', 'terastallize', 'faint')
+
+# The columns of an event and their types once they are NumPy arrays.
+COLUMNS = {
+    'replay': np.int32,
+    'turn': np.int16,
+    'side': np.int8,
+    'slot': np.int8,
+    'event_type': np.int8,
+    'actor': np.int32,
+    'move': np.int32,
+    'target': np.int32,
+}
+
+# The ID of a missing move or target.
+NO_NAME = -1
+
+_NAMES_FILE = 'names.json'
+_REPLAY_IDS_FILE = 'replay_ids.json'
+
+
+class EventStore:
+    """The events of many replays in column arrays.
+
+    Each column is a NumPy array with one element per event:
+
+        replay: The index of the replay in replay_ids.
+        turn: The turn of the event, 0 for the leads sent out before turn 1.
+        side: 1 for Player 1 and 2 for Player 2.
+        slot: The position of the acting Pokemon, 0 for a and 1 for b.
+        event_type: One of SWITCH, MOVE, TERASTALLIZE or FAINT.
+        actor: The name ID of the species of the acting Pokemon.
+        move: The name ID of the move, or of the Tera type for terastallize events.
+        target: The name ID of the species of the targeted Pokemon.
+
+    Attributes:
+        names: The species, move and Tera type names by name ID.
+        replay_ids: The IDs of the recorded replays by replay index.
+    """
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.replay_ids: List[str] = []
+        self._name_ids: Dict[str, int] = {}
+        self._loaded: Dict[str, np.ndarray] = None
+        self._pending = {column: array.array('i') for column in COLUMNS}
+
+    def __len__(self) -> int:
+        pending = len(self._pending['replay'])
+        if self._loaded is None:
+            return pending
+        return len(self._loaded['replay']) + pending
+
+    def add_replay(self, battle_log: str, replay_id: str = None) -> ShowdownReplay:
+        """Parses a battle log and records its events.
+
+        Args:
+            battle_log: The raw battle log of the Showdown Replay.
+            replay_id: The ID of the replay, e.g. its file name. Defaults to its index.
+
+        Returns:
+            The parsed ShowdownReplay object
+        """
+        replay_index = len(self.replay_ids)
+        recorder = _EventRecorder(self, replay_index)
+        replay = parse_replay(battle_log, handlers=recorder.handlers())
+        self.replay_ids.append(str(replay_index) if replay_id is None else replay_id)
+        return replay
+
+    def name_id(self, name: str) -> int:
+        """Resolves the name ID of a species, move or Tera type.
+
+        Args:
+            name: The name.
+
+        Returns:
+            The name ID or NO_NAME if the name was never recorded.
+        """
+        return self._name_ids.get(name, NO_NAME)
+
+    def column(self, name: str) -> np.ndarray:
+        """Returns a column of every recorded event.
+
+        Args:
+            name: The name of the column, see COLUMNS.
+
+        Returns:
+            The column. It is memory-mapped if the store was loaded and nothing was added since.
+
+        Raises:
+            KeyError: If there is no column with this name.
+        """
+        pending = np.frombuffer(self._pending[name], dtype=np.int32).astype(COLUMNS[name])
+        if self._loaded is None:
+            return pending
+        if not pending.size:
+            return self._loaded[name]
+        return np.concatenate([self._loaded[name], pending])
+
+    def move_usage(self, turn: int = None) -> Dict[str, int]:
+        """Counts the uses of every move.
+
+        Args:
+            turn: Only count the moves used on this turn.
+
+        Returns:
+            The number of uses by move name, most used first.
+        """
+        mask = self.column('event_type') == MOVE
+        if turn is not None:
+            mask &= self.column('turn') == turn
+        return self._count_names(self.column('move')[mask])
+
+    def tera_turns(self) -> Dict[int, int]:
+        """Counts the terastallizations on each turn.
+
+        Returns:
+            The number of terastallizations by turn, in turn order.
+        """
+        turns = self.column('turn')[self.column('event_type') == TERASTALLIZE]
+        values, counts = np.unique(turns, return_counts=True)
+        return dict(zip(values.tolist(), counts.tolist()))
+
+    def save(self, path: str) -> None:
+        """Saves the columns as .npy files, with the name and replay ID tables, to a directory.
+
+        Args:
+            path: The directory to save the store to. It is created if needed.
+        """
+        directory = pathlib.Path(path)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in COLUMNS:
+            np.save(directory / f'{name}.npy', self.column(name))
+        (directory / _NAMES_FILE).write_text(json.dumps(self.names), encoding='utf8')
+        (directory / _REPLAY_IDS_FILE).write_text(json.dumps(self.replay_ids), encoding='utf8')
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'EventStore':
+        """Loads a store saved with save.
+
+        Args:
+            path: The directory the store was saved to.
+            mmap: Whether to memory-map the columns instead of reading them into memory.
+
+        Returns:
+            The loaded store. More replays can be added to it.
+        """
+        directory = pathlib.Path(path)
+        return cls.from_columns(
+            {
+                name: np.load(directory / f'{name}.npy', mmap_mode='r' if mmap else None)
+                for name in COLUMNS
+            },
+            json.loads((directory / _NAMES_FILE).read_text(encoding='utf8')),
+            json.loads((directory / _REPLAY_IDS_FILE).read_text(encoding='utf8'))
+        )
+
+    @classmethod
+    def from_columns(
+            cls,
+            columns: Mapping[str, np.ndarray],
+            names: List[str],
+            replay_ids: List[str]
+    ) -> 'EventStore':
+        """Creates a store from existing columns.
+
+        Args:
+            columns: An array for every column of COLUMNS, all of the same length.
+            names: The names by name ID.
+            replay_ids: The replay IDs by replay index.
+
+        Returns:
+            The store.
+
+        Raises:
+            ValueError: If a column is missing or the columns differ in length.
+        """
+        if set(columns) != set(COLUMNS) or len({len(column) for column in columns.values()}) != 1:
+            raise ValueError(f'Expected columns {list(COLUMNS)} of the same length')
+        store = cls()
+        store.names = list(names)
+        store.replay_ids = list(replay_ids)
+        store._name_ids = {name: name_id for name_id, name in enumerate(store.names)}
+        store._loaded = dict(columns)
+        return store
+
+    def _intern(self, name: str) -> int:
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = self._name_ids[name] = len(self.names)
+            self.names.append(name)
+        return name_id
+
+    def _count_names(self, name_ids: np.ndarray) -> Dict[str, int]:
+        counts = np.bincount(name_ids[name_ids != NO_NAME], minlength=len(self.names))
+        order = np.argsort(-counts, kind='stable')
+        return {
+            self.names[name_id]: count
+            for name_id, count in zip(order.tolist(), counts[order].tolist())
+            if count
+        }
+
+
+class _EventRecorder:
+    # Records the events of one replay by wrapping the registered handlers.
+    def __init__(self, store: EventStore, replay_index: int):
+        self._store = store
+        self._replay_index = replay_index
+        self._turn = 0
+        self._default_handlers = registered_handlers()
+
+    def handlers(self) -> dict:
+        """Returns the handlers by command, to pass to a ReplayParser."""
+        return {
+            'turn': self._handle_turn,
+            'switch': self._handle_switch,
+            'move': self._handle_move,
+            '-terastallize': self._handle_terastallize,
+            'faint': self._handle_faint,
+        }
+
+    def _handle_turn(self, _parser, command_parts: List[str]) -> None:
+        # |turn|number
+        self._turn = int(command_parts[2])
+
+    def _handle_switch(self, parser, command_parts: List[str]) -> None:
+        self._default_handlers['switch'](parser, command_parts)
+        self._record(parser, SWITCH, command_parts[2])
+
+    def _handle_move(self, parser, command_parts: List[str]) -> None:
+        self._default_handlers['move'](parser, command_parts)
+        target = command_parts[4] if len(command_parts) > 4 else ''
+        self._record(
+            parser,
+            MOVE,
+            command_parts[2],
+            self._store._intern(command_parts[3]),  # pylint: disable=protected-access
+            self._species_id(parser, target) if _is_position(target) else NO_NAME
+        )
+
+    def _handle_terastallize(self, parser, command_parts: List[str]) -> None:
+        self._default_handlers['-terastallize'](parser, command_parts)
+        self._record(
+            parser,
+            TERASTALLIZE,
+            command_parts[2],
+            self._store._intern(command_parts[3])  # pylint: disable=protected-access
+        )
+
+    def _handle_faint(self, parser, command_parts: List[str]) -> None:
+        # |faint|p1a: nickname
+        self._record(parser, FAINT, command_parts[2])
+
+    def _record(
+            self,
+            parser,
+            event_type: int,
+            position: str,
+            move: int = NO_NAME,
+            target: int = NO_NAME
+    ) -> None:
+        # position is 'p1a: nickname'
+        pending = self._store._pending  # pylint: disable=protected-access
+        pending['replay'].append(self._replay_index)
+        pending['turn'].append(self._turn)
+        pending['side'].append(int(position[1]))
+        pending['slot'].append(ord(position[2]) - ord('a'))
+        pending['event_type'].append(event_type)
+        pending['actor'].append(self._species_id(parser, position))
+        pending['move'].append(move)
+        pending['target'].append(target)
+
+    def _species_id(self, parser, position: str) -> int:
+        pokemon = parser.team(position[:2]).find_by_nickname(position[5:])
+        if pokemon is None:
+            return NO_NAME
+        return self._store._intern(pokemon.species)  # pylint: disable=protected-access
+
+
+def _is_position(value: str) -> bool:
+    # 'p2a: nickname'
+    return len(value) > 5 and value[0] == 'p' and value[3:5] == ': '
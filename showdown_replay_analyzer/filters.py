@@ -0,0 +1,258 @@
+"""Composable replay filters evaluated while a battle log is parsed
+
+A filter is a set of conditions on the players, teams, Open Team Sheets and
+format of a replay, compiled to frozensets. A ReplayParser given a filter
+checks each condition as soon as the battle log has revealed what it needs,
+the players on the |player| lines, the teams after the showteam or poke lines,
+and abandons a rejected replay right away instead of parsing the rest of it.
+
+Example usage:
+
+    replay_filter = player_not_in('spammer') & team_lacks('Flutter Mane', players=['ironpumpernickel'])
+    replay = parse_replay(battle_log, replay_filter=replay_filter)  # None if rejected
+"""
+import dataclasses
+import re
+from typing import TYPE_CHECKING, FrozenSet, Iterable, Optional, Tuple
+
+from .pokemon import Team
+
+if TYPE_CHECKING:
+    from .showdown import ShowdownReplay
+
+_NON_ID_CHARACTERS = re.compile(r'[^a-z0-9]')
+_TIER_LINE = re.compile(r'^[^|\n]*\|tier\|([^\n]*)', re.MULTILINE)
+
+# A team condition is the species and the players whose teams are checked,
+# None for both teams.
+_TeamCondition = Tuple[FrozenSet[str], Optional[FrozenSet[str]]]
+
+
+class ReplayRejected(Exception):
+    """Raised by a ReplayParser when its filter rejects the replay being parsed."""
+
+
+@dataclasses.dataclass(frozen=True)
+class ReplayFilter:
+    """Conditions a replay must meet, combined with &.
+
+    Create filters with player_in, player_not_in, team_has, team_lacks, ots
+    and format_in rather than directly.
+
+    Attributes:
+        players: Sets of names, one of the two players must be in each.
+        excluded_players: Names neither player may have.
+        species: The species and players of team_has conditions.
+        excluded_species: The species and players of team_lacks conditions.
+        is_ots: Whether the replay must use Open Team Sheets, None for either.
+        formats: Sets of format IDs the format of the replay must be in.
+    """
+    players: Tuple[FrozenSet[str], ...] = ()
+    excluded_players: FrozenSet[str] = frozenset()
+    species: Tuple[_TeamCondition, ...] = ()
+    excluded_species: Tuple[_TeamCondition, ...] = ()
+    is_ots: bool = None
+    formats: Tuple[FrozenSet[str], ...] = ()
+
+    def __and__(self, other: 'ReplayFilter') -> 'ReplayFilter':
+        if self.is_ots is not None and other.is_ots is not None and self.is_ots != other.is_ots:
+            raise ValueError('A filter cannot require both OTS and non-OTS replays')
+        return ReplayFilter(
+            players=self.players + other.players,
+            excluded_players=self.excluded_players | other.excluded_players,
+            species=self.species + other.species,
+            excluded_species=self.excluded_species + other.excluded_species,
+            is_ots=self.is_ots if self.is_ots is not None else other.is_ots,
+            formats=self.formats + other.formats
+        )
+
+    def accepts_players(self, player1: str, player2: str) -> bool:
+        """Checks the player conditions.
+
+        Args:
+            player1: The name of Player 1.
+            player2: The name of Player 2.
+
+        Returns:
+            Whether the players meet every player condition.
+        """
+        if player1 in self.excluded_players or player2 in self.excluded_players:
+            return False
+        return all(player1 in names or player2 in names for names in self.players)
+
+    def accepts_teams(self, player1: str, team1: Team, player2: str, team2: Team) -> bool:
+        """Checks the team conditions.
+
+        Args:
+            player1: The name of Player 1.
+            team1: The team of Player 1.
+            player2: The name of Player 2.
+            team2: The team of Player 2.
+
+        Returns:
+            Whether the teams meet every team condition.
+        """
+        if not self.species and not self.excluded_species:
+            return True
+        teams = (
+            (player1, {pokemon.species for pokemon in team1.pokemon}),
+            (player2, {pokemon.species for pokemon in team2.pokemon}),
+        )
+        for species, players in self.excluded_species:
+            for player, team_species in teams:
+                if (players is None or player in players) and not species.isdisjoint(team_species):
+                    return False
+        for species, players in self.species:
+            if not any(
+                    (players is None or player in players) and species <= team_species
+                    for player, team_species in teams):
+                return False
+        return True
+
+    def accepts_ots(self, is_ots: bool) -> bool:
+        """Checks the Open Team Sheets condition.
+
+        Args:
+            is_ots: Whether the replay uses Open Team Sheets.
+
+        Returns:
+            Whether the replay meets the condition.
+        """
+        return self.is_ots is None or self.is_ots == is_ots
+
+    def accepts_format(self, format_name: str) -> bool:
+        """Checks the format conditions.
+
+        Args:
+            format_name: The format of the replay, as a name or an ID, or
+                None if the battle log has no |tier| line.
+
+        Returns:
+            Whether the format meets every format condition.
+        """
+        if not self.formats:
+            return True
+        format_id = to_id(format_name) if format_name is not None else None
+        return all(format_id in format_ids for format_ids in self.formats)
+
+    def accepts(self, replay: 'ShowdownReplay', format_name: str = None) -> bool:
+        """Checks every condition against a replay that is already parsed.
+
+        Args:
+            replay: The parsed replay.
+            format_name: The format of the replay, see battle_format.
+
+        Returns:
+            Whether the replay meets every condition.
+        """
+        player1_info, player2_info = replay.player1_info, replay.player2_info
+        return self.accepts_players(player1_info.player_name, player2_info.player_name) \
+            and self.accepts_teams(
+                player1_info.player_name, player1_info.team,
+                player2_info.player_name, player2_info.team
+            ) \
+            and self.accepts_ots(replay.is_ots) \
+            and self.accepts_format(format_name)
+
+
+def player_in(*names: str) -> ReplayFilter:
+    """Keeps replays where one of the players has one of the names.
+
+    Args:
+        *names: The player names.
+
+    Returns:
+        The filter.
+    """
+    return ReplayFilter(players=(frozenset(names),))
+
+
+def player_not_in(*names: str) -> ReplayFilter:
+    """Drops replays where either player has one of the names.
+
+    Args:
+        *names: The player names.
+
+    Returns:
+        The filter.
+    """
+    return ReplayFilter(excluded_players=frozenset(names))
+
+
+def team_has(*species: str, players: Iterable[str] = None) -> ReplayFilter:
+    """Keeps replays where a team has every one of the species.
+
+    Args:
+        *species: The species, as they appear in team preview or the team sheets.
+        players: Only check the teams of these players, or both teams if None.
+
+    Returns:
+        The filter.
+    """
+    return ReplayFilter(species=((frozenset(species), _players(players)),))
+
+
+def team_lacks(*species: str, players: Iterable[str] = None) -> ReplayFilter:
+    """Drops replays where a team has any of the species.
+
+    Args:
+        *species: The species, as they appear in team preview or the team sheets.
+        players: Only check the teams of these players, or both teams if None.
+
+    Returns:
+        The filter.
+    """
+    return ReplayFilter(excluded_species=((frozenset(species), _players(players)),))
+
+
+def ots(is_ots: bool = True) -> ReplayFilter:
+    """Keeps replays that use Open Team Sheets, or that do not.
+
+    Args:
+        is_ots: Whether to keep OTS replays or non-OTS replays.
+
+    Returns:
+        The filter.
+    """
+    return ReplayFilter(is_ots=is_ots)
+
+
+def format_in(*formats: str) -> ReplayFilter:
+    """Keeps replays of one of the formats.
+
+    Args:
+        *formats: Format names such as [Gen 9] VGC 2024 Reg F, or IDs such as gen9vgc2024regf.
+
+    Returns:
+        The filter.
+    """
+    return ReplayFilter(formats=(frozenset(to_id(battle_format) for battle_format in formats),))
+
+
+def to_id(name: str) -> str:
+    """Converts a name to a Showdown ID, e.g. [Gen 9] VGC 2024 Reg F to gen9vgc2024regf.
+
+    Args:
+        name: The name.
+
+    Returns:
+        The lowercase letters and digits of the name.
+    """
+    return _NON_ID_CHARACTERS.sub('', name.lower())
+
+
+def battle_format(battle_log: str) -> str:
+    """Finds the format of a battle log from its |tier| line.
+
+    Args:
+        battle_log: The raw battle log.
+
+    Returns:
+        The format name, or None if the battle log has no |tier| line.
+    """
+    match = _TIER_LINE.search(battle_log)
+    return match.group(1).rstrip('\r') if match else None
+
+
+def _players(players: Iterable[str]) -> Optional[FrozenSet[str]]:
+    return frozenset(players) if players is not None else None
@@ -0,0 +1,79 @@
+"""The registry of battle log command handlers used by ReplayParser
+
+A handler is called with the parser and the parts of a battle log line split
+on '|', so command_parts[1] is the command. The showdown module registers the
+built-in handlers when it is imported. Parsers created afterwards use every
+registered handler, and skip the lines of commands without one before they
+are split.
+
+Example usage:
+
+    def count_faints(parser, command_parts):
+        faints[parser.team(command_parts[2][:2])] += 1
+
+    register_handler('faint', count_faints)
+"""
+import functools
+import re
+from typing import TYPE_CHECKING, Callable, Dict, List, Tuple
+
+if TYPE_CHECKING:
+    from .showdown import ReplayParser
+
+ReplayLineHandler = Callable[['ReplayParser', List[str]], None]
+
+_HANDLERS: Dict[str, ReplayLineHandler] = {}
+
+
+def register_handler(command: str, handler: ReplayLineHandler) -> None:
+    """Registers the handler of a battle log command for parsers created afterwards.
+
+    Registering a built-in command replaces its handler.
+
+    Args:
+        command: The command, e.g. faint for |faint|p1a: nickname lines.
+        handler: The handler of the command's lines.
+    """
+    _HANDLERS[command] = handler
+
+
+def registered_handlers() -> Dict[str, ReplayLineHandler]:
+    """Returns the registered handlers by command.
+
+    Custom handlers can wrap these to run their own code around the built-in
+    handling of a command.
+
+    Returns:
+        A copy of the registered handlers by command.
+    """
+    return dict(_HANDLERS)
+
+
+@functools.lru_cache(maxsize=64)
+def compile_line_patterns(
+    commands: frozenset,
+    binary: bool = False
+) -> Tuple[re.Pattern, re.Pattern]:
+    """Compiles the regular expressions that find the lines of some commands.
+
+    Args:
+        commands: The commands with a handler.
+        binary: Whether to match UTF-8 encoded bytes instead of text.
+
+    Returns:
+        A pattern matching the first line of a battle log if it has one of the
+        commands, and a pattern matching a newline followed by such a line,
+        which captures the line.
+    """
+    # The command is the text between the first two '|'. The second pattern
+    # starts with a literal newline so the regular expression engine only
+    # tries to match at the start of lines.
+    alternatives = '|'.join(
+        re.escape(command)
+        for command in sorted(commands, key=len, reverse=True)
+    )
+    line = rf'[^|\n]*\|(?:{alternatives})(?=[|\n]|\Z)[^\n]*'
+    next_lines = rf'\n({line})'
+    if binary:
+        return re.compile(line.encode('utf8')), re.compile(next_lines.encode('utf8'))
+    return re.compile(line), re.compile(next_lines)
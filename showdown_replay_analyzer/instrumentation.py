@@ -0,0 +1,287 @@
+"""Low-overhead timers and counters for the stages of an analysis
+
+A Profile records the wall-clock time, calls and items of each stage of the
+pipeline, such as walking the replay directory, extracting battle logs and
+parsing them, together with event counters. ReplayParsers created while a
+profile is active count every command they handle, e.g. parser.move.
+
+Profiling is off by default. The module-level current profile is then a
+NullProfile whose stages and counters do nothing, so instrumented code does
+not need to check whether profiling is enabled.
+
+Example usage:
+
+    with profiling() as profile:
+        with current().stage('parse'):
+            replay = parse_replay(battle_log)
+    print(profile.summary())
+    profile.save('.out/profile.json', parser_version=PARSER_VERSION)
+"""
+import collections
+import contextlib
+import json
+import pathlib
+import platform
+import time
+from typing import Callable, Dict, Iterator, List, Mapping
+
+# Bump whenever the layout of to_json changes.
+PROFILE_VERSION = 1
+
+_STAGE_HEADER = ['stage', 'calls', 'items', 'seconds', '% of wall', 'us/item']
+_COUNTER_HEADER = ['counter', 'count']
+
+
+class _Stage:
+    # A reusable context manager that adds the time spent in it to a stage.
+
+    __slots__ = ('_totals', '_items', '_start')
+
+    def __init__(self, totals: List[int], items: int):
+        self._totals = totals
+        self._items = items
+        self._start = 0
+
+    def __enter__(self) -> None:
+        self._start = time.perf_counter_ns()
+
+    def __exit__(self, *exc_info) -> None:
+        totals = self._totals
+        totals[0] += 1
+        totals[1] += self._items
+        totals[2] += time.perf_counter_ns() - self._start
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Profile:
+    """The time spent in each stage of a run and counts of events.
+
+    Stages may be nested, in which case the time of the inner stage is also
+    part of the time of the outer stage.
+
+    Attributes:
+        enabled: Whether the profile records anything.
+        stages: The calls, items and nanoseconds of each stage, by name, in the
+            order the stages were first entered.
+        counters: The count of each event by name.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.stages: Dict[str, List[int]] = {}
+        self.counters: collections.Counter = collections.Counter()
+        self._started = time.perf_counter_ns()
+
+    def stage(self, name: str, items: int = 1) -> contextlib.AbstractContextManager:
+        """Times a stage.
+
+        Args:
+            name: The name of the stage.
+            items: The number of items, such as replays or files, processed in the stage.
+
+        Returns:
+            A context manager that adds the time spent in it to the stage.
+        """
+        totals = self.stages.get(name)
+        if totals is None:
+            totals = self.stages[name] = [0, 0, 0]
+        return _Stage(totals, items)
+
+    def add_time(self, name: str, nanoseconds: int, items: int = 1) -> None:
+        """Adds time measured elsewhere to a stage.
+
+        Args:
+            name: The name of the stage.
+            nanoseconds: The time spent in the stage.
+            items: The number of items processed in the stage.
+        """
+        totals = self.stages.setdefault(name, [0, 0, 0])
+        totals[0] += 1
+        totals[1] += items
+        totals[2] += nanoseconds
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """Increments a counter.
+
+        Args:
+            name: The name of the counter.
+            amount: The amount to add to it.
+        """
+        self.counters[name] += amount
+
+    def counting_handlers(self, handlers: Mapping[str, Callable]) -> Dict[str, Callable]:
+        """Wraps ReplayParser handlers to count the lines of each command.
+
+        Args:
+            handlers: Handlers by command.
+
+        Returns:
+            Handlers by command that increment the parser.<command> counter
+            before calling the wrapped handler.
+        """
+        return {
+            command: _counting_handler(self.counters, f'parser.{command}', handler)
+            for command, handler in handlers.items()
+        }
+
+    def merge(self, other: 'Profile') -> None:
+        """Adds the stages and counters of another profile, e.g. of a worker process.
+
+        Args:
+            other: The profile to add.
+        """
+        for name, (calls, items, nanoseconds) in other.stages.items():
+            totals = self.stages.setdefault(name, [0, 0, 0])
+            totals[0] += calls
+            totals[1] += items
+            totals[2] += nanoseconds
+        self.counters.update(other.counters)
+
+    def wall_time(self) -> float:
+        """Returns the seconds since the profile was created."""
+        return (time.perf_counter_ns() - self._started) / 1e9
+
+    def summary(self) -> str:
+        """Formats the stages and counters as plain text tables.
+
+        Returns:
+            The stages in the order they were first entered, then the counters
+            from most to least frequent.
+        """
+        wall_time = self.wall_time()
+        stage_rows = [_STAGE_HEADER]
+        for name, (calls, items, nanoseconds) in self.stages.items():
+            seconds = nanoseconds / 1e9
+            stage_rows.append([
+                name,
+                str(calls),
+                str(items),
+                f'{seconds:.3f}',
+                f'{100 * seconds / wall_time:.1f}' if wall_time else '-',
+                f'{nanoseconds / items / 1e3:.1f}' if items else '-'
+            ])
+        counter_rows = [_COUNTER_HEADER] + [
+            [name, str(count)]
+            for name, count in self.counters.most_common()
+        ]
+        return '\n'.join([
+            f'wall time: {wall_time:.3f} s',
+            '',
+            _format_table(stage_rows),
+            '',
+            _format_table(counter_rows)
+        ])
+
+    def to_json(self, parser_version: int = None) -> dict:
+        """Converts the profile to JSON-serializable data to compare runs.
+
+        Args:
+            parser_version: The version of the parser that was profiled, e.g.
+                showdown.PARSER_VERSION, or None if unknown.
+
+        Returns:
+            The stages with their calls, items and seconds, the counters, the
+            wall time and the versions of Python and of the parser.
+        """
+        return {
+            'version': PROFILE_VERSION,
+            'parser_version': parser_version,
+            'python_version': platform.python_version(),
+            'wall_seconds': self.wall_time(),
+            'stages': {
+                name: {'calls': calls, 'items': items, 'seconds': nanoseconds / 1e9}
+                for name, (calls, items, nanoseconds) in self.stages.items()
+            },
+            'counters': dict(self.counters.most_common()),
+        }
+
+    def save(self, path: str, parser_version: int = None) -> None:
+        """Saves the profile as a JSON file.
+
+        Args:
+            path: The location of the file. Its directory is created if needed.
+            parser_version: The version of the parser that was profiled, see to_json.
+        """
+        profile_file = pathlib.Path(path)
+        profile_file.parent.mkdir(parents=True, exist_ok=True)
+        profile_file.write_text(json.dumps(self.to_json(parser_version), indent=2), encoding='utf-8')
+
+
+class NullProfile(Profile):
+    """A profile that records nothing, current while profiling is disabled."""
+
+    enabled = False
+
+    def stage(self, name: str, items: int = 1) -> contextlib.AbstractContextManager:
+        return _NULL_STAGE
+
+    def add_time(self, name: str, nanoseconds: int, items: int = 1) -> None:
+        pass
+
+    def count(self, name: str, amount: int = 1) -> None:
+        pass
+
+    def counting_handlers(self, handlers: Mapping[str, Callable]) -> Dict[str, Callable]:
+        return dict(handlers)
+
+    def merge(self, other: Profile) -> None:
+        pass
+
+
+_NULL_PROFILE = NullProfile()
+_current: Profile = _NULL_PROFILE
+
+
+def current() -> Profile:
+    """Returns the active profile, or a NullProfile if profiling is disabled."""
+    return _current
+
+
+@contextlib.contextmanager
+def profiling(profile: Profile = None) -> Iterator[Profile]:
+    """Makes a profile the active profile of this process while the block runs.
+
+    Args:
+        profile: The profile to record to, or None for a new profile.
+
+    Yields:
+        The active profile.
+    """
+    global _current  # pylint: disable=global-statement
+    previous = _current
+    _current = profile if profile is not None else Profile()
+    try:
+        yield _current
+    finally:
+        _current = previous
+
+
+def _counting_handler(counters: collections.Counter, name: str, handler: Callable) -> Callable:
+    def count_and_handle(parser, command_parts):
+        counters[name] += 1
+        return handler(parser, command_parts)
+    return count_and_handle
+
+
+def _format_table(rows: List[List[str]]) -> str:
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return '\n'.join(
+        '  '.join(
+            cell.ljust(width) if i == 0 else cell.rjust(width)
+            for i, (cell, width) in enumerate(zip(row, widths))
+        ).rstrip()
+        for row in rows
+    )
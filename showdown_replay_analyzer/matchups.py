@@ -0,0 +1,264 @@
+"""Species versus species matchup matrices
+
+For every game, each species of a player is matched against each species of
+the opponent. The games and wins of a species against another are the sums
+of the outer products of the two sides' species indicator vectors over the
+games. The nonzero cells of the outer products of many games are expanded
+at once with NumPy and summed with bincount, instead of looping over the
+pairs of species in Python.
+
+Example usage:
+
+    matchups = MatchupMatrix(selection='lead')
+    for replay in replays:
+        matchups.add_replay(replay)
+    win_rates = matchups.win_rates()
+    matchups.save('.out/lead-matchups')
+"""
+import csv
+import io
+import json
+import pathlib
+from typing import List, Tuple
+
+import numpy as np
+
+from .cores import SELECTIONS
+from .dex import SymbolTable
+from .showdown import PlayerInfo, ShowdownReplay
+
+# The number of games whose species pairs are expanded at a time.
+_CHUNK_GAMES = 1 << 16
+
+_SPECIES_FILE = 'species.json'
+_CSV_HEADER = ['species', 'opponent_species', 'games', 'wins', 'win_rate']
+
+
+class MatchupMatrix:
+    """The games and wins of every species against every opposing species.
+
+    Row i and column j of the matrices are the games of species i against
+    opposing species j, both indexed by the species IDs of the species table.
+
+    Attributes:
+        selection: Which Pokemon of a team are matched, one of cores.SELECTIONS.
+        species: The species by ID.
+    """
+
+    def __init__(self, selection: str = 'team'):
+        """Creates an empty matchup matrix.
+
+        Arguments:
+            selection: team to match every Pokemon in team preview, brought
+                to match the Pokemon brought to the battle or lead to match
+                the leads.
+
+        Raises:
+            ValueError: If selection is unknown.
+        """
+        if selection not in SELECTIONS:
+            raise ValueError(f'Unknown selection {selection!r}, expected one of {SELECTIONS}')
+        self.selection = selection
+        self.species = SymbolTable()
+        self._games = np.zeros((0, 0), dtype=np.int64)
+        self._wins = np.zeros((0, 0), dtype=np.int64)
+        self._counted_games = 0
+        # The games added since the matrices were last counted, as the game
+        # and species ID of every selected Pokemon of each side.
+        self._player_games: List[int] = []
+        self._player_species: List[int] = []
+        self._opponent_games: List[int] = []
+        self._opponent_species: List[int] = []
+        self._winners: List[bool] = []
+
+    def __len__(self) -> int:
+        return self._counted_games + len(self._winners)
+
+    def add(self, player_info: PlayerInfo, opponent_info: PlayerInfo) -> None:
+        """Adds a game from the point of view of one player.
+
+        Arguments:
+            player_info: The player whose species are the rows.
+            opponent_info: The opponent whose species are the columns.
+        """
+        game = len(self._winners)
+        for species in self._selected_species(player_info):
+            self._player_games.append(game)
+            self._player_species.append(species)
+        for species in self._selected_species(opponent_info):
+            self._opponent_games.append(game)
+            self._opponent_species.append(species)
+        self._winners.append(player_info.is_winner)
+
+    def add_replay(self, replay: ShowdownReplay) -> None:
+        """Adds a game from the point of view of both players.
+
+        Arguments:
+            replay: The parsed replay.
+        """
+        self.add(replay.player1_info, replay.player2_info)
+        self.add(replay.player2_info, replay.player1_info)
+
+    def games(self) -> np.ndarray:
+        """Counts the games of every species against every opposing species.
+
+        Returns:
+            A square int64 matrix with a row and a column per species.
+        """
+        return self._count()[0]
+
+    def wins(self) -> np.ndarray:
+        """Counts the games won by every species against every opposing species.
+
+        Returns:
+            A square int64 matrix with a row and a column per species.
+        """
+        return self._count()[1]
+
+    def win_rates(self) -> np.ndarray:
+        """Computes the win rate of every species against every opposing species.
+
+        Returns:
+            A square float64 matrix with a row and a column per species,
+            NaN where the species never met.
+        """
+        games, wins = self._count()
+        rates = np.full(games.shape, np.nan)
+        np.divide(wins, games, out=rates, where=games > 0)
+        return rates
+
+    def save(self, path: str) -> None:
+        """Saves the games and wins as .npy files, with the species table, to a directory.
+
+        Arguments:
+            path: The directory to save the matrices to. It is created if needed.
+        """
+        directory = pathlib.Path(path)
+        directory.mkdir(parents=True, exist_ok=True)
+        games, wins = self._count()
+        np.save(directory / 'games.npy', games)
+        np.save(directory / 'wins.npy', wins)
+        (directory / _SPECIES_FILE).write_text(
+            json.dumps({'selection': self.selection, 'species': self.species.names, 'games': len(self)}),
+            encoding='utf8'
+        )
+
+    @classmethod
+    def load(cls, path: str) -> 'MatchupMatrix':
+        """Loads matrices saved with save.
+
+        Arguments:
+            path: The directory the matrices were saved to.
+
+        Returns:
+            The loaded matchup matrix. More games can be added to it.
+        """
+        directory = pathlib.Path(path)
+        metadata = json.loads((directory / _SPECIES_FILE).read_text(encoding='utf8'))
+        matchups = cls(metadata['selection'])
+        matchups.species = SymbolTable(metadata['species'])
+        matchups._games = np.load(directory / 'games.npy')
+        matchups._wins = np.load(directory / 'wins.npy')
+        matchups._counted_games = metadata['games']
+        return matchups
+
+    def write_csv(self, out_csv: io.TextIOWrapper, min_games: int = 1) -> None:
+        """Writes the matchups that were played, one per row, most played first.
+
+        Arguments:
+            out_csv: The file to write to.
+            min_games: Leave out matchups with fewer games.
+        """
+        games, wins = self._count()
+        rows, columns = np.nonzero(games >= max(min_games, 1))
+        played = games[rows, columns]
+        order = np.argsort(-played, kind='stable')
+        writer = csv.writer(out_csv, lineterminator='\n')
+        writer.writerow(_CSV_HEADER)
+        for row, column, count, won in zip(
+                rows[order].tolist(),
+                columns[order].tolist(),
+                played[order].tolist(),
+                wins[rows, columns][order].tolist()):
+            writer.writerow([
+                self.species.name(row),
+                self.species.name(column),
+                count,
+                won,
+                f'{won / count:.4f}'
+            ])
+
+    def _selected_species(self, player_info: PlayerInfo) -> List[int]:
+        species_id = self.species.id
+        if self.selection == 'team':
+            return [species_id(p.species) for p in player_info.team.pokemon]
+        if self.selection == 'lead':
+            return [species_id(p.species) for p in player_info.team.pokemon if p.was_lead]
+        return [species_id(p.species) for p in player_info.team.pokemon if p.was_brought]
+
+    def _count(self) -> Tuple[np.ndarray, np.ndarray]:
+        # Adds the games added since the last count to the matrices.
+        species_count = len(self.species)
+        if not self._winners and len(self._games) == species_count:
+            return self._games, self._wins
+        games = np.zeros((species_count, species_count), dtype=np.int64)
+        wins = np.zeros((species_count, species_count), dtype=np.int64)
+        counted = len(self._games)
+        games[:counted, :counted] = self._games
+        wins[:counted, :counted] = self._wins
+
+        player_games = np.array(self._player_games, dtype=np.int64)
+        player_species = np.array(self._player_species, dtype=np.int64)
+        opponent_games = np.array(self._opponent_games, dtype=np.int64)
+        opponent_species = np.array(self._opponent_species, dtype=np.int64)
+        winners = np.array(self._winners, dtype=bool)
+        for start in range(0, len(winners), _CHUNK_GAMES):
+            end = min(start + _CHUNK_GAMES, len(winners))
+            first, last = np.searchsorted(player_games, [start, end])
+            opponent_first, opponent_last = np.searchsorted(opponent_games, [start, end])
+            rows, columns, chunk_games = _pairs(
+                player_games[first:last] - start,
+                player_species[first:last],
+                opponent_games[opponent_first:opponent_last] - start,
+                opponent_species[opponent_first:opponent_last],
+                end - start
+            )
+            cells = rows * species_count + columns
+            size = species_count * species_count
+            games += np.bincount(cells, minlength=size).reshape(games.shape)
+            wins += np.bincount(
+                cells[winners[start:end][chunk_games]],
+                minlength=size
+            ).reshape(wins.shape)
+
+        self._games = games
+        self._wins = wins
+        self._counted_games += len(winners)
+        self._player_games.clear()
+        self._player_species.clear()
+        self._opponent_games.clear()
+        self._opponent_species.clear()
+        self._winners.clear()
+        return games, wins
+
+
+def _pairs(
+        player_games: np.ndarray,
+        player_species: np.ndarray,
+        opponent_games: np.ndarray,
+        opponent_species: np.ndarray,
+        game_count: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Pairs every species of a player with every species of the opponent in
+    # the same game, which are the nonzero cells of the outer product of the
+    # two sides' species indicator vectors. Returns the player's species, the
+    # opponent's species and the game of every pair.
+    opponent_counts = np.bincount(opponent_games, minlength=game_count)
+    opponent_starts = np.cumsum(opponent_counts) - opponent_counts
+    # Each species of a player is repeated once per opposing species.
+    repeats = opponent_counts[player_games]
+    pair_players = np.repeat(np.arange(len(player_games)), repeats)
+    run_starts = np.cumsum(repeats) - repeats
+    offsets = np.arange(len(pair_players)) - np.repeat(run_starts, repeats)
+    pair_opponents = opponent_starts[player_games[pair_players]] + offsets
+    return player_species[pair_players], opponent_species[pair_opponents], player_games[pair_players]
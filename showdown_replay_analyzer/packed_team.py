@@ -0,0 +1,169 @@
+"""Decode Pokemon Showdown's packed team format.
+
+A packed team is a ']'-separated list of Pokemon, each made of '|'-separated
+fields:
+
+    NICKNAME|SPECIES|ITEM|ABILITY|MOVES|NATURE|EVS|GENDER|IVS|SHINY|LEVEL|HAPPINESS,HIDDENPOWERTYPE,POKEBALL,GIGANTAMAX,DYNAMAXLEVEL,TERATYPE
+
+It is the format of the showteam command of battle logs with Open Team Sheets.
+
+Example usage:
+
+    for packed_pokemon in unpack_team(packed_team):
+        print(packed_pokemon.species, packed_pokemon.item, packed_pokemon.tera_type)
+"""
+import dataclasses
+from typing import Iterator, List, Tuple
+
+_BLANK_EVS = (0, 0, 0, 0, 0, 0)
+_BLANK_IVS = (31, 31, 31, 31, 31, 31)
+_DEFAULT_LEVEL = 100
+_DEFAULT_HAPPINESS = 255
+_DEFAULT_DYNAMAX_LEVEL = 10
+_BLANK_MISC = ['', '', '', '', '', '']
+
+
+@dataclasses.dataclass(slots=True)
+class PackedPokemon:
+    """A Pokemon decoded from a packed team.
+
+    Text fields keep the IDs used by the packed format, e.g. FocusSash or
+    ShadowBall, and are empty strings when left blank.
+
+    Attributes:
+        nickname: The nickname of the Pokemon
+        species: The species of the Pokemon, which is the nickname when left blank
+        item: The held item of the Pokemon
+        ability: The ability of the Pokemon
+        moves: The moves of the Pokemon
+        nature: The nature of the Pokemon
+        evs: The HP, Atk, Def, SpA, SpD and Spe EVs of the Pokemon
+        gender: The gender of the Pokemon, M, F or blank
+        ivs: The HP, Atk, Def, SpA, SpD and Spe IVs of the Pokemon
+        shiny: Whether the Pokemon is shiny
+        level: The level of the Pokemon
+        happiness: The happiness of the Pokemon
+        hidden_power_type: The Hidden Power type of the Pokemon
+        pokeball: The Poke Ball of the Pokemon
+        gigantamax: Whether the Pokemon can Gigantamax
+        dynamax_level: The Dynamax level of the Pokemon
+        tera_type: The Tera type of the Pokemon
+    """
+    nickname: str
+    species: str
+    item: str = ''
+    ability: str = ''
+    moves: List[str] = dataclasses.field(default_factory=list)
+    nature: str = ''
+    evs: Tuple[int, ...] = _BLANK_EVS
+    gender: str = ''
+    ivs: Tuple[int, ...] = _BLANK_IVS
+    shiny: bool = False
+    level: int = _DEFAULT_LEVEL
+    happiness: int = _DEFAULT_HAPPINESS
+    hidden_power_type: str = ''
+    pokeball: str = ''
+    gigantamax: bool = False
+    dynamax_level: int = _DEFAULT_DYNAMAX_LEVEL
+    tera_type: str = ''
+
+
+def unpack_team(packed_team: str, start: int = 0) -> List[PackedPokemon]:
+    """Decodes a packed team.
+
+    Arguments:
+        packed_team: The text containing the packed team.
+        start: The offset of the packed team in the text.
+
+    Returns:
+        The Pokemon of the packed team in order.
+
+    Raises:
+        ValueError: If the packed team is malformed.
+    """
+    return list(iter_packed_team(packed_team, start))
+
+
+def iter_packed_team(packed_team: str, start: int = 0) -> Iterator[PackedPokemon]:
+    """Decodes a packed team one Pokemon at a time.
+
+    The team is split into its '|'-separated fields once and then walked by
+    index, without slicing. Only the field shared by the misc values of one
+    Pokemon and the nickname of the next is split again.
+
+    Arguments:
+        packed_team: The text containing the packed team.
+        start: The offset of the packed team in the text.
+
+    Returns:
+        An iterator of the Pokemon of the packed team in order.
+
+    Raises:
+        ValueError: If the packed team is malformed.
+    """
+    if start >= len(packed_team):
+        return iter(())
+    fields = packed_team[start:].split('|') if start else packed_team.split('|')
+    return iter_packed_fields(fields)
+
+
+def iter_packed_fields(fields: List[str], first: int = 0) -> Iterator[PackedPokemon]:
+    """Decodes a packed team that has already been split on '|'.
+
+    This avoids joining the fields of a split showteam line back together.
+
+    Arguments:
+        fields: The fields of the packed team.
+        first: The index of the nickname of the first Pokemon.
+
+    Returns:
+        An iterator of the Pokemon of the packed team in order.
+
+    Raises:
+        ValueError: If the packed team is malformed.
+    """
+    # Every Pokemon has 12 fields and shares its last one with the next Pokemon.
+    count = len(fields)
+    if (count - first) % 11 != 1:
+        raise ValueError(f'Malformed packed team: {'|'.join(fields[first:])!r}')
+    return _iter_packed_fields(fields, first, count)
+
+
+def _iter_packed_fields(fields: List[str], first: int, count: int) -> Iterator[PackedPokemon]:
+    nickname = fields[first]
+    for i in range(first + 1, count - 1, 11):
+        misc, _, next_nickname = fields[i + 10].partition(']')
+        if bool(next_nickname) != (i + 11 < count):
+            raise ValueError(f'Malformed packed team: {'|'.join(fields[first:])!r}')
+        moves = fields[i + 3]
+        evs = fields[i + 5]
+        ivs = fields[i + 7]
+        level = fields[i + 9]
+        misc_values = misc.split(',')
+        if len(misc_values) != 6:
+            misc_values = (misc_values + _BLANK_MISC)[:6] if misc else _BLANK_MISC
+        happiness, hidden_power_type, pokeball, gigantamax, dynamax_level, tera_type = misc_values
+        yield PackedPokemon(
+            nickname,
+            fields[i] or nickname,
+            fields[i + 1],
+            fields[i + 2],
+            moves.split(',') if moves else [],
+            fields[i + 4],
+            _unpack_stats(evs, 0) if evs else _BLANK_EVS,
+            fields[i + 6],
+            _unpack_stats(ivs, 31) if ivs else _BLANK_IVS,
+            fields[i + 8] == 'S',
+            int(level) if level else _DEFAULT_LEVEL,
+            int(happiness) if happiness else _DEFAULT_HAPPINESS,
+            hidden_power_type,
+            pokeball,
+            gigantamax == 'G',
+            int(dynamax_level) if dynamax_level else _DEFAULT_DYNAMAX_LEVEL,
+            tera_type
+        )
+        nickname = next_nickname
+
+
+def _unpack_stats(stats: str, default: int) -> Tuple[int, ...]:
+    return tuple(int(stat) if stat else default for stat in stats.split(','))
@@ -2,14 +2,76 @@
 """
 
 import dataclasses
+import functools
+import json
+import pathlib
 import re
-from typing import List
+import sys
+from typing import Dict, List, Mapping, Optional, Tuple, Union
+
+from .dex import default_dex
 
 
 _CAPITAL_WORDS = re.compile(r'([a-z])([A-Z])')
+_MOVE_NAMES_FILE = pathlib.Path(__file__).parent / 'data' / 'moves.json'
+_MOVE_NAMES: Dict[str, str] = {}
+_MOVE_NAMES_LOADED = False
+
+
+def canonical_move_name(move_name: str) -> str:
+    """Maps a Showdown move ID or display name to the move's display name.
+
+    Move IDs as they appear in packed teams, such as FreezeDry or Uturn, are
+    looked up in a process-wide table seeded from the bundled move data.
+    Unknown IDs fall back to splitting capitalized words and are memoized.
+
+    Arguments:
+        move_name: The Showdown move ID or display name.
 
+    Returns:
+        The display name of the move, e.g. Freeze-Dry or U-turn.
+    """
+    if not _MOVE_NAMES_LOADED:
+        _load_move_names()
+    canonical_name = _MOVE_NAMES.get(move_name)
+    if canonical_name is None:
+        canonical_name = _derive_move_name(move_name)
+    return canonical_name
+
+
+def seed_move_names(move_names: Mapping[str, str]) -> None:
+    """Adds entries to the process-wide move name table.
+
+    Arguments:
+        move_names: Display names by Showdown move ID.
+    """
+    if not _MOVE_NAMES_LOADED:
+        _load_move_names()
+    _MOVE_NAMES.update(move_names)
+    _derive_move_name.cache_clear()
 
-@dataclasses.dataclass
+
+def _load_move_names() -> None:
+    global _MOVE_NAMES_LOADED  # pylint: disable=global-statement
+    _MOVE_NAMES.update(json.loads(_MOVE_NAMES_FILE.read_text(encoding='utf-8')))
+    _MOVE_NAMES_LOADED = True
+
+
+@functools.lru_cache(maxsize=4096)
+def _derive_move_name(move_name: str) -> str:
+    if move_name == 'FreezeDry':
+        return 'Freeze-Dry'
+
+    if move_name == 'WillOWisp':
+        return 'Will-O-Wisp'
+
+    if move_name == 'Uturn':
+        move_name = 'U-turn'
+
+    return _CAPITAL_WORDS.sub(r'\1 \2', move_name)
+
+
+@dataclasses.dataclass(slots=True)
 class Move:
     """A Pokemon Move and how many times it was used
 
@@ -20,15 +82,24 @@ class Move:
     name: str
     times_used: int = 0
 
+    @property
+    def move_id(self) -> Optional[int]:
+        """The dex ID of the move or None if the move is not in the bundled dex data."""
+        return default_dex().moves.get(self.name)
+
     def increment_count(self) -> None:
         """Increment the number of times this move was used."""
         self.times_used += 1
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True, eq=False)
 class Pokemon:
     """
 
+    Species, Tera types, abilities and items are interned, since the same few
+    hundred values are repeated across every parsed replay. The Struggle move
+    is only created once a Pokemon uses it.
+
     Attributes:
         species: The species of the Pokemon
         nickname: The nickname of the Pokemon
@@ -47,9 +118,35 @@ class Pokemon:
     was_brought: bool = False
     was_lead: bool = False
     was_terastallized: bool = False
-    _struggle: Move = dataclasses.field(
-        default_factory=lambda: Move('Struggle')
-    )
+    _struggle: Move = None
+
+    # Slotted dataclasses with a custom __eq__ would otherwise be hashable.
+    __hash__ = None
+
+    def __post_init__(self) -> None:
+        if self.species is not None:
+            self.species = sys.intern(str(self.species))
+        if self.tera_type is not None:
+            self.tera_type = sys.intern(str(self.tera_type))
+        if self.ability is not None:
+            self.ability = sys.intern(str(self.ability))
+        if self.item is not None:
+            self.item = sys.intern(str(self.item))
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._comparison_key() == other._comparison_key()
+
+    @property
+    def species_id(self) -> Optional[int]:
+        """The dex ID of the species of this Pokemon or None if it is not in the bundled dex data."""
+        return default_dex().find_species_id(self.species)
+
+    def _struggle_move(self) -> Move:
+        if self._struggle is None:
+            self._struggle = Move('Struggle')
+        return self._struggle
 
     def add_move(self, move_name: str) -> Move:
         """Adds a new move to this Pokemon.
@@ -66,7 +163,7 @@ class Pokemon:
         move_name = self._sanitize_move(move_name)
 
         if move_name == 'Struggle':
-            return self._struggle
+            return self._struggle_move()
 
         if len(self.moves) == 4:
             raise RuntimeError(f'A Pokemon can only have a maximum of 4 moves. Current Moves = {
@@ -85,43 +182,67 @@ class Pokemon:
         Returns:
             The move with the given name or None if no move with that name exists.
         """
-        try:
-            if move_name == 'Struggle':
-                return self._struggle
-
-            return next(
-                move
-                for move in self.moves
-                if move.name == move_name
-            )
-        except StopIteration:
-            return None
+        move_name = canonical_move_name(move_name)
+        if move_name == 'Struggle':
+            return self._struggle_move()
+
+        for move in self.moves:
+            if move.name == move_name:
+                return move
+        return None
+
+    def _comparison_key(self) -> tuple:
+        # A Pokemon that never struggled equals one with an unused Struggle move.
+        return (
+            self.species,
+            self.nickname,
+            self.tera_type,
+            self.moves,
+            self.ability,
+            self.item,
+            self.was_brought,
+            self.was_lead,
+            self.was_terastallized,
+            self._struggle if self._struggle is not None else _UNUSED_STRUGGLE
+        )
 
     @staticmethod
     def _sanitize_move(move_name: str) -> str:
-        if move_name == 'FreezeDry':
-            return 'Freeze-Dry'
-
-        if move_name == 'WillOWisp':
-            return 'Will-O-Wisp'
-
-        if move_name == 'Uturn':
-            move_name = 'U-turn'
-
-        return _CAPITAL_WORDS.sub(r'\1 \2', move_name)
+        return canonical_move_name(move_name)
 
     def __str__(self) -> str:
         return f'{self.species},{','.join([f"{m.name},{m.times_used}" for m in sorted(self.moves, key=lambda x: x.name)])},{self.tera_type},{self.was_brought},{self.was_lead},{self.was_terastallized}'
 
 
-@dataclasses.dataclass
+_UNUSED_STRUGGLE = Move('Struggle')
+
+
+@dataclasses.dataclass(slots=True)
 class Team:
     """A collection of Pokemon
 
+    Lookups by nickname and species are served from dictionary indexes that
+    are rebuilt when Pokemon are added or renamed. Species are resolved by the
+    dex IDs of each species and of its base species, so a form such as
+    Urshifu-Rapid-Strike finds the Urshifu of a team preview. Species that are
+    not in the bundled dex data are indexed by name instead.
+
     Attributes:
         pokemon: A list of Pokemon in this Team.
     """
     pokemon: List[Pokemon]
+    _nickname_index: Dict[str, Tuple[str, Pokemon]] = dataclasses.field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    _species_index: Dict[str, Pokemon] = dataclasses.field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    _species_id_index: Dict[Union[int, str], Pokemon] = dataclasses.field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    _indexed_size: int = dataclasses.field(
+        default=-1, init=False, repr=False, compare=False
+    )
 
     def add_pokemon(self, pokemon: Pokemon) -> None:
         """Adds a Pokemon to this Team.
@@ -135,6 +256,18 @@ class Team:
         if len(self.pokemon) == 6:
             raise RuntimeError('A Team can only have a maximum of 6 Pokemon')
         self.pokemon.append(pokemon)
+        self._indexed_size = -1
+
+    def assign_nickname(self, pokemon: Pokemon, nickname: str) -> None:
+        """Assigns a nickname to a Pokemon of this Team and updates the nickname index.
+
+        Arguments:
+            pokemon: The Pokemon to rename.
+            nickname: The new nickname of the Pokemon.
+        """
+        if pokemon.nickname != nickname:
+            pokemon.nickname = nickname
+            self._nickname_index.clear()
 
     def find_by_nickname(self, nickname: str) -> Pokemon:
         """Finds a Pokemon by nickname.
@@ -145,29 +278,72 @@ class Team:
         Returns:
             The Pokemon with the given nickname or None if no Pokemon with that nickname exists.
         """
-        try:
-            return next(
-                p
-                for p in self.pokemon
-                if nickname == p.nickname.split('-Tera')[0]
-            )
-        except StopIteration:
-            return None
+        entry = self._nickname_index.get(nickname)
+        # The index is stale if Pokemon were appended or renamed directly.
+        if entry is None or entry[1].nickname != entry[0] \
+                or self._indexed_size != len(self.pokemon):
+            self._validate_indexes()
+            self._build_nickname_index()
+            entry = self._nickname_index.get(nickname)
+            if entry is None:
+                return None
+        return entry[1]
 
     def find_by_species(self, species: str) -> Pokemon:
         """Finds a Pokemon by species.
 
+        A Pokemon of another form of the same base species is found if no
+        Pokemon has exactly this species.
+
         Arguments:
             species: The species of the Pokemon to find.
 
         Returns:
             The Pokemon with the given species or None if no Pokemon with that species exists.
         """
-        try:
-            return next(
-                p
-                for p in self.pokemon
-                if p.species in (species or p.species.split('-')[0])
-            )
-        except StopIteration:
-            return None
+        if self._indexed_size != len(self.pokemon):
+            self._validate_indexes()
+        pokemon = self._species_index.get(species)
+        if pokemon is None and species:
+            if not self._species_id_index:
+                self._build_species_id_index()
+            dex = default_dex()
+            pokemon = self._species_id_index.get(_species_key(dex, species))
+            if pokemon is None:
+                pokemon = self._species_id_index.get(_species_key(dex, dex.base_species(species)))
+            if pokemon is not None:
+                self._species_index[species] = pokemon
+        return pokemon
+
+    def _validate_indexes(self) -> None:
+        # Pokemon may also be appended to the list directly.
+        if self._indexed_size != len(self.pokemon):
+            self._nickname_index.clear()
+            self._species_index.clear()
+            self._species_id_index.clear()
+            self._indexed_size = len(self.pokemon)
+
+    def _build_species_id_index(self) -> None:
+        # Exact species take precedence over base species.
+        dex = default_dex()
+        indexed = [p for p in self.pokemon if p.species]
+        for p in indexed:
+            self._species_id_index.setdefault(_species_key(dex, p.species), p)
+        for p in indexed:
+            self._species_id_index.setdefault(_species_key(dex, dex.base_species(p.species)), p)
+
+    def _build_nickname_index(self) -> None:
+        self._nickname_index.clear()
+        for p in reversed(self.pokemon):
+            if p.nickname is not None:
+                self._nickname_index[_normalize_nickname(p.nickname)] = (p.nickname, p)
+
+
+def _normalize_nickname(nickname: str) -> str:
+    return nickname.split('-Tera')[0]
+
+
+def _species_key(dex, species: str) -> Union[int, str]:
+    # Names outside the read-only dex data have no ID and are keyed by name.
+    species_id = dex.find_species_id(species)
+    return species if species_id is None else species_id
@@ -7,10 +7,7 @@ Example usage:
 
 from typing import List
 
-import bs4
-import requests
-
-from .pokemon import Move, Pokemon, Team
+from .pokemon import Move, Pokemon, Team, canonical_move_name
 
 
 def parse_pokepaste(url: str) -> Team:
@@ -22,6 +19,11 @@ def parse_pokepaste(url: str) -> Team:
     Returns:
         A Team object containing the Pokemon parsed from the Pokepaste.
     """
+    # Imported here so importing the module does not import BeautifulSoup and requests.
+    # pylint: disable=import-outside-toplevel
+    import bs4
+    import requests
+
     pokemon: List[Pokemon] = []
 
     pokepaste_raw_html = requests.get(url, timeout=30).text
@@ -85,10 +87,10 @@ def _parse_moves(spans) -> List[Move]:
         if len(move_split) == 1:
             x = move_split[0].split('- ')
             y = x[0] if len(x) == 1 else x[1]
-            moves.append(Move(y.strip()))
+            moves.append(Move(canonical_move_name(y.strip())))
         else:
-            moves.append(Move(move_split[0].strip()))
-            moves.append(Move(move_split[1][2:].strip()))
+            moves.append(Move(canonical_move_name(move_split[0].strip())))
+            moves.append(Move(canonical_move_name(move_split[1][2:].strip())))
 
     return moves
 
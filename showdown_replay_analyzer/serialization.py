@@ -0,0 +1,277 @@
+"""Compact binary serialization and caching of parsed Showdown replays
+
+A record is a small header, a table of the distinct strings in the replay and a
+flat array of integers describing the players, teams and moves.
+
+Example usage:
+
+    parsed_cache = ParsedReplayCache('.out/replay-cache.sqlite3')
+    replay = parsed_cache.parse_replay(battle_log)
+"""
+import array
+import hashlib
+import struct
+import sys
+from typing import Dict, Iterable, List
+
+from . import instrumentation
+from .cache import LruCache
+from .filters import ReplayFilter, battle_format
+from .pokemon import Move, Pokemon, Team
+from .showdown import PARSER_VERSION, PlayerInfo, ShowdownReplay, parse_replay
+
+_MAGIC = b'SRA'
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct('<3sBII')
+
+_WAS_BROUGHT = 1
+_WAS_LEAD = 2
+_WAS_TERASTALLIZED = 4
+
+
+def encode_replay(replay: ShowdownReplay) -> bytes:
+    """Encodes a ShowdownReplay into a compact binary record.
+
+    Args:
+        replay: The replay to encode.
+
+    Returns:
+        The binary record.
+
+    Raises:
+        ValueError: If a string in the replay contains a NUL character.
+    """
+    strings: Dict[str, int] = {}
+    ints = array.array('I')
+
+    def intern(value: str) -> int:
+        if value is None:
+            return 0
+        index = strings.get(value)
+        if index is None:
+            index = strings[value] = len(strings) + 1
+        return index
+
+    ints.extend((replay.winner or 0, int(replay.is_ots)))
+    for player_info in (replay.player1_info, replay.player2_info):
+        ints.extend((
+            intern(player_info.player_name),
+            int(player_info.is_winner),
+            len(player_info.team.pokemon)
+        ))
+        for pokemon in player_info.team.pokemon:
+            flags = (_WAS_BROUGHT if pokemon.was_brought else 0) \
+                | (_WAS_LEAD if pokemon.was_lead else 0) \
+                | (_WAS_TERASTALLIZED if pokemon.was_terastallized else 0)
+            struggle = pokemon._struggle  # pylint: disable=protected-access
+            ints.extend((
+                intern(pokemon.species),
+                intern(pokemon.nickname),
+                intern(pokemon.tera_type),
+                intern(pokemon.ability),
+                intern(pokemon.item),
+                flags,
+                struggle.times_used if struggle is not None else 0,
+                len(pokemon.moves)
+            ))
+            for move in pokemon.moves:
+                ints.extend((intern(move.name), move.times_used))
+
+    if any('\0' in value for value in strings):
+        raise ValueError('Strings in a replay record cannot contain NUL characters')
+    string_table = '\0'.join(strings).encode('utf8')
+    if sys.byteorder != 'little':
+        ints.byteswap()
+    return _HEADER.pack(_MAGIC, _FORMAT_VERSION, len(string_table), len(ints)) \
+        + string_table \
+        + ints.tobytes()
+
+
+def decode_replay(record: bytes) -> ShowdownReplay:
+    """Decodes a binary record created by encode_replay.
+
+    Args:
+        record: The binary record.
+
+    Returns:
+        The decoded ShowdownReplay.
+
+    Raises:
+        ValueError: If the record is not a replay record of the current format version.
+    """
+    magic, version, string_table_size, int_count = _HEADER.unpack_from(record)
+    if magic != _MAGIC or version != _FORMAT_VERSION:
+        raise ValueError('Unsupported replay record')
+    start = _HEADER.size
+    strings: List[str] = [None]
+    if string_table_size:
+        strings.extend(
+            record[start:start + string_table_size].decode('utf8').split('\0')
+        )
+    ints = array.array('I')
+    ints.frombytes(record[start + string_table_size:])
+    if sys.byteorder != 'little':
+        ints.byteswap()
+    if len(ints) != int_count:
+        raise ValueError('Truncated replay record')
+
+    values = ints.tolist()
+    winner, is_ots = values[0], values[1]
+    i = 2
+    player_infos = []
+    for _ in range(2):
+        player_name, is_winner, pokemon_count = values[i:i + 3]
+        i += 3
+        team = Team(pokemon=[])
+        for _ in range(pokemon_count):
+            species, nickname, tera_type, ability, item, flags, struggle_used, move_count = \
+                values[i:i + 8]
+            i += 8
+            end = i + 2 * move_count
+            moves = [
+                Move(strings[values[j]], values[j + 1])
+                for j in range(i, end, 2)
+            ]
+            i = end
+            team.pokemon.append(Pokemon(
+                strings[species],
+                strings[nickname],
+                strings[tera_type],
+                moves,
+                strings[ability],
+                strings[item],
+                bool(flags & _WAS_BROUGHT),
+                bool(flags & _WAS_LEAD),
+                bool(flags & _WAS_TERASTALLIZED),
+                Move('Struggle', struggle_used) if struggle_used else None
+            ))
+        player_infos.append(PlayerInfo(strings[player_name], team, bool(is_winner)))
+
+    return ShowdownReplay(
+        player1_info=player_infos[0],
+        player2_info=player_infos[1],
+        winner=winner or None,
+        is_ots=bool(is_ots)
+    )
+
+
+def parsed_replay_key(battle_log: str, mode: str = 'full') -> str:
+    """Resolves the cache key of a parsed battle log.
+
+    The key includes the parser version, so records written by an older parser are never read.
+
+    Args:
+        battle_log: The raw battle log of the Showdown Replay.
+        mode: The mode the battle log is parsed in.
+
+    Returns:
+        The cache key of the parsed replay.
+    """
+    digest = hashlib.blake2b(battle_log.encode('utf8'), digest_size=20).hexdigest()
+    if mode == 'full':
+        return f'parsed:{PARSER_VERSION}.{_FORMAT_VERSION}:{digest}'
+    return f'parsed:{PARSER_VERSION}.{_FORMAT_VERSION}:{mode}:{digest}'
+
+
+class ParsedReplayCache(LruCache):
+    """A size-bounded, multi-process safe cache of parsed replays.
+
+    It can share a database with a ReplayCache.
+    """
+    _TABLE = 'parsed_replays'
+
+    def get(self, key: str) -> ShowdownReplay:
+        """Gets a cached replay and marks it as recently used.
+
+        Args:
+            key: The cache key of the replay.
+
+        Returns:
+            The cached replay or None if the key is not cached.
+        """
+        record = self.get_bytes(key)
+        if record is None:
+            return None
+        return decode_replay(record)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, ShowdownReplay]:
+        """Loads many cached replays at once.
+
+        Args:
+            keys: The cache keys of the replays.
+
+        Returns:
+            A dictionary of the cached replays by key. Keys that are not cached are omitted.
+        """
+        return {
+            key: decode_replay(record)
+            for key, record in self.get_many_bytes(keys).items()
+        }
+
+    def put(self, key: str, replay: ShowdownReplay) -> None:
+        """Stores a replay, evicting least recently used entries if needed.
+
+        Args:
+            key: The cache key of the replay.
+            replay: The replay to store.
+        """
+        self.put_bytes(key, encode_replay(replay))
+
+    def parse_replay(
+            self,
+            battle_log: str,
+            mode: str = 'full',
+            replay_filter: ReplayFilter = None
+    ) -> ShowdownReplay:
+        """Parses a battle log, reusing the cached result if there is one.
+
+        Replays that fail the filter are not cached, since parsing them
+        stops early.
+
+        Args:
+            battle_log: The raw battle log of the Showdown Replay.
+            mode: full or summary, see showdown.parse_replay.
+            replay_filter: Conditions the replay must meet, see filters.
+
+        Returns:
+            The parsed ShowdownReplay object, or None if the replay fails the filter.
+        """
+        key = parsed_replay_key(battle_log, mode)
+        replay = self.get(key)
+        if replay is None:
+            instrumentation.current().count('parsed_cache.miss')
+            replay = parse_replay(battle_log, mode, replay_filter=replay_filter)
+            if replay is not None:
+                self.put(key, replay)
+            return replay
+        instrumentation.current().count('parsed_cache.hit')
+        if replay_filter is not None and not replay_filter.accepts(
+                replay,
+                battle_format(battle_log) if replay_filter.formats else None):
+            return None
+        return replay
+
+    def parse_replays(self, battle_logs: Iterable[str], mode: str = 'full') -> List[ShowdownReplay]:
+        """Parses many battle logs, loading every cached result in one go.
+
+        Args:
+            battle_logs: The raw battle logs of the Showdown Replays.
+            mode: full or summary, see showdown.parse_replay.
+
+        Returns:
+            The parsed ShowdownReplay objects in the order of the battle logs.
+        """
+        battle_logs = list(battle_logs)
+        keys = [parsed_replay_key(battle_log, mode) for battle_log in battle_logs]
+        replays = self.get_many(keys)
+        parsed = {}
+        for key, battle_log in zip(keys, battle_logs):
+            if key not in replays and key not in parsed:
+                parsed[key] = parse_replay(battle_log, mode)
+        if parsed:
+            self.put_many_bytes({
+                key: encode_replay(replay)
+                for key, replay in parsed.items()
+            })
+            replays.update(parsed)
+        return [replays[key] for key in keys]
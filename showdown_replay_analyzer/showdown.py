@@ -5,19 +5,54 @@ Example usage:
     strategy = ShowdownReplayRetrievalStrategyFactory.resolve_strategy(location)
     battle_log = strategy.retrieve_replay(location)
     replay = parse_replay(battle_log)
+
+BeautifulSoup, requests and the thread pool are imported by the retrieval
+strategies that use them, the first time they are needed, so processes that
+only parse battle logs do not pay for importing them.
 """
 import abc
 import collections
 import dataclasses
+import functools
 import itertools
 import os
-import textwrap
-from typing import List
+import re
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Mapping, Set, Tuple
+
+from . import instrumentation
+from .cache import ReplayCache, replay_cache_key
+from .dex import default_dex
+from .filters import ReplayFilter, ReplayRejected
+from .handlers import ReplayLineHandler, compile_line_patterns, register_handler, registered_handlers
+from .packed_team import iter_packed_fields
+from .pokemon import Move, Pokemon, Team
+
+if TYPE_CHECKING:
+    import requests
+
+# Bump whenever the output of parse_replay changes so cached parse results are invalidated.
+PARSER_VERSION = 4
+
+PARSE_MODES = ('full', 'summary')
+
+# Commands only parsed in full mode.
+_MOVE_COMMANDS = frozenset(['move'])
+
+# The number of characters of a battle log ReplayParser scans for lines at
+# once, doubling from the first size to the maximum size.
+_FIRST_FEED_WINDOW_SIZE = 1024
+_MAX_FEED_WINDOW_SIZE = 64 * 1024
 
-import bs4
-import requests
+_RETRYABLE_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+# The number of replays retrieve_replays fetches or holds per worker at once.
+_PENDING_PER_WORKER = 2
 
-from .pokemon import Pokemon, Team
+_BATTLE_LOG_SCRIPT = re.compile(
+    rb'<script\b[^>]*\bclass="battle-log-data"[^>]*>',
+    re.IGNORECASE
+)
 
 
 class ShowdownReplayRetrievalStrategy(abc.ABC):
@@ -35,45 +70,234 @@ class ShowdownReplayRetrievalStrategy(abc.ABC):
         """
         raise NotImplementedError()
 
+    def retrieve_replays(self, locations: Iterable[str]) -> Iterator[Tuple[str, str]]:
+        """Retrieves many Showdown replays.
+
+        Args:
+            locations: The locations of the showdown replays.
+
+        Yields:
+            A (location, battle log) tuple for each replay as it is retrieved.
+        """
+        for location in locations:
+            yield location, self.retrieve_replay(location)
+
+    def close(self) -> None:
+        """Releases the resources held by the strategy, such as pooled connections."""
+
 
 class ShowdownUrlReplayRetrievalStrategy(ShowdownReplayRetrievalStrategy):
-    """Retrieves replays uploaded to replay.pokemonshowdown.com."""
+    """Retrieves replays uploaded to replay.pokemonshowdown.com.
+
+    Replays are fetched over a pooled session with retries, and batches of
+    replays are fetched concurrently. The session is opened on the first
+    request and released by close.
+
+    Attributes:
+        max_workers: The maximum number of replays fetched at the same time.
+        retries: The number of times a failed request is retried.
+        backoff: The delay in seconds before the first retry, doubled on each further retry.
+        timeout: The timeout in seconds of each request.
+    """
+
+    def __init__(
+            self,
+            max_workers: int = 8,
+            retries: int = 3,
+            backoff: float = 0.5,
+            timeout: float = 30
+    ):
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._session: 'requests.Session' = None
+        self._session_lock = threading.Lock()
 
     def retrieve_replay(self, location: str) -> str:
-        return requests.get(f'{location}.json', timeout=30).text
+        """Retrieves a Showdown replay over the pooled session.
+
+        Args:
+            location: The URL of the showdown replay.
+
+        Returns:
+            The Showdown replay battle log as a string.
+
+        Raises:
+            requests.RequestException: If the replay could not be retrieved after all retries.
+        """
+        return self._fetch_with_retries(location)
+
+    def retrieve_replays(self, locations: Iterable[str]) -> Iterator[Tuple[str, str]]:
+        """Retrieves many Showdown replays concurrently.
+
+        Replays are yielded in the order they arrive, not the order of locations.
+        At most twice max_workers replays are requested or held at a time, and
+        the next location is only requested once a replay is yielded, so the
+        battle logs of a long list of locations are not all kept in memory.
+
+        Args:
+            locations: The URLs of the showdown replays.
+
+        Yields:
+            A (location, battle log) tuple for each replay as it is retrieved.
+
+        Raises:
+            requests.RequestException: If a replay could not be retrieved after all retries.
+        """
+        import concurrent.futures  # pylint: disable=import-outside-toplevel
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_workers
+        )
+        locations = iter(locations)
+        try:
+            pending = {
+                executor.submit(self._fetch_with_retries, location): location
+                for location in itertools.islice(locations, _PENDING_PER_WORKER * self.max_workers)
+            }
+            while pending:
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    location = pending.pop(future)
+                    next_location = next(locations, None)
+                    if next_location is not None:
+                        pending[executor.submit(self._fetch_with_retries, next_location)] = next_location
+                    yield location, future.result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def close(self) -> None:
+        """Closes the pooled session."""
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def _get_session(self) -> 'requests.Session':
+        import requests  # pylint: disable=import-outside-toplevel
+        with self._session_lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=self.max_workers
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session = session
+            return self._session
+
+    def _fetch_with_retries(self, location: str) -> str:
+        import requests  # pylint: disable=import-outside-toplevel
+        session = self._get_session()
+        attempt = 0
+        while True:
+            try:
+                response = session.get(f'{location}.json', timeout=self.timeout)
+                response.raise_for_status()
+                return response.json()['log']
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                if attempt == self.retries or not _is_retryable(e):
+                    raise
+            time.sleep(self.backoff * 2 ** attempt)
+            attempt += 1
 
 
 class ShowdownDownloadReplayRetrievalStrategy(ShowdownReplayRetrievalStrategy):
-    """Retrieves replays downloaded as local files on disk."""
+    """Retrieves replays downloaded as local files on disk.
+
+    By default the battle log is located by scanning the raw bytes of the file
+    for the battle log script block. BeautifulSoup is only used when the markup
+    does not match the layout of a downloaded Showdown replay.
+
+    Attributes:
+        fast_extraction: Whether to scan the raw bytes before falling back to BeautifulSoup.
+    """
+
+    def __init__(self, fast_extraction: bool = True):
+        self.fast_extraction = fast_extraction
 
     def retrieve_replay(self, location: str) -> str:
-        with open(location, 'r', encoding='utf8') as f:
-            showdown_replay_raw_html = f.read()
-            parsed_html = bs4.BeautifulSoup(
-                showdown_replay_raw_html,
-                'html.parser'
-            )
-            battle_log_data = parsed_html.find(
-                'script',
-                class_='battle-log-data'
-            )
-            return textwrap.dedent(battle_log_data.text)
+        profile = instrumentation.current()
+        if self.fast_extraction:
+            with profile.stage('read'):
+                with open(location, 'rb') as f:
+                    showdown_replay_raw_bytes = f.read()
+            with profile.stage('extract'):
+                battle_log = _extract_battle_log(showdown_replay_raw_bytes)
+            if battle_log is not None:
+                return battle_log
+
+        profile.count('extract.bs4')
+        with profile.stage('read'):
+            with open(location, 'r', encoding='utf8') as f:
+                showdown_replay_raw_html = f.read()
+        with profile.stage('extract.bs4'):
+            return _extract_battle_log_bs4(showdown_replay_raw_html)
+
+
+class CachingReplayRetrievalStrategy(ShowdownReplayRetrievalStrategy):
+    """Retrieves replays through a ReplayCache, delegating misses to another strategy.
+
+    Attributes:
+        strategy: The strategy used to retrieve replays that are not cached.
+        cache: The cache of previously retrieved battle logs.
+    """
+
+    def __init__(self, strategy: ShowdownReplayRetrievalStrategy, cache: ReplayCache):
+        self.strategy = strategy
+        self.cache = cache
+
+    def retrieve_replay(self, location: str) -> str:
+        key = replay_cache_key(location)
+        battle_log = self.cache.get(key)
+        if battle_log is None:
+            instrumentation.current().count('cache.miss')
+            battle_log = self.strategy.retrieve_replay(location)
+            self.cache.put(key, battle_log)
+        else:
+            instrumentation.current().count('cache.hit')
+        return battle_log
+
+    def retrieve_replays(self, locations: Iterable[str]) -> Iterator[Tuple[str, str]]:
+        misses = {}
+        for location in locations:
+            key = replay_cache_key(location)
+            battle_log = self.cache.get(key)
+            if battle_log is None:
+                misses[location] = key
+            else:
+                yield location, battle_log
+        for location, battle_log in self.strategy.retrieve_replays(misses):
+            self.cache.put(misses[location], battle_log)
+            yield location, battle_log
+
+    def close(self) -> None:
+        """Closes the wrapped strategy. The cache is left open for its owner to close."""
+        self.strategy.close()
 
 
 class ShowdownReplayRetrievalStrategyFactory:
     """Factory class to create instances of ShowdownReplayRetrievalStrategy."""
 
     @staticmethod
-    def resolve_strategy(location: str) -> ShowdownReplayRetrievalStrategy:
+    def resolve_strategy(
+            location: str,
+            cache: ReplayCache = None
+    ) -> ShowdownReplayRetrievalStrategy:
         """Resolves the appropriate ShowdownReplayRetrievalStrategy for the provided location.
 
         The location can be a local file or a URL.
         If the location is a local file, the ShowdownDownloadReplayRetrievalStrategy is returned.
         If the location is a URL, the ShowdownUrlReplayRetrievalStrategy is returned.
         If the location is neither a local file nor a URL, a ValueError is raised.
+        If a cache is provided, the strategy is wrapped in a CachingReplayRetrievalStrategy.
+        The caller owns the returned strategy and closes it once it is done
+        with it, which closes the pooled session of a URL strategy.
 
         Args:
             location: The location of the showdown replay.
+            cache: The cache of previously retrieved battle logs.
 
         Returns:
             The corresponding ShowdownReplayRetrievalStrategy for the provided location.
@@ -81,14 +305,19 @@ class ShowdownReplayRetrievalStrategyFactory:
         Raises:
             ValueError: If the location is neither a local file nor a Pokemon Showdown URL.
         """
+        strategy: ShowdownReplayRetrievalStrategy
         if os.path.isfile(location):
-            return ShowdownDownloadReplayRetrievalStrategy()
-        if location.startswith('https://replay.pokemonshowdown.com'):
-            return ShowdownUrlReplayRetrievalStrategy()
-        raise ValueError(f'Location {location} is not yet supported.')
+            strategy = ShowdownDownloadReplayRetrievalStrategy()
+        elif location.startswith('https://replay.pokemonshowdown.com'):
+            strategy = ShowdownUrlReplayRetrievalStrategy()
+        else:
+            raise ValueError(f'Location {location} is not yet supported.')
+        if cache is not None:
+            return CachingReplayRetrievalStrategy(strategy, cache)
+        return strategy
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class PlayerInfo:
     """A player's information parsed from a Showdown Replay.
 
@@ -101,7 +330,7 @@ class PlayerInfo:
     is_winner: bool = True
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class ShowdownReplay:
     """The information of each player, the winner, and OTS status from a Showdown Replay.
 
@@ -117,163 +346,545 @@ class ShowdownReplay:
     is_ots: bool = True
 
 
-def parse_replay(battle_log: str) -> ShowdownReplay:
+class ReplayParser:
+    """Incrementally parses a Showdown battle log one line at a time.
+
+    Each line is dispatched to the handler registered for its command. Lines
+    without a handler, such as damage, healing and chat lines, are skipped
+    before they are split into parts.
+
+    Whether the battle used Open Team Sheets is decided from the first
+    showteam line. Team preview poke lines are held back until then, or until
+    the first Pokemon is switched in, so no look-ahead over the log is needed.
+
+    A parser with a filter checks the players once both |player| lines are
+    parsed and the teams once both are known, and raises ReplayRejected as
+    soon as a condition fails.
+
+    Attributes:
+        is_finished: Whether a win or tie line has been parsed.
+        BUILTIN_HANDLERS: The handlers of the commands every parser handles
+            by default, registered with the handlers module.
+
+    Example usage:
+
+        parser = ReplayParser()
+        for line in battle_log_lines:
+            parser.feed(line)
+        replay = parser.finish()
+    """
+
+    def __init__(
+            self,
+            handlers: Mapping[str, ReplayLineHandler] = None,
+            mode: str = 'full',
+            replay_filter: ReplayFilter = None
+    ):
+        """Creates a parser.
+
+        Args:
+            handlers: Handlers by command used in addition to, or instead of,
+                the registered handlers.
+            mode: full to count the uses of every move, or summary to skip
+                move lines. In summary mode Pokemon only have the moves of
+                their team sheet, with no uses.
+            replay_filter: Conditions the replay must meet, see filters.
+
+        Raises:
+            ValueError: If the mode is unknown.
+        """
+        if mode not in PARSE_MODES:
+            raise ValueError(f'Unknown parse mode {mode}. Expected one of {PARSE_MODES}')
+        registered = registered_handlers()
+        self._handlers = {**registered, **handlers} if handlers else registered
+        if mode == 'summary':
+            self._handlers = {
+                command: handler
+                for command, handler in self._handlers.items()
+                if command not in _MOVE_COMMANDS
+            }
+        if replay_filter is not None and replay_filter.formats:
+            self._handlers = {**self._handlers, 'tier': ReplayParser._handle_tier}
+        profile = instrumentation.current()
+        if profile.enabled:
+            self._handlers = profile.counting_handlers(self._handlers)
+        self._filter = replay_filter
+        self._teams_checked = False
+        self._format: str = None
+        self._line_patterns = compile_line_patterns(frozenset(self._handlers))
+        self._player1: str = None
+        self._player2: str = None
+        self._player1_team = Team(pokemon=[])
+        self._player2_team = Team(pokemon=[])
+        self._player1_brought = collections.OrderedDict()
+        self._player2_brought = collections.OrderedDict()
+        self._is_ots: bool = None
+        self._pending_pokes: List[List[str]] = []
+        self._winner: int = None
+        self._winner_name: str = None
+        # Repeated switch and move lines are resolved from these memos, which
+        # are cleared whenever a Pokemon is added or renamed.
+        self._switches: Set[Tuple[str, str]] = set()
+        self._moves: Dict[Tuple[str, str], Move] = {}
+        self.is_finished = False
+
+    def feed(self, line: str) -> None:
+        """Parses the next line of the battle log.
+
+        Args:
+            line: A line of the battle log, with or without its line ending.
+
+        Raises:
+            ReplayRejected: If the line shows that the replay fails the filter.
+        """
+        self._feed_text(line)
+
+    def finish(self) -> ShowdownReplay:
+        """Completes parsing once every line of the battle log has been fed.
+
+        Returns:
+            The parsed ShowdownReplay object
+
+        Raises:
+            ReplayRejected: If the replay fails the filter.
+        """
+        self._resolve_ots()
+        if self._filter is not None:
+            self._check_teams()
+            self._check(self._filter.accepts_format(self._format))
+        player1_team = self._player1_team
+        player2_team = self._player2_team
+
+        player1_info = PlayerInfo(
+            player_name=self._player1,
+            team=player1_team,
+            is_winner=self._winner_name == self._player1
+        )
+
+        for player1_lead in _resolve_leads(self._player1_brought):
+            player1_team.find_by_species(player1_lead.species).was_lead = True
+
+        for player2_lead in _resolve_leads(self._player2_brought):
+            player2_team.find_by_species(player2_lead.species).was_lead = True
+
+        for p1_b in self._player1_brought:
+            player1_team.find_by_species(p1_b).was_brought = True
+
+        for p2_b in self._player2_brought:
+            player2_team.find_by_species(p2_b).was_brought = True
+
+        player2_info = PlayerInfo(
+            player_name=self._player2,
+            team=player2_team,
+            is_winner=self._winner_name == self._player2
+        )
+
+        return ShowdownReplay(player1_info=player1_info,
+                              player2_info=player2_info,
+                              winner=self._winner,
+                              is_ots=self._is_ots)
+
+    def team(self, player_number: str) -> Team:
+        """Returns the team of a player.
+
+        Args:
+            player_number: The player number, e.g. p1 or p2.
+
+        Returns:
+            The team parsed so far.
+        """
+        return self._player1_team \
+            if _is_player1(player_number) \
+            else self._player2_team
+
+    def _feed_text(self, text: str, end: int = None) -> None:
+        # Lines without a handler are skipped by the regular expressions
+        # without being split or even visited by the Python loop.
+        handlers = self._handlers
+        first_line, next_lines = self._line_patterns
+        if end is None:
+            end = len(text)
+        match = first_line.match(text, 0, end)
+        if match:
+            command_parts = match.group().split('|')
+            handlers[command_parts[1]](self, command_parts)
+        # The lines of each window are found with findall, which does not
+        # create match objects. Windows start small and double, so a replay
+        # rejected by its first lines is not scanned to the end.
+        start = 0
+        window_size = _FIRST_FEED_WINDOW_SIZE
+        while start < end:
+            window_end = text.find('\n', start + window_size, end)
+            if window_end == -1:
+                window_end = end
+            for line in next_lines.findall(text, start, window_end):
+                command_parts = line.split('|')
+                handlers[command_parts[1]](self, command_parts)
+            start = window_end
+            window_size = min(window_size * 2, _MAX_FEED_WINDOW_SIZE)
+
+    def _handle_player(self, command_parts: List[str]) -> None:
+        # |player|p1|player|avatar|elo
+        if self._player1 and self._player2:
+            return
+        player_number = _resolve_player(command_parts)
+        player_name = command_parts[3]
+        if _is_player1(player_number):
+            self._player1 = player_name
+        else:
+            self._player2 = player_name
+        if self._filter is not None and self._player1 and self._player2:
+            self._check(self._filter.accepts_players(self._player1, self._player2))
+
+    def _handle_poke(self, command_parts: List[str]) -> None:
+        # |poke|p1|Species, Level, Gender|
+        # only useful if not OTS
+        if self._is_ots is None:
+            self._pending_pokes.append(command_parts)
+        elif not self._is_ots:
+            self._add_poke(command_parts)
+
+    def _handle_showteam(self, command_parts: List[str]) -> None:
+        # |showteam|p1|Species|?|Item|Ability|Move1,Move2,Move3,Move4|?|?|Gender|?|?|50|,,,,,Tera]...
+        # only useful if OTS
+        if self._is_ots is None:
+            self._is_ots = True
+            self._pending_pokes.clear()
+            if self._filter is not None:
+                self._check(self._filter.accepts_ots(True))
+        if self._is_ots:
+            self._add_showteam(command_parts)
+            if self._player1_team.pokemon and self._player2_team.pokemon:
+                self._check_teams()
+
+    def _handle_switch(self, command_parts: List[str]) -> None:
+        # |switch|p1a: nickname|Species, Level|CurrentHp\/TotalHp|
+        if self._is_ots is None:
+            self._resolve_ots()
+        switch = (command_parts[2], command_parts[3])
+        if switch in self._switches:
+            return
+        player_number = _resolve_player(command_parts)
+        nickname = _resolve_nickname(command_parts)
+        species = _resolve_species(command_parts).split('-Tera')[0]
+        team = self.team(player_number)
+        brought = self._player1_brought \
+            if _is_player1(player_number) \
+            else self._player2_brought
+        pokemon = team.find_by_species(species)
+        if pokemon.nickname != nickname:
+            team.assign_nickname(pokemon, nickname)
+            self._clear_memos()
+        brought[pokemon.species] = pokemon
+        self._switches.add(switch)
+
+    def _handle_move(self, command_parts: List[str]) -> None:
+        # |move|p1a: nickname|move name|p2a: nickname|
+        # The most frequent relevant line, so the helpers are inlined.
+        if self._is_ots is None:
+            self._resolve_ots()
+        actor = command_parts[2]
+        move_name = command_parts[3]
+        move = self._moves.get((actor, move_name))
+        if move is None:
+            team = self._player1_team if actor[:2] == 'p1' else self._player2_team
+            pokemon = team.find_by_nickname(actor[5:])
+
+            move = pokemon.find_move(move_name)
+            if not move:
+                move = pokemon.add_move(move_name)
+            self._moves[actor, move_name] = move
+        move.times_used += 1
+
+    def _handle_terastallize(self, command_parts: List[str]) -> None:
+        # |-terastallize|p1a: nickname|type|
+        self._resolve_ots()
+        player_number = _resolve_player(command_parts)
+        nickname = _resolve_nickname(command_parts)
+        pokemon = self.team(player_number).find_by_nickname(nickname)
+        pokemon.was_terastallized = True
+
+    def _handle_tier(self, command_parts: List[str]) -> None:
+        # |tier|[Gen 9] VGC 2024 Reg F (Bo3)
+        # Only handled when the filter has format conditions.
+        self._format = '|'.join(command_parts[2:])
+        self._check(self._filter.accepts_format(self._format))
+
+    def _handle_win(self, command_parts: List[str]) -> None:
+        # |win|player|
+        self._winner_name = command_parts[2]
+        self._winner = int(self._winner_name == self._player2) + 1
+        self.is_finished = True
+
+    def _handle_tie(self, _command_parts: List[str]) -> None:
+        # |tie|
+        self.is_finished = True
+
+    def _clear_memos(self) -> None:
+        self._switches.clear()
+        self._moves.clear()
+
+    def _resolve_ots(self) -> None:
+        # Without a showteam line before the battle starts the game is not OTS.
+        if self._is_ots is None:
+            self._is_ots = False
+            for command_parts in self._pending_pokes:
+                self._add_poke(command_parts)
+            self._pending_pokes.clear()
+            if self._filter is not None:
+                self._check(self._filter.accepts_ots(False))
+                self._check_teams()
+
+    def _check_teams(self) -> None:
+        if self._filter is not None and not self._teams_checked:
+            self._teams_checked = True
+            self._check(self._filter.accepts_teams(
+                self._player1, self._player1_team,
+                self._player2, self._player2_team
+            ))
+
+    @staticmethod
+    def _check(accepted: bool) -> None:
+        if not accepted:
+            raise ReplayRejected()
+
+    def _add_poke(self, command_parts: List[str]) -> None:
+        player_number = _resolve_player(command_parts)
+        species = _resolve_species(command_parts)
+        pokemon = Pokemon(species=species)
+        self.team(player_number).add_pokemon(pokemon)
+        self._clear_memos()
+
+    def _add_showteam(self, command_parts: List[str]) -> None:
+        # |showteam|p1|<packed team>
+        team = self.team(_resolve_player(command_parts))
+        for species, nickname, tera_type, move_ids in _decode_team_sheet(tuple(command_parts[3:])):
+            pokemon = Pokemon(species=species, nickname=nickname, tera_type=tera_type)
+            for move_id in move_ids:
+                pokemon.add_move(move_id)
+            team.add_pokemon(pokemon)
+        self._clear_memos()
+
+    BUILTIN_HANDLERS: Dict[str, ReplayLineHandler] = {
+        'player': _handle_player,
+        'poke': _handle_poke,
+        'showteam': _handle_showteam,
+        'switch': _handle_switch,
+        'move': _handle_move,
+        '-terastallize': _handle_terastallize,
+        'win': _handle_win,
+        'tie': _handle_tie,
+    }
+
+
+for command, handler in ReplayParser.BUILTIN_HANDLERS.items():
+    register_handler(command, handler)
+
+
+def parse_replay(
+        battle_log: str,
+        mode: str = 'full',
+        handlers: Mapping[str, ReplayLineHandler] = None,
+        replay_filter: ReplayFilter = None
+) -> ShowdownReplay:
     """Parses a Showdown Replay into a ShowdownReplay object.
 
     Args:
         battle_log: The raw battle log of the Showdown Replay
+        mode: full to count the uses of every move, or summary to only parse
+            the players, teams, switches, terastallization and winner.
+        handlers: Handlers by command used in addition to, or instead of,
+            the registered handlers. See ReplayParser.
+        replay_filter: Conditions the replay must meet. Parsing stops at the
+            first line that shows the replay fails them. See filters.
 
     Returns:
-        The parsed ShowdownReplay object
+        The parsed ShowdownReplay object, or None if the replay fails the filter
+
+    Raises:
+        ValueError: If the mode is unknown.
     """
-    player1: str = None
-    player2: str = None
-    player1_team: Team = Team(pokemon=[])
-    player2_team: Team = Team(pokemon=[])
-    player1_brought = collections.OrderedDict()
-    player2_brought = collections.OrderedDict()
+    # pylint: disable=protected-access
+    parser = ReplayParser(handlers, mode, replay_filter)
+    try:
+        if mode == 'summary':
+            # Nothing after the result matters to a summary, and the result is
+            # found with a reverse search instead of scanning the log for it.
+            win = battle_log.rfind('\n|win|')
+            if win != -1:
+                line_end = battle_log.find('\n', win + 1)
+                parser._feed_text(battle_log, win)
+                parser.feed(battle_log[win + 1:line_end] if line_end != -1 else battle_log[win + 1:])
+                return parser.finish()
+        parser._feed_text(battle_log)
+        return parser.finish()
+    except ReplayRejected:
+        return None
+
+
+def parse_replay_stream(chunks: Iterable[str]) -> ShowdownReplay:
+    """Parses a Showdown Replay from a text file object or any iterable of text chunks.
+
+    Chunks may end anywhere, including in the middle of a line, so a replay
+    can be parsed while it is still being downloaded.
 
-    is_ots = '|showteam|' in battle_log
+    Args:
+        chunks: The battle log as lines or arbitrary chunks of text.
 
-    for line in battle_log.split('\n'):
-        if not line:
-            continue
+    Returns:
+        The parsed ShowdownReplay object
+    """
+    parser = ReplayParser()
+    for text in _iter_line_blocks(chunks):
+        parser._feed_text(text)  # pylint: disable=protected-access
+    return parser.finish()
 
-        command_parts = line.split('|')
-        if len(command_parts) == 1:
-            continue
 
-        command = command_parts[1]
-
-        match command:
-            case 'player':
-                # |player|p1|player|avatar|elo
-                if player1 and player2:
-                    continue
-                player_number = _resolve_player(command_parts)
-                player_name = command_parts[3]
-                if _is_player1(player_number):
-                    player1 = player_name
-                else:
-                    player2 = player_name
-
-            case 'poke':
-                # |poke|p1|Species, Level, Gender|
-                # only useful if not OTS
-                if is_ots:
-                    continue
-                player_number = _resolve_player(command_parts)
-                species = _resolve_species(command_parts)
-                team = player1_team \
-                    if _is_player1(player_number)\
-                    else player2_team
-                pokemon = Pokemon(species=species)
-                team.add_pokemon(pokemon)
-
-            case 'showteam':
-                # |showteam|p1|Species|?|Item|Ability|Move1,Move2,Move3,Move4|?|?|Gender|?|?|50|,,,,,Tera]...
-                # only useful if OTS
-                if not is_ots:
-                    continue
-                player_number = _resolve_player(command_parts)
-                next_pokemon = command_parts[3]
-                command_parts = command_parts[4:]
-                index_buffer = 0
-                while next_pokemon:
-                    species = next_pokemon
-                    moves = command_parts[3 - index_buffer].split(',')
-                    tera_type_and_next_pokemon = command_parts[10 - index_buffer] \
-                        .split(',')[-1] \
-                        .split(']')
-                    tera_type = tera_type_and_next_pokemon[0]
-                    next_pokemon = tera_type_and_next_pokemon[1] \
-                        if len(tera_type_and_next_pokemon) > 1 \
-                        else None
-                    command_parts = command_parts[12 - index_buffer:]
-                    index_buffer = 1
-                    pokemon = Pokemon(
-                        species=species,
-                        nickname=species.split('-')[0],
-                        tera_type=tera_type
-                    )
-                    for move in moves:
-                        pokemon.add_move(move_name=move)
-                    team = player1_team \
-                        if _is_player1(player_number) \
-                        else player2_team
-                    team.add_pokemon(pokemon)
-
-            case 'switch':
-                # |switch|p1a: nickname|Species, Level|CurrentHp\/TotalHp|
-                player_number = _resolve_player(command_parts)
-                nickname = _resolve_nickname(command_parts)
-                species = _resolve_species(command_parts).split('-Tera')[0]
-                team = player1_team \
-                    if _is_player1(player_number) \
-                    else player2_team
-                brought = player1_brought \
-                    if _is_player1(player_number) \
-                    else player2_brought
-                pokemon = team.find_by_species(species)
-                pokemon.nickname = nickname
-                brought[pokemon.species] = pokemon
-
-            case 'move':
-                # |move|p1a: nickname|move name|p2a: nickname|
-                player_number = _resolve_player(command_parts)
-                nickname = _resolve_nickname(command_parts)
-                team = player1_team if player_number == 'p1' else player2_team
-                move_name = command_parts[3]
-                pokemon = team.find_by_nickname(nickname)
-
-                move = pokemon.find_move(move_name)
-                if not move:
-                    move = pokemon.add_move(move_name)
-                move.increment_count()
-
-            case '-terastallize':
-                # |-terastallize|p1a: nickname|type|
-                player_number = _resolve_player(command_parts)
-                nickname = _resolve_nickname(command_parts)
-                team = player1_team \
-                    if _is_player1(player_number) \
-                    else player2_team
-                pokemon = team.find_by_nickname(nickname)
-                pokemon.was_terastallized = True
-
-            case 'win':
-                # |win|player|
-                winner_name = command_parts[2]
-                winner = int(winner_name == player2) + 1
-
-    player1_info = PlayerInfo(
-        player_name=player1,
-        team=player1_team,
-        is_winner=winner_name == player1
-    )
+def iter_replays(chunks: Iterable[str]) -> Iterator[ShowdownReplay]:
+    """Parses concatenated Showdown Replays from a text file object or any iterable of text chunks.
 
-    for player1_lead in _resolve_leads(player1_brought):
-        player1_team.find_by_species(player1_lead.species).was_lead = True
+    A replay ends when a player line follows its win or tie line, so only one
+    replay is held in memory at a time. A trailing replay without a result is
+    still returned.
 
-    for player2_lead in _resolve_leads(player2_brought):
-        player2_team.find_by_species(player2_lead.species).was_lead = True
+    Args:
+        chunks: The battle logs as lines or arbitrary chunks of text.
 
-    for p1_b in player1_brought:
-        player1_team.find_by_species(p1_b).was_brought = True
+    Returns:
+        An iterator of the parsed ShowdownReplay objects in log order.
+    """
+    # pylint: disable=protected-access
+    parser = ReplayParser()
+    has_lines = False
+    for text in _iter_line_blocks(chunks):
+        for command_parts in _iter_command_parts(parser._line_patterns, text):
+            if parser.is_finished and command_parts[1] == 'player':
+                yield parser.finish()
+                parser = ReplayParser()
+            parser._handlers[command_parts[1]](parser, command_parts)
+            has_lines = True
+    if has_lines:
+        yield parser.finish()
+
+
+@functools.lru_cache(maxsize=1024)
+def _decode_team_sheet(fields: Tuple[str, ...]) -> Tuple[Tuple[str, str, str, Tuple[str, ...]], ...]:
+    # Teams are reused across the games of a set and by the same players over
+    # a corpus, so the decoded species, nicknames, Tera types and move IDs of
+    # a packed team are shared by every replay that shows it. Move IDs are
+    # canonicalized by the caller, since seed_move_names can change their names.
+    team_sheet = []
+    for packed_pokemon in iter_packed_fields(fields):
+        species = packed_pokemon.species
+        pokemon = Pokemon(
+            species=species,
+            nickname=default_dex().base_species(species),
+            tera_type=packed_pokemon.tera_type
+        )
+        team_sheet.append((
+            pokemon.species,
+            pokemon.nickname,
+            pokemon.tera_type,
+            tuple(packed_pokemon.moves)
+        ))
+    return tuple(team_sheet)
+
+
+def _iter_command_parts(
+    line_patterns: Tuple[re.Pattern, re.Pattern],
+    text: str
+) -> Iterator[List[str]]:
+    first_line, next_lines = line_patterns
+    match = first_line.match(text)
+    if match:
+        yield match.group().split('|')
+    for match in next_lines.finditer(text):
+        yield match.group(1).split('|')
+
+
+def _iter_line_blocks(chunks: Iterable[str]) -> Iterator[str]:
+    # Yields text made of whole lines, reading file objects in large blocks.
+    read = getattr(chunks, 'read', None)
+    if read is not None:
+        chunks = iter(functools.partial(read, 64 * 1024), '')
+    remainder = ''
+    for chunk in chunks:
+        if remainder:
+            chunk = remainder + chunk
+        end = chunk.rfind('\n')
+        if end == -1:
+            remainder = chunk
+            continue
+        yield chunk[:end]
+        remainder = chunk[end + 1:]
+    if remainder:
+        yield remainder
+
+
+def _is_retryable(error: Exception) -> bool:
+    import requests  # pylint: disable=import-outside-toplevel
+    if isinstance(error, requests.HTTPError):
+        return error.response.status_code in _RETRYABLE_STATUS_CODES
+    return True
+
+
+def _extract_battle_log(showdown_replay_raw_bytes: bytes) -> str:
+    # <script type="text/plain" class="battle-log-data">...</script>
+    # Returns None when the markup is unusual so the caller can fall back to bs4.
+    match = _BATTLE_LOG_SCRIPT.search(showdown_replay_raw_bytes)
+    if not match:
+        return None
+    start = match.end()
+    if _BATTLE_LOG_SCRIPT.search(showdown_replay_raw_bytes, start):
+        return None
+    end = showdown_replay_raw_bytes.find(b'</script', start)
+    if end == -1:
+        return None
+    battle_log_bytes = showdown_replay_raw_bytes[start:end]
+    if b'\r' in battle_log_bytes:
+        battle_log_bytes = battle_log_bytes \
+            .replace(b'\r\n', b'\n') \
+            .replace(b'\r', b'\n')
+    try:
+        battle_log = battle_log_bytes.decode('utf8')
+    except UnicodeDecodeError:
+        return None
+    return _dedent(battle_log)
+
+
+def _extract_battle_log_bs4(showdown_replay_raw_html: str) -> str:
+    import bs4  # pylint: disable=import-outside-toplevel
+    parsed_html = bs4.BeautifulSoup(
+        showdown_replay_raw_html,
+        'html.parser'
+    )
+    battle_log_data = parsed_html.find(
+        'script',
+        class_='battle-log-data'
+    )
+    return _dedent(battle_log_data.text)
 
-    for p2_b in player2_brought:
-        player2_team.find_by_species(p2_b).was_brought = True
 
-    player2_info = PlayerInfo(
-        player_name=player2,
-        team=player2_team,
-        is_winner=winner_name == player2
+def _dedent(text: str) -> str:
+    # Same result as textwrap.dedent: whitespace-only lines are emptied and
+    # the longest common leading whitespace of the remaining lines is removed.
+    lines = text.split('\n')
+    margin: str = None
+    for line in lines:
+        stripped = line.lstrip(' \t')
+        if not stripped:
+            continue
+        indent = line[:len(line) - len(stripped)]
+        if margin is None:
+            margin = indent
+        elif not indent.startswith(margin):
+            margin = os.path.commonprefix([margin, indent])
+    cut = len(margin) if margin else 0
+    return '\n'.join(
+        line[cut:] if line.lstrip(' \t') else ''
+        for line in lines
     )
 
-    return ShowdownReplay(player1_info=player1_info,
-                          player2_info=player2_info,
-                          winner=winner)
-
 
 def _resolve_player(command_parts: List[str]) -> str:
     # 'p1a: ...'
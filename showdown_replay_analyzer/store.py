@@ -0,0 +1,359 @@
+"""A SQLite database of parsed Showdown replays with indexed queries
+
+Replays are stored normalized in tables of replays, players, the two sides of
+every replay, team slots and moves, so questions about a corpus are answered
+with indexed queries instead of walking and parsing the replays again.
+Replays are inserted in batches, one transaction per batch, into a database
+in WAL mode.
+
+Example usage:
+
+    store = ReplayStore('.out/replays.sqlite3')
+    store.ingest(locations)
+    # Games where an opponent of ironpumpernickel brought Flutter Mane and terastallized it.
+    store.find(species='Flutter Mane', brought=True, terastallized=True, opponent='ironpumpernickel')
+"""
+import dataclasses
+import os
+import sqlite3
+import threading
+from typing import Iterable, List, Tuple
+
+from .cache import ReplayCache, SqliteDatabase
+from .showdown import ShowdownReplay, ShowdownReplayRetrievalStrategyFactory, parse_replay
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS replays (
+    id INTEGER PRIMARY KEY,
+    location TEXT NOT NULL UNIQUE,
+    winner INTEGER,
+    is_ots INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS players (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS sides (
+    replay_id INTEGER NOT NULL REFERENCES replays (id) ON DELETE CASCADE,
+    side INTEGER NOT NULL,
+    player_id INTEGER NOT NULL REFERENCES players (id),
+    is_winner INTEGER NOT NULL,
+    PRIMARY KEY (replay_id, side)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sides_player ON sides (player_id);
+CREATE INDEX IF NOT EXISTS sides_winner ON sides (is_winner, replay_id);
+CREATE TABLE IF NOT EXISTS team_slots (
+    id INTEGER PRIMARY KEY,
+    replay_id INTEGER NOT NULL,
+    side INTEGER NOT NULL,
+    slot INTEGER NOT NULL,
+    species TEXT NOT NULL,
+    nickname TEXT,
+    tera_type TEXT,
+    ability TEXT,
+    item TEXT,
+    was_brought INTEGER NOT NULL,
+    was_lead INTEGER NOT NULL,
+    was_terastallized INTEGER NOT NULL,
+    FOREIGN KEY (replay_id, side) REFERENCES sides (replay_id, side) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS team_slots_side ON team_slots (replay_id, side);
+CREATE INDEX IF NOT EXISTS team_slots_species ON team_slots (species, was_brought, was_terastallized);
+CREATE INDEX IF NOT EXISTS team_slots_tera_type ON team_slots (tera_type, was_terastallized);
+CREATE TABLE IF NOT EXISTS moves (
+    slot_id INTEGER NOT NULL REFERENCES team_slots (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    times_used INTEGER NOT NULL,
+    PRIMARY KEY (slot_id, name)
+) WITHOUT ROWID;
+'''
+
+# The number of replays inserted per transaction.
+_BATCH_SIZE = 1000
+
+# The column of each team slot filter of find and count.
+_SLOT_FILTERS = {
+    'species': 'slot.species',
+    'tera_type': 'slot.tera_type',
+    'brought': 'slot.was_brought',
+    'lead': 'slot.was_lead',
+    'terastallized': 'slot.was_terastallized',
+}
+
+
+@dataclasses.dataclass(frozen=True)
+class StoredSide:
+    """One player's side of a stored replay.
+
+    Attributes:
+        location: The location the replay was ingested from.
+        side: 1 for Player 1 and 2 for Player 2.
+        player_name: The name of the player.
+        is_winner: Whether the player won.
+    """
+    location: str
+    side: int
+    player_name: str
+    is_winner: bool
+
+
+class ReplayStore:
+    """A multi-process safe SQLite database of parsed replays.
+
+    Attributes:
+        path: The location of the database.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.fspath(path)
+        self._database = SqliteDatabase(self.path, _SCHEMA)
+        self._lock = threading.Lock()
+
+    def add_replays(self, replays: Iterable[Tuple[str, ShowdownReplay]]) -> int:
+        """Stores parsed replays, replacing stored replays from the same locations.
+
+        Args:
+            replays: The location and parsed replay of every replay.
+
+        Returns:
+            The number of replays stored.
+        """
+        stored = 0
+        batch = []
+        for item in replays:
+            batch.append(item)
+            if len(batch) == _BATCH_SIZE:
+                stored += self._insert(batch)
+                batch = []
+        if batch:
+            stored += self._insert(batch)
+        return stored
+
+    def ingest(
+            self,
+            locations: Iterable[str],
+            cache: ReplayCache = None,
+            mode: str = 'full'
+    ) -> int:
+        """Retrieves, parses and stores the replays that are not stored yet.
+
+        Args:
+            locations: The locations of the replays, local files or URLs.
+            cache: The cache of battle logs to retrieve replays through.
+            mode: full, or summary to skip counting move uses. See showdown.parse_replay.
+
+        Returns:
+            The number of replays stored.
+        """
+        factory = ShowdownReplayRetrievalStrategyFactory()
+        stored = self._stored_locations()
+
+        def parsed_replays():
+            for location in locations:
+                location = os.fspath(location)
+                if location in stored:
+                    continue
+                strategy = factory.resolve_strategy(location, cache=cache)
+                try:
+                    battle_log = strategy.retrieve_replay(location)
+                finally:
+                    strategy.close()
+                yield location, parse_replay(battle_log, mode)
+
+        return self.add_replays(parsed_replays())
+
+    def find(self, limit: int = None, **filters) -> List[StoredSide]:
+        """Finds the sides of the stored replays matching every filter.
+
+        A side matches when one of its team slots matches every team slot
+        filter. Filters that are None or omitted match every side.
+
+        Args:
+            limit: The maximum number of sides to return.
+            **filters: The filters, any of
+                species: The species of a team slot, e.g. 'Flutter Mane'.
+                tera_type: The Tera type of the same team slot.
+                brought: Whether the same team slot was brought.
+                lead: Whether the same team slot was a lead.
+                terastallized: Whether the same team slot terastallized.
+                player: The name of the player of the side.
+                opponent: The name of the other player of the replay.
+                won: Whether the side won.
+
+        Returns:
+            The matching sides, ordered by replay and side.
+
+        Raises:
+            TypeError: If a filter is unknown.
+        """
+        where, parameters = _where(filters)
+        sql = f'''
+            SELECT DISTINCT replay.location, side.side, player.name, side.is_winner, replay.id
+            FROM team_slots AS slot
+            JOIN sides AS side ON side.replay_id = slot.replay_id AND side.side = slot.side
+            JOIN replays AS replay ON replay.id = slot.replay_id
+            JOIN players AS player ON player.id = side.player_id
+            {_opponent_join(filters)}
+            WHERE {where}
+            ORDER BY replay.id, side.side
+        '''
+        if limit is not None:
+            sql += ' LIMIT ?'
+            parameters.append(limit)
+        return [
+            StoredSide(location, side, player_name, bool(is_winner))
+            for location, side, player_name, is_winner, _ in self.query(sql, parameters)
+        ]
+
+    def count(self, **filters) -> Tuple[int, int]:
+        """Counts the sides of the stored replays matching every filter, and the ones that won.
+
+        Args:
+            **filters: The filters, see find.
+
+        Returns:
+            The number of matching sides and the number of them that won.
+
+        Raises:
+            TypeError: If a filter is unknown.
+        """
+        where, parameters = _where(filters)
+        games, wins = self.query(f'''
+            SELECT COUNT(*), COALESCE(SUM(is_winner), 0) FROM (
+                SELECT DISTINCT side.replay_id, side.side, side.is_winner
+                FROM team_slots AS slot
+                JOIN sides AS side ON side.replay_id = slot.replay_id AND side.side = slot.side
+                {_player_join(filters)}
+                {_opponent_join(filters)}
+                WHERE {where}
+            )
+        ''', parameters)[0]
+        return games, wins
+
+    def query(self, sql: str, parameters: Iterable = ()) -> List[tuple]:
+        """Runs a read-only SQL query against the tables of the store.
+
+        Args:
+            sql: The query.
+            parameters: The values of its parameters.
+
+        Returns:
+            The rows of the result.
+        """
+        with self._lock:
+            return self._connect().execute(sql, tuple(parameters)).fetchall()
+
+    def __contains__(self, location: str) -> bool:
+        return bool(self.query('SELECT 1 FROM replays WHERE location = ?', (os.fspath(location),)))
+
+    def __len__(self) -> int:
+        return self.query('SELECT COUNT(*) FROM replays')[0][0]
+
+    def close(self) -> None:
+        """Closes the connection to the database."""
+        with self._lock:
+            self._database.close()
+
+    def __enter__(self) -> 'ReplayStore':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _stored_locations(self) -> set:
+        return {location for location, in self.query('SELECT location FROM replays')}
+
+    def _insert(self, batch: List[Tuple[str, ShowdownReplay]]) -> int:
+        with self._lock:
+            connection = self._connect()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                connection.executemany(
+                    'DELETE FROM replays WHERE location = ?',
+                    ((location,) for location, _ in batch)
+                )
+                connection.executemany(
+                    'INSERT OR IGNORE INTO players (name) VALUES (?)',
+                    (
+                        (player_info.player_name,)
+                        for _, replay in batch
+                        for player_info in (replay.player1_info, replay.player2_info)
+                    )
+                )
+                player_ids = dict(connection.execute('SELECT name, id FROM players'))
+                # IDs are assigned here so every table is inserted with executemany.
+                replay_id, slot_id = connection.execute(
+                    'SELECT (SELECT COALESCE(MAX(id), 0) FROM replays), '
+                    '(SELECT COALESCE(MAX(id), 0) FROM team_slots)'
+                ).fetchone()
+                replays, sides, slots, moves = [], [], [], []
+                for location, replay in batch:
+                    replay_id += 1
+                    replays.append((replay_id, location, replay.winner, int(replay.is_ots)))
+                    for side, player_info in enumerate((replay.player1_info, replay.player2_info), start=1):
+                        sides.append((replay_id, side, player_ids[player_info.player_name],
+                                      int(player_info.is_winner)))
+                        for slot, pokemon in enumerate(player_info.team.pokemon):
+                            slot_id += 1
+                            slots.append((
+                                slot_id, replay_id, side, slot, pokemon.species, pokemon.nickname,
+                                pokemon.tera_type, pokemon.ability, pokemon.item, int(pokemon.was_brought),
+                                int(pokemon.was_lead), int(pokemon.was_terastallized)
+                            ))
+                            moves.extend((slot_id, move.name, move.times_used) for move in pokemon.moves)
+                            struggle = pokemon._struggle  # pylint: disable=protected-access
+                            if struggle is not None and struggle.times_used:
+                                moves.append((slot_id, struggle.name, struggle.times_used))
+                connection.executemany('INSERT INTO replays VALUES (?, ?, ?, ?)', replays)
+                connection.executemany('INSERT INTO sides VALUES (?, ?, ?, ?)', sides)
+                connection.executemany(
+                    'INSERT INTO team_slots VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    slots
+                )
+                connection.executemany('INSERT INTO moves VALUES (?, ?, ?)', moves)
+                connection.execute('COMMIT')
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+        return len(batch)
+
+    def _connect(self) -> sqlite3.Connection:
+        return self._database.connect()
+
+
+def _where(filters: dict) -> Tuple[str, list]:
+    unknown = set(filters) - set(_SLOT_FILTERS) - {'player', 'opponent', 'won'}
+    if unknown:
+        raise TypeError(f'Unknown filters {sorted(unknown)}')
+    conditions = ['1']
+    parameters = []
+    for name, column in _SLOT_FILTERS.items():
+        value = filters.get(name)
+        if value is not None:
+            conditions.append(f'{column} = ?')
+            parameters.append(int(value) if isinstance(value, bool) else value)
+    if filters.get('player') is not None:
+        conditions.append('player.name = ?')
+        parameters.append(filters['player'])
+    if filters.get('opponent') is not None:
+        conditions.append('opponent_player.name = ?')
+        parameters.append(filters['opponent'])
+    if filters.get('won') is not None:
+        conditions.append('side.is_winner = ?')
+        parameters.append(int(filters['won']))
+    return ' AND '.join(conditions), parameters
+
+
+def _player_join(filters: dict) -> str:
+    if filters.get('player') is None:
+        return ''
+    return 'JOIN players AS player ON player.id = side.player_id'
+
+
+def _opponent_join(filters: dict) -> str:
+    if filters.get('opponent') is None:
+        return ''
+    return '''
+        JOIN sides AS opponent ON opponent.replay_id = slot.replay_id AND opponent.side = 3 - slot.side
+        JOIN players AS opponent_player ON opponent_player.id = opponent.player_id
+    '''
@@ -0,0 +1,518 @@
+"""Deterministic synthetic Showdown battle logs for benchmarks and load tests
+
+The generated battle logs follow the structure of real VGC replays: the
+player and team preview headers, Open Team Sheets showteam lines or plain
+poke lines, switches, moves, damage, terastallization, faints and the
+result, together with the lines the parser skips. Teams are drawn from a
+popular core of species with a long tail, and include nicknames, forms that
+team preview hides such as Urshifu-*, Struggle and long games.
+
+Every battle log depends only on the seed, the options and its index, so a
+corpus of any size can be generated in any order and in parallel.
+
+Example usage:
+
+    generator = BattleLogGenerator(seed=1)
+    for battle_log in generator.battle_logs(100000):
+        replay = parse_replay(battle_log)
+    write_replays('.out/synthetic', generator, 1000)
+"""
+import dataclasses
+import html
+import json
+import os
+import pathlib
+import random
+from typing import Dict, Iterator, List, Tuple
+
+from .dex import default_dex
+
+_MOVE_NAMES_FILE = pathlib.Path(__file__).parent / 'data' / 'moves.json'
+
+# Species seen most often on the VGC ladder, most popular first. The rest of
+# the pool is drawn from the dex.
+_POPULAR_SPECIES = [
+    'Flutter Mane', 'Incineroar', 'Rillaboom', 'Urshifu-Rapid-Strike', 'Amoonguss',
+    'Ogerpon-Hearthflame', 'Tornadus', 'Landorus', 'Chien-Pao', 'Farigiraf',
+    'Calyrex-Shadow', 'Miraidon', 'Raging Bolt', 'Urshifu', 'Iron Hands',
+    'Gholdengo', 'Chi-Yu', 'Ogerpon-Wellspring', 'Indeedee-F', 'Whimsicott',
+    'Ursaluna-Bloodmoon', 'Koraidon', 'Calyrex-Ice', 'Regidrago', 'Kingambit',
+    'Dragonite', 'Pelipper', 'Archaludon', 'Grimmsnarl', 'Iron Boulder',
+    'Ogerpon-Cornerstone', 'Sinistcha', 'Arcanine-Hisui', 'Zamazenta-Crowned',
+    'Terapagos', 'Iron Bundle', 'Gastrodon', 'Annihilape', 'Talonflame', 'Porygon2',
+]
+# Team preview shows these species as <base species>-*.
+_PREVIEW_HIDDEN_FORMS = frozenset(['Urshifu'])
+# These species change form when they terastallize.
+_TERA_FORMS = frozenset(['Ogerpon', 'Terapagos'])
+_EXCLUDED_FORMS = ('-Mega', '-Gmax', '-Totem', '-Primal', '-Eternamax')
+_ITEMS = [
+    'Focus Sash', 'Sitrus Berry', 'Choice Scarf', 'Choice Specs', 'Assault Vest',
+    'Life Orb', 'Safety Goggles', 'Booster Energy', 'Covert Cloak', 'Clear Amulet',
+    'Rocky Helmet', 'Leftovers', 'Mystic Water', 'Charcoal', 'Wide Lens', 'Lum Berry',
+]
+# Moves usable in Generation 9. The bundled move data also lists Max, G-Max,
+# Z- and removed moves, which no Generation 9 team can have.
+_MOVES = [
+    'Protect', 'Detect', 'Spiky Shield', 'Burning Bulwark', 'Wide Guard', 'Quick Guard',
+    'Fake Out', 'Follow Me', 'Rage Powder', 'Ally Switch', 'Helping Hand', 'Coaching',
+    'Tailwind', 'Trick Room', 'Rain Dance', 'Sunny Day', 'Snowscape', 'Chilly Reception',
+    'Taunt', 'Encore', 'Spore', 'Yawn', 'Thunder Wave', 'Will-O-Wisp', 'Haze', 'Roar',
+    'Light Screen', 'Reflect', 'Substitute', 'Leech Seed', 'Trick', 'Memento', 'Shed Tail',
+    'Recover', 'Moonlight', 'Life Dew', 'Swords Dance', 'Nasty Plot', 'Calm Mind', 'Bulk Up',
+    'Dragon Dance', 'Tidy Up', 'Parting Shot', 'U-turn', 'Volt Switch', 'Knock Off',
+    'Flare Blitz', 'Heat Wave', 'Overheat', 'Flamethrower', 'Torch Song', 'Temper Flare',
+    'Wood Hammer', 'Grassy Glide', 'Horn Leech', 'Ivy Cudgel', 'Leaf Storm', 'Giga Drain',
+    'Energy Ball', 'Pollen Puff', 'Matcha Gotcha', 'Trailblaze', 'Surging Strikes',
+    'Wicked Blow', 'Close Combat', 'Drain Punch', 'Sacred Sword', 'Aura Sphere', 'Upper Hand',
+    'Vacuum Wave', 'Body Press', 'Aqua Jet', 'Jet Punch', 'Wave Crash', 'Aqua Step',
+    'Hydro Pump', 'Muddy Water', 'Scald', 'Hydro Steam', 'Chilling Water', 'Moonblast',
+    'Dazzling Gleam', 'Play Rough', 'Spirit Break', 'Alluring Voice', 'Shadow Ball',
+    'Shadow Sneak', 'Poltergeist', 'Astral Barrage', 'Rage Fist', 'Last Respects', 'Icy Wind',
+    'Icicle Crash', 'Ice Spinner', 'Glacial Lance', 'Freeze-Dry', 'Blizzard', 'Thunderbolt',
+    'Thunder', 'Thunderclap', 'Electro Drift', 'Electro Shot', 'Wild Charge', 'Supercell Slam',
+    'Discharge', 'Draco Meteor', 'Dragon Pulse', 'Dragon Claw', 'Scale Shot', 'Outrage',
+    'Glaive Rush', 'Order Up', 'Dragon Cheer', 'Psychic', 'Psyshock', 'Expanding Force',
+    'Psychic Noise', 'Psychic Fangs', 'Twin Beam', 'Earthquake', 'High Horsepower',
+    'Earth Power', 'Stomping Tantrum', 'Rock Slide', 'Stone Edge', 'Salt Cure', 'Mighty Cleave',
+    'Iron Head', 'Heavy Slam', 'Flash Cannon', 'Make It Rain', 'Behemoth Bash', 'Gigaton Hammer',
+    'Bullet Punch', 'Hard Press', 'Sucker Punch', 'Kowtow Cleave', 'Crunch', 'Dark Pulse',
+    'Snarl', 'Ruination', 'Comeuppance', 'Sludge Bomb', 'Clear Smog', 'Gunk Shot', 'Poison Jab',
+    'Syrup Bomb', 'Bleakwind Storm', 'Hurricane', 'Air Slash', 'Brave Bird', 'Acrobatics',
+    'Bug Buzz', 'Lunge', 'Pounce', 'Struggle Bug', 'Population Bomb', 'Extreme Speed',
+    'Hyper Voice', 'Weather Ball', 'Facade', 'Double-Edge', 'Body Slam', 'Tera Blast',
+    'Tera Starstorm', 'Blood Moon', 'Collision Course', 'Fickle Beam', 'Revival Blessing',
+]
+_NICKNAMES = [
+    'Sparky', 'Bubbles', 'Nightmare', 'Mochi', 'Tank', 'Ghost', 'Biscuit', 'Zap',
+    'Pebble', 'Fang', 'Blaze', 'Nova', 'Shadow', 'Pudding', 'Echo', 'Rex',
+]
+_TYPES = [
+    'Bug', 'Dark', 'Dragon', 'Electric', 'Fairy', 'Fighting', 'Fire', 'Flying', 'Ghost',
+    'Grass', 'Ground', 'Ice', 'Normal', 'Poison', 'Psychic', 'Rock', 'Steel', 'Water', 'Stellar',
+]
+_CHAT = ['gl hf', 'glhf', 'gg', 'wp', 'oops', 'nice']
+# The number of sets, i.e. moves, ability, item and Tera type, of each species.
+_SETS_PER_SPECIES = 3
+_START_TIME = 1704067200
+_MAX_TURNS = 250
+
+_HTML_TEMPLATE = '''<!DOCTYPE html>
+<meta charset="utf-8" />
+<!-- version 1 -->
+<title>{title}</title>
+<div class="wrapper replay-wrapper" style="max-width:1180px;margin:0 auto">
+<input type="hidden" name="replayid" value="{replay_id}" />
+<div class="battle"></div><div class="battle-log"></div><div class="replay-controls"></div><div class="replay-controls-2"></div>
+<h1 style="font-weight:normal;text-align:center"><strong>{format}</strong><br />
+    <a href="http://pokemonshowdown.com/users/{player1_id}" class="subtle" target="_blank">{player1}</a> vs. <a href="http://pokemonshowdown.com/users/{player2_id}" class="subtle" target="_blank">{player2}</a>
+</h1>
+<script type="text/plain" class="battle-log-data">
+{battle_log}
+</script>
+</div>
+<script>
+let daily = Math.floor(Date.now()/1000/60/60/24);document.write('<script src="https://play.pokemonshowdown.com/js/replay-embed.js?version'+daily+'"></'+'script>');
+</script>
+'''
+
+
+@dataclasses.dataclass(slots=True)
+class _SyntheticPokemon:
+    species: str
+    base_species: str
+    nickname: str
+    gender: str
+    item: str
+    ability: str
+    tera_type: str
+    # The ID and display name of every move.
+    moves: List[Tuple[str, str]]
+    hp: int = 100
+    is_terastallized: bool = False
+
+    def details(self) -> str:
+        """Formats the details of the switch and replace lines, e.g. Flutter Mane, L50, tera:Fairy."""
+        species = self.species
+        if self.is_terastallized and self.base_species in _TERA_FORMS:
+            species += '-Tera'
+        details = f'{species}, L50'
+        if self.gender:
+            details += f', {self.gender}'
+        if self.is_terastallized:
+            details += f', tera:{self.tera_type}'
+        return details
+
+    def preview_details(self) -> str:
+        """Formats the details of the team preview poke lines, which hide some forms."""
+        species = f'{self.base_species}-*' if self.base_species in _PREVIEW_HIDDEN_FORMS else self.species
+        return f'{species}, L50, {self.gender}' if self.gender else f'{species}, L50'
+
+    def packed(self) -> str:
+        """Formats the Pokemon in the packed team format of the showteam lines."""
+        # NICKNAME|SPECIES|ITEM|ABILITY|MOVES|NATURE|EVS|GENDER|IVS|SHINY|LEVEL|...,TERATYPE
+        nickname, species = (self.nickname, self.species) \
+            if self.nickname != self.base_species \
+            else (self.species, '')
+        return '|'.join([
+            nickname,
+            species,
+            _to_packed_id(self.item),
+            _to_packed_id(self.ability),
+            ','.join(move_id for move_id, _ in self.moves),
+            '',
+            '',
+            self.gender,
+            '',
+            '',
+            '50',
+            f',,,,,{self.tera_type}',
+        ])
+
+
+class BattleLogGenerator:
+    """Generates realistic, reproducible Showdown battle logs.
+
+    Attributes:
+        seed: The seed of every battle log.
+        battle_format: The format name on the |tier| line.
+        ots_rate: The fraction of battles with Open Team Sheets.
+        nickname_rate: The fraction of Pokemon with a nickname.
+        tera_rate: The fraction of battles in which each player terastallizes.
+        struggle_rate: The fraction of moves that are Struggle.
+        long_game_rate: The fraction of battles that last many more turns.
+    """
+
+    def __init__(
+            self,
+            seed: int = 0,
+            battle_format: str = '[Gen 9] VGC 2024 Reg G',
+            ots_rate: float = 0.5,
+            nickname_rate: float = 0.15,
+            tera_rate: float = 0.9,
+            struggle_rate: float = 0.002,
+            long_game_rate: float = 0.02,
+            players: int = 1000,
+            species: int = 300
+    ):
+        """Creates a generator.
+
+        Arguments:
+            seed: The seed of every battle log.
+            battle_format: The format name on the |tier| line.
+            ots_rate: The fraction of battles with Open Team Sheets.
+            nickname_rate: The fraction of Pokemon with a nickname.
+            tera_rate: The fraction of battles in which each player terastallizes.
+            struggle_rate: The fraction of moves that are Struggle.
+            long_game_rate: The fraction of battles that last many more turns.
+            players: The number of distinct player names.
+            species: The number of species teams are drawn from.
+        """
+        self.seed = seed
+        self.battle_format = battle_format
+        self.ots_rate = ots_rate
+        self.nickname_rate = nickname_rate
+        self.tera_rate = tera_rate
+        self.struggle_rate = struggle_rate
+        self.long_game_rate = long_game_rate
+        self._players = [f'trainer{i:05d}' for i in range(max(players, 2))]
+        dex = default_dex()
+        pool = list(_POPULAR_SPECIES)
+        popular = set(pool)
+        for name in dex.species.names:
+            if len(pool) >= species:
+                break
+            if name not in popular and not any(form in name for form in _EXCLUDED_FORMS):
+                pool.append(name)
+        self._species = pool[:max(species, 6)]
+        self._base_species = {name: dex.base_species(name) for name in self._species}
+        # Some species are much more popular than others, like on the ladder.
+        self._species_weights = list(_cumulative(1 / (rank + 1) for rank in range(len(self._species))))
+        self._abilities = [name for name in dex.abilities.names if name]
+        move_ids = {
+            name: move_id
+            for move_id, name in json.loads(_MOVE_NAMES_FILE.read_text(encoding='utf-8')).items()
+        }
+        self._moves = [(move_ids[name], name) for name in _MOVES]
+        self._sets: Dict[str, List[tuple]] = {}
+
+    def battle_log(self, index: int) -> str:
+        """Generates a battle log.
+
+        Arguments:
+            index: The number of the battle log. The same seed, options and
+                index always generate the same battle log.
+
+        Returns:
+            The battle log, as extracted from a downloaded replay.
+        """
+        rng = random.Random(f'{self.seed}:{index}')
+        return '\n'.join(self._battle_lines(rng))
+
+    def battle_logs(self, count: int, start: int = 0) -> Iterator[str]:
+        """Generates consecutive battle logs.
+
+        Arguments:
+            count: The number of battle logs.
+            start: The index of the first battle log.
+
+        Returns:
+            An iterator of the battle logs.
+        """
+        return (self.battle_log(index) for index in range(start, start + count))
+
+    def replay_html(self, index: int) -> str:
+        """Generates a battle log wrapped in the HTML of a downloaded replay.
+
+        Arguments:
+            index: The number of the battle log.
+
+        Returns:
+            The HTML of the replay.
+        """
+        return wrap_html(self.battle_log(index), replay_id=f'synthetic-{self.seed}-{index}')
+
+    def _team(self, rng: random.Random) -> List[_SyntheticPokemon]:
+        team = []
+        base_species = set()
+        while len(team) < 6:
+            species = rng.choices(self._species, cum_weights=self._species_weights)[0]
+            base = self._base_species[species]
+            # Species Clause
+            if base in base_species:
+                continue
+            base_species.add(base)
+            nickname = base
+            if rng.random() < self.nickname_rate:
+                nickname = f'{rng.choice(_NICKNAMES)}{len(team)}'
+            item, ability, tera_type, moves = rng.choice(self._species_sets(species))
+            team.append(_SyntheticPokemon(
+                species=species,
+                base_species=base,
+                nickname=nickname,
+                gender=rng.choice(('M', 'F', '')),
+                item=item,
+                ability=ability,
+                tera_type=tera_type,
+                moves=moves
+            ))
+        return team
+
+    def _species_sets(self, species: str) -> List[tuple]:
+        # Every species has a few sets shared by the whole corpus, like the
+        # popular sets of the ladder.
+        sets = self._sets.get(species)
+        if sets is None:
+            rng = random.Random(f'{self.seed}:{species}')
+            sets = self._sets[species] = [
+                (rng.choice(_ITEMS), rng.choice(self._abilities), rng.choice(_TYPES), rng.sample(self._moves, 4))
+                for _ in range(_SETS_PER_SPECIES)
+            ]
+        return sets
+
+    def _battle_lines(self, rng: random.Random) -> List[str]:
+        # pylint: disable=too-many-locals,too-many-branches,too-many-statements
+        player_names = rng.sample(self._players, 2)
+        teams = [self._team(rng), self._team(rng)]
+        is_ots = rng.random() < self.ots_rate
+        # Long games deal less damage per hit.
+        max_damage = 8 if rng.random() < self.long_game_rate else 70
+        time = _START_TIME + rng.randrange(10 ** 7)
+
+        lines = [f'|j|☆{name}' for name in player_names]
+        lines.append('')
+        lines.extend(f'|n|☆{name}|{_to_user_id(name)}' for name in player_names)
+        lines.extend([f'|t:|{time}', '|gametype|doubles'])
+        lines.extend(
+            f'|player|p{side + 1}|{name}|{rng.randrange(1, 300)}|{rng.randrange(1000, 1900)}'
+            for side, name in enumerate(player_names)
+        )
+        lines.extend(['|teamsize|p1|6', '|teamsize|p2|6', '|gen|9', f'|tier|{self.battle_format}', '|rated|',
+                      '|rule|Species Clause: Limit one of each Pokémon',
+                      '|rule|Item Clause: Limit one of each item', '|clearpoke'])
+        for side, team in enumerate(teams):
+            lines.extend(f'|poke|p{side + 1}|{pokemon.preview_details()}|' for pokemon in team)
+        lines.append('|teampreview|4')
+        if is_ots:
+            lines.extend(
+                f'|showteam|p{side + 1}|' + ']'.join(pokemon.packed() for pokemon in team)
+                for side, team in enumerate(teams)
+            )
+        if rng.random() < 0.3:
+            lines.append(f'|c|☆{player_names[0]}|{rng.choice(_CHAT)}')
+        lines.extend(['|', f'|t:|{time + 30}', '|start'])
+
+        # The Pokemon brought by each side, the first two of which lead.
+        benches = [rng.sample(team, 4) for team in teams]
+        active: List[List[_SyntheticPokemon]] = [[None, None], [None, None]]
+        tera_turns = [
+            rng.randrange(1, 4) if rng.random() < self.tera_rate else None
+            for _ in teams
+        ]
+        for side in range(2):
+            for slot in range(2):
+                self._switch_in(lines, active, benches, side, slot)
+
+        turn = 0
+        winner = None
+        while winner is None:
+            turn += 1
+            lines.append(f'|turn|{turn}')
+            lines.extend(['|', f'|t:|{time + 30 + 20 * turn}'])
+            if turn > _MAX_TURNS:
+                hp = [sum(pokemon.hp for pokemon in bench) for bench in benches]
+                winner = 0 if hp[0] >= hp[1] else 1
+                break
+            for side in range(2):
+                if tera_turns[side] == turn:
+                    pokemon = next((p for p in active[side] if p is not None), None)
+                    if pokemon is not None:
+                        pokemon.is_terastallized = True
+                        lines.append(f'|-terastallize|{_position(side, active[side].index(pokemon))}: '
+                                     f'{pokemon.nickname}|{pokemon.tera_type}')
+                        if pokemon.base_species in _TERA_FORMS:
+                            lines.append(f'|detailschange|{_position(side, active[side].index(pokemon))}: '
+                                         f'{pokemon.nickname}|{pokemon.details()}')
+            # A voluntary switch now and then.
+            for side in range(2):
+                slot = rng.randrange(2)
+                if active[side][slot] is not None and rng.random() < 0.1 \
+                        and any(p.hp and p not in active[side] for p in benches[side]):
+                    self._switch_in(lines, active, benches, side, slot, rng)
+            order = [(side, slot) for side in range(2) for slot in range(2)]
+            rng.shuffle(order)
+            for side, slot in order:
+                attacker = active[side][slot]
+                targets = [(target, p) for target, p in enumerate(active[1 - side]) if p is not None]
+                if attacker is None or not attacker.hp or not targets:
+                    continue
+                target_slot, target = rng.choice(targets)
+                move = 'Struggle' if rng.random() < self.struggle_rate else rng.choice(attacker.moves)[1]
+                lines.append(f'|move|{_position(side, slot)}: {attacker.nickname}|{move}|'
+                             f'{_position(1 - side, target_slot)}: {target.nickname}')
+                if rng.random() < 0.1:
+                    lines.append(f'|-miss|{_position(side, slot)}: {attacker.nickname}|'
+                                 f'{_position(1 - side, target_slot)}: {target.nickname}')
+                    continue
+                target.hp = max(0, target.hp - rng.randint(1, max_damage))
+                hp = f'{target.hp}\\/100' if target.hp else '0 fnt'
+                lines.append(f'|-damage|{_position(1 - side, target_slot)}: {target.nickname}|{hp}')
+                if not target.hp:
+                    lines.append(f'|faint|{_position(1 - side, target_slot)}: {target.nickname}')
+                    active[1 - side][target_slot] = None
+            lines.extend(['|', '|upkeep'])
+            for side in range(2):
+                for slot in range(2):
+                    if active[side][slot] is None:
+                        self._switch_in(lines, active, benches, side, slot)
+            alive = [any(pokemon.hp for pokemon in bench) for bench in benches]
+            if not alive[0] or not alive[1]:
+                winner = 0 if alive[0] else 1
+
+        lines.extend(['|', f'|win|{player_names[winner]}'])
+        if rng.random() < 0.5:
+            lines.append(f'|c|☆{player_names[1 - winner]}|gg')
+        return lines
+
+    @staticmethod
+    def _switch_in(
+            lines: List[str],
+            active: List[List[_SyntheticPokemon]],
+            benches: List[List[_SyntheticPokemon]],
+            side: int,
+            slot: int,
+            rng: random.Random = None
+    ) -> None:
+        # Switches in the first healthy benched Pokemon, or a random one.
+        bench = [pokemon for pokemon in benches[side] if pokemon.hp and pokemon not in active[side]]
+        if not bench:
+            return
+        pokemon = rng.choice(bench) if rng is not None else bench[0]
+        active[side][slot] = pokemon
+        lines.append(f'|switch|{_position(side, slot)}: {pokemon.nickname}|{pokemon.details()}|{pokemon.hp}\\/100')
+
+
+def wrap_html(battle_log: str, title: str = None, replay_id: str = 'synthetic') -> str:
+    """Wraps a battle log in the HTML of a downloaded Showdown replay.
+
+    Arguments:
+        battle_log: The battle log.
+        title: The title of the page, by default the format and the players.
+        replay_id: The replay ID in the page.
+
+    Returns:
+        The HTML of the replay.
+    """
+    players = ['', '']
+    battle_format = ''
+    for line in battle_log.split('\n'):
+        if line.startswith('|player|p1|') or line.startswith('|player|p2|'):
+            players[int(line[9]) - 1] = line.split('|')[3]
+        elif line.startswith('|tier|'):
+            battle_format = line[len('|tier|'):]
+    if title is None:
+        title = f'{battle_format} replay: {players[0]} vs. {players[1]}'
+    # The battle log is indented like the page Showdown serves, and a closing
+    # tag in it would end the script element early.
+    script = '\n'.join(
+        f'        {line}' if line else ''
+        for line in battle_log.replace('</', '<\\/').split('\n')
+    )
+    return _HTML_TEMPLATE.format(
+        title=html.escape(title),
+        replay_id=html.escape(replay_id),
+        format=html.escape(battle_format),
+        player1=html.escape(players[0]),
+        player2=html.escape(players[1]),
+        player1_id=_to_user_id(players[0]),
+        player2_id=_to_user_id(players[1]),
+        battle_log=script
+    )
+
+
+def write_replays(
+        directory: str,
+        generator: BattleLogGenerator,
+        count: int,
+        start: int = 0,
+        as_html: bool = True
+) -> List[str]:
+    """Writes generated replays to files, like a directory of downloaded replays.
+
+    Arguments:
+        directory: The directory to write to. It is created if needed.
+        generator: The generator of the battle logs.
+        count: The number of replays.
+        start: The index of the first battle log.
+        as_html: Whether to write downloaded-replay HTML or bare battle logs.
+
+    Returns:
+        The paths of the written files.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for index in range(start, start + count):
+        path = os.path.join(directory, f'synthetic-{generator.seed}-{index}.{"html" if as_html else "log"}')
+        content = generator.replay_html(index) if as_html else generator.battle_log(index)
+        pathlib.Path(path).write_text(content, encoding='utf-8')
+        paths.append(path)
+    return paths
+
+
+def _position(side: int, slot: int) -> str:
+    return f'p{side + 1}{"ab"[slot]}'
+
+
+def _to_packed_id(name: str) -> str:
+    return ''.join(character for character in name if character.isalnum())
+
+
+def _to_user_id(name: str) -> str:
+    return ''.join(character for character in name.lower() if character.isalnum())
+
+
+def _cumulative(values: Iterator[float]) -> Iterator[float]:
+    total = 0.0
+    for value in values:
+        total += value
+        yield total
@@ -1,7 +1,7 @@
 import os
 import sys
 
-from showdown_replay_analyzer import pokemon, pokepaste, showdown
+from showdown_replay_analyzer import aggregate, bulk, cache, cores, dex, events, filters, handlers, instrumentation, matchups, packed_team, pokemon, pokepaste, serialization, showdown, store, synthetic
 
 sys.path.insert(
     0,
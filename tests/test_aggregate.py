@@ -0,0 +1,212 @@
+import io
+import json
+import pathlib
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+import main
+
+from .context import aggregate, dex, pokemon
+from .html_utils import get_resource_location
+
+_SHOWDOWN_REPLAY_RESOURCE = 'Gen9VGC2024RegFBo3-2024-02-24-tearsricochet-quartermachine.html'
+
+
+def _write_usage(statistics: aggregate.UsageAggregate) -> str:
+    out_csv = io.StringIO()
+    main._write_usage_csv(statistics.rows, out_csv)
+    return '\n'.join([
+        json.dumps(statistics.usage_by_name(statistics.user_usage)),
+        json.dumps(statistics.usage_by_name(statistics.opponent_usage)),
+        out_csv.getvalue()
+    ])
+
+
+def _team(*pokemon_sets) -> pokemon.Team:
+    return pokemon.Team([
+        pokemon.Pokemon(
+            species,
+            tera_type=tera_type,
+            ability=ability,
+            item=item,
+            moves=[pokemon.Move(move) for move in moves]
+        )
+        for species, tera_type, ability, item, moves in pokemon_sets
+    ])
+
+
+class UsageAggregateTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        html = get_resource_location(_SHOWDOWN_REPLAY_RESOURCE).read_text(encoding='utf8')
+        variants = [
+            html,
+            html.replace('Quarter Machine', 'ironpumpernickel'),
+            html.replace('Tailwind', 'Rain Dance').replace('|win|Quarter Machine', '|win|Tears ricochet'),
+            # Without open team sheets the Tera types are unknown.
+            html.replace('|showteam|', '|c|'),
+        ]
+        self.locations = []
+        for i, variant in enumerate(variants * 2):
+            location = f'{self.directory}/replay-{i:02d}.html'
+            pathlib.Path(location).write_text(variant, encoding='utf8')
+            self.locations.append(location)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_merge_is_associative(self):
+        whole = main._analyze_files(self.locations)
+        first, second, third = (
+            main._analyze_files(self.locations[start:end])
+            for start, end in ((0, 3), (3, 5), (5, 8))
+        )
+        left = aggregate.UsageAggregate()
+        left.merge(first)
+        left.merge(second)
+        left.merge(third)
+        right = aggregate.UsageAggregate()
+        right.merge(second)
+        right.merge(third)
+        grouped = aggregate.UsageAggregate()
+        grouped.merge(first)
+        grouped.merge(right)
+        self.assertEqual(_write_usage(left), _write_usage(whole))
+        self.assertEqual(_write_usage(grouped), _write_usage(whole))
+
+    def test_save_and_load(self):
+        statistics = main._analyze_files(self.locations)
+        path = f'{self.directory}/shard.sra'
+        statistics.save(path)
+        loaded = aggregate.UsageAggregate.load(path)
+        self.assertEqual(loaded, statistics)
+        self.assertTrue(any(
+            None in pokemon_usage['tera']
+            for species, pokemon_usage in loaded.usage_by_name(loaded.user_usage).items()
+            if species != 'total'
+        ))
+        self.assertLess(pathlib.Path(path).stat().st_size, len(_write_usage(statistics)))
+
+    def test_usage_is_keyed_by_dex_ids(self):
+        statistics = main._analyze_files(self.locations)
+        species_ids = [species for species in statistics.user_usage if species != 'total']
+        self.assertTrue(species_ids)
+        self.assertTrue(all(isinstance(species, int) for species in species_ids))
+        self.assertIn('Tailwind', json.dumps(statistics.usage_by_name(statistics.user_usage)))
+
+    def test_merge_names_outside_dex(self):
+        html = get_resource_location(_SHOWDOWN_REPLAY_RESOURCE).read_text(encoding='utf8')
+        location = f'{self.directory}/unknown.html'
+        pathlib.Path(location).write_text(html.replace('Tailwind', 'Made Up Move'), encoding='utf8')
+        merged = aggregate.UsageAggregate()
+        merged.merge(main._analyze_files([self.locations[1]]))
+        merged.merge(main._analyze_files([location]))
+        self.assertNotIn('Made Up Move', dex.default_dex().moves)
+        self.assertIn('Made Up Move', merged.dex.moves)
+        by_name = json.dumps(merged.usage_by_name(merged.user_usage))
+        self.assertIn('Made Up Move', by_name)
+        self.assertIn('Tailwind', by_name)
+
+    def test_merge_shards(self):
+        paths = []
+        for start, end in ((0, 4), (4, 8)):
+            paths.append(f'{self.directory}/shard-{start}.sra')
+            main._analyze_files(self.locations[start:end]).save(paths[-1])
+        merged = main.merge_shards(paths)
+        self.assertEqual(_write_usage(merged), _write_usage(main._analyze_files(self.locations)))
+
+    def test_merge_shards_of_different_kinds(self):
+        usage_path = f'{self.directory}/usage.sra'
+        pokepaste_path = f'{self.directory}/pokepaste.sra'
+        aggregate.UsageAggregate().save(usage_path)
+        aggregate.PokepasteAggregate().save(pokepaste_path)
+        with self.assertRaises(ValueError):
+            main.merge_shards([usage_path, pokepaste_path])
+        with self.assertRaises(ValueError):
+            aggregate.UsageAggregate.load(pokepaste_path)
+
+    def test_load_invalid_shard(self):
+        path = pathlib.Path(self.directory, 'invalid.sra')
+        path.write_bytes(b'not a shard')
+        with self.assertRaises(ValueError):
+            aggregate.load_aggregate(str(path))
+        aggregate.UsageAggregate().save(str(path))
+        data = bytearray(path.read_bytes())
+        data[4] = aggregate.FORMAT_VERSION + 1
+        path.write_bytes(bytes(data))
+        with self.assertRaises(ValueError):
+            aggregate.load_aggregate(str(path))
+
+
+class PokepasteAggregateTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.teams = [
+            _team(
+                ('Incineroar', 'Ghost', 'Intimidate', 'Safety Goggles', ['Fake Out', 'Parting Shot']),
+                ('Rillaboom', 'Fire', 'Grassy Surge', 'Assault Vest', ['Fake Out', 'Wood Hammer']),
+            ),
+            _team(
+                ('Incineroar', 'Grass', 'Intimidate', None, ['Fake Out', 'Knock Off']),
+                ('Urshifu-*', None, 'Unseen Fist', 'Focus Sash', ['Wicked Blow']),
+            ),
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_merge_matches_adding_every_team(self):
+        whole = aggregate.PokepasteAggregate()
+        for team in self.teams:
+            whole.add_team(team)
+        first = aggregate.PokepasteAggregate()
+        first.add_team(self.teams[0])
+        second = aggregate.PokepasteAggregate()
+        second.add_team(self.teams[1])
+        first.merge(second)
+        self.assertEqual(first.summary(), whole.summary())
+        self.assertEqual(whole.summary()[0]['species'], 'Incineroar')
+        self.assertEqual(whole.summary()[0]['moves'], {'Fake Out': 2, 'Knock Off': 1, 'Parting Shot': 1})
+        self.assertEqual(list(whole.summary()[0]['item'].items()), [('Safety Goggles', 1), (None, 1)])
+
+    def test_save_and_load(self):
+        statistics = aggregate.PokepasteAggregate()
+        for team in self.teams:
+            statistics.add_team(team)
+        path = f'{self.directory}/pokepastes.sra'
+        statistics.save(path)
+        loaded = aggregate.load_aggregate(path)
+        self.assertIsInstance(loaded, aggregate.PokepasteAggregate)
+        self.assertEqual(loaded.summary(), statistics.summary())
+        self.assertEqual(loaded.to_json(), statistics.to_json())
+        self.assertEqual(
+            [stats['species'] for stats in json.loads(loaded.to_json())],
+            ['Incineroar', 'Rillaboom', 'Urshifu']
+        )
+
+    def test_names_outside_dex(self):
+        first = aggregate.PokepasteAggregate()
+        first.add_team(_team(('Missing-No', 'Stellar', 'Unknown Ability', 'Unknown Item', ['Unknown Move'])))
+        second = aggregate.PokepasteAggregate()
+        second.add_team(_team(('Incineroar', None, 'Intimidate', 'Other Item', ['Other Move'])))
+        second.add_team(_team(('Missing-No', None, 'Unknown Ability', 'Unknown Item', ['Unknown Move'])))
+        first.merge(second)
+        self.assertEqual(first.summary()[0], {
+            'species': 'Missing-No',
+            'count': 2,
+            'ability': {'Unknown Ability': 2},
+            'item': {'Unknown Item': 2},
+            'moves': {'Unknown Move': 2},
+            'tera': {'Stellar': 1, None: 1},
+        })
+        self.assertEqual(first.summary()[1]['item'], {'Other Item': 1})
+        default_dex = dex.default_dex()
+        for table, name in [(default_dex.species, 'Missing-No'), (default_dex.items, 'Unknown Item'),
+                            (default_dex.moves, 'Unknown Move'), (default_dex.items, 'Other Item')]:
+            self.assertNotIn(name, table)
+
+
+if __name__ == '__main__':
+    unittest.main()
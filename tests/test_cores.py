@@ -0,0 +1,106 @@
+import collections
+import itertools
+import unittest
+import unittest.mock
+
+from .context import cores, pokemon, showdown
+from .html_utils import get_resource_location
+
+_SHOWDOWN_REPLAY_RESOURCE = 'Gen9VGC2024RegFBo3-2024-02-24-tearsricochet-quartermachine.html'
+
+
+def _team(species, brought, leads, is_winner) -> showdown.PlayerInfo:
+    team = pokemon.Team([pokemon.Pokemon(name) for name in species])
+    for p in team.pokemon:
+        p.was_brought = p.species in brought
+        p.was_lead = p.species in leads
+    return showdown.PlayerInfo('player', team, is_winner)
+
+
+class CoreAggregatorTests(unittest.TestCase):
+    def setUp(self):
+        location = get_resource_location(_SHOWDOWN_REPLAY_RESOURCE)
+        battle_log = showdown.ShowdownDownloadReplayRetrievalStrategy().retrieve_replay(location)
+        self.player_infos = []
+        for variant in (
+                battle_log,
+                battle_log.replace('Tailwind', 'Rain Dance').replace('|win|Quarter Machine', '|win|Tears ricochet'),
+                battle_log.replace('Flutter Mane', 'Iron Bundle')):
+            replay = showdown.parse_replay(variant)
+            self.player_infos.extend([replay.player1_info, replay.player2_info])
+        self.aggregator = cores.CoreAggregator()
+        for player_info in self.player_infos:
+            self.aggregator.add(player_info)
+
+    def _count_pairs(self, selected) -> dict:
+        counts = collections.Counter()
+        wins = collections.Counter()
+        for player_info in self.player_infos:
+            species = [p.species for p in player_info.team.pokemon if selected(p)]
+            for pair in itertools.combinations(species, 2):
+                counts[frozenset(pair)] += 1
+                wins[frozenset(pair)] += player_info.is_winner
+        return {pair: (count, wins[pair]) for pair, count in counts.items()}
+
+    def test_top_pairs_match_every_pair(self):
+        for selection, selected in (
+                ('team', lambda p: True),
+                ('lead', lambda p: p.was_lead),
+                ('brought', lambda p: p.was_brought)):
+            with self.subTest(selection=selection):
+                expected = self._count_pairs(selected)
+                top = self.aggregator.top_pairs(len(expected) + 1, selection=selection)
+                self.assertEqual(
+                    {frozenset(core.species): (core.count, core.wins) for core in top},
+                    expected
+                )
+                self.assertEqual(
+                    [(core.count, core.wins) for core in self.aggregator.top_pairs(3, selection=selection)],
+                    sorted(expected.values(), reverse=True)[:3]
+                )
+
+    def test_top_pairs_by_win_rate(self):
+        pairs = self._count_pairs(lambda p: True)
+        top = self.aggregator.top_pairs(2, rank_by='win_rate', min_count=2)
+        self.assertEqual(len(top), 2)
+        self.assertTrue(all(core.count >= 2 for core in top))
+        self.assertEqual(top[0].win_rate, max(wins / count for count, wins in pairs.values() if count >= 2))
+        # Ties on win rate are ranked by count.
+        self.aggregator.add(_team(['Pikachu', 'Raichu'], [], [], True))
+        best = self.aggregator.top_pairs(len(pairs) + 1, rank_by='win_rate')
+        self.assertEqual(best[0].win_rate, 1.0)
+        self.assertEqual(best[0].count, max(count for count, wins in pairs.values() if wins == count))
+        self.assertIn(cores.Core(('Pikachu', 'Raichu'), 1, 1), best)
+
+    def test_top_selections(self):
+        brought = self.aggregator.top_selections(1, selection='brought')[0]
+        self.assertEqual(len(brought.species), 4)
+        self.assertEqual(brought.count, 2)
+        leads = self.aggregator.top_selections(10, selection='lead')
+        self.assertEqual(sum(core.count for core in leads), len(self.player_infos))
+        self.assertTrue(all(len(core.species) == 2 for core in leads))
+
+    def test_species_in_first_seen_order(self):
+        aggregator = cores.CoreAggregator()
+        aggregator.add(_team(['Pikachu', 'Raichu'], ['Raichu', 'Pikachu'], [], False))
+        aggregator.add(_team(['Raichu', 'Pikachu'], ['Raichu', 'Pikachu'], [], True))
+        self.assertEqual(
+            aggregator.top_selections(1),
+            [cores.Core(('Pikachu', 'Raichu'), 2, 1)]
+        )
+        self.assertEqual(aggregator.top_pairs(1)[0].win_rate, 0.5)
+
+    def test_empty(self):
+        aggregator = cores.CoreAggregator()
+        self.assertEqual(aggregator.top_pairs(5), [])
+        self.assertEqual(aggregator.top_selections(5), [])
+
+    def test_unknown_query(self):
+        with self.assertRaises(ValueError):
+            self.aggregator.top_pairs(5, selection='bench')
+        with self.assertRaises(ValueError):
+            self.aggregator.top_selections(5, rank_by='usage')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+
+from .context import dex
+
+
+class SymbolTableTests(unittest.TestCase):
+    def test_ids_are_consecutive(self):
+        table = dex.SymbolTable(['Protect', 'Tailwind'])
+        self.assertEqual(table.id('Protect'), 0)
+        self.assertEqual(table.id('Tailwind'), 1)
+        self.assertEqual(table.id('Fake Out'), 2)
+        self.assertEqual(table.name(2), 'Fake Out')
+        self.assertEqual(len(table), 3)
+
+    def test_get_does_not_add(self):
+        table = dex.SymbolTable(['Protect'])
+        self.assertIsNone(table.get('Fake Out'))
+        self.assertNotIn('Fake Out', table)
+        self.assertEqual(len(table), 1)
+
+    def test_read_only(self):
+        table = dex.SymbolTable(['Protect'], read_only=True)
+        self.assertEqual(table.id('Protect'), 0)
+        with self.assertRaises(KeyError):
+            table.id('Fake Out')
+        copy = table.copy()
+        self.assertEqual(copy.id('Fake Out'), 1)
+        self.assertNotIn('Fake Out', table)
+
+
+class DexTests(unittest.TestCase):
+    def test_default_dex_is_loaded_once(self):
+        self.assertIs(dex.default_dex(), dex.default_dex())
+
+    def test_bundled_names(self):
+        default_dex = dex.default_dex()
+        self.assertIn('Flutter Mane', default_dex.species)
+        self.assertIn('Spiky Shield', default_dex.moves)
+        self.assertIn('Protosynthesis', default_dex.abilities)
+        self.assertIn('Stellar', default_dex.types)
+        self.assertIn('Choice Scarf', default_dex.items)
+        self.assertIn('Sitrus Berry', default_dex.items)
+
+    def test_base_species(self):
+        default_dex = dex.default_dex()
+        self.assertEqual(default_dex.base_species('Ogerpon-Hearthflame'), 'Ogerpon')
+        self.assertEqual(default_dex.base_species('Urshifu-Rapid-Strike'), 'Urshifu')
+        self.assertEqual(default_dex.base_species('Vivillon-Polar'), 'Vivillon')
+        self.assertEqual(default_dex.base_species('Chi-Yu'), 'Chi-Yu')
+        self.assertEqual(default_dex.base_species('Flutter Mane'), 'Flutter Mane')
+
+    def test_hidden_form(self):
+        default_dex = dex.default_dex()
+        self.assertEqual(default_dex.species_id('Urshifu-*'), default_dex.species.id('Urshifu'))
+
+    def test_unknown_species(self):
+        test_dex = dex.Dex(['Regidrago'], [0])
+        form_id = test_dex.species_id('Regidrago-Mega')
+        self.assertEqual(test_dex.species.name(test_dex.base_species_id(form_id)), 'Regidrago')
+        unknown_id = test_dex.species_id('Missing-No')
+        self.assertEqual(test_dex.base_species_id(unknown_id), unknown_id)
+
+    def test_unknown_names_are_not_added_to_default_dex(self):
+        default_dex = dex.default_dex()
+        species_count = len(default_dex.species)
+        self.assertIsNone(default_dex.find_species_id('Missing-No'))
+        self.assertEqual(default_dex.base_species('Missing-No'), 'Missing-No')
+        self.assertEqual(default_dex.base_species('Ogerpon-Unreleased'), 'Ogerpon')
+        with self.assertRaises(KeyError):
+            default_dex.species_id('Missing-No')
+        local_dex = default_dex.copy()
+        missing_id = local_dex.species_id('Missing-No')
+        self.assertEqual(local_dex.base_species_id(missing_id), missing_id)
+        self.assertEqual(local_dex.species_id('Flutter Mane'), default_dex.species_id('Flutter Mane'))
+        self.assertEqual(len(default_dex.species), species_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
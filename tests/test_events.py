@@ -0,0 +1,96 @@
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+import numpy as np
+
+from .context import events, showdown
+from .html_utils import get_resource_location
+
+_SHOWDOWN_REPLAY_RESOURCE = 'Gen9VGC2024RegFBo3-2024-02-24-tearsricochet-quartermachine.html'
+
+
+class EventStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        location = get_resource_location(_SHOWDOWN_REPLAY_RESOURCE)
+        self.battle_log = showdown.ShowdownDownloadReplayRetrievalStrategy().retrieve_replay(location)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_add_replay(self):
+        store = events.EventStore()
+        replay = store.add_replay(self.battle_log, 'fixture')
+        self.assertEqual(replay, showdown.parse_replay(self.battle_log))
+        self.assertEqual(store.replay_ids, ['fixture'])
+        commands = [line.split('|')[1] for line in self.battle_log.split('\n') if line.startswith('|')]
+        self.assertEqual(
+            len(store),
+            sum(commands.count(command) for command in ('switch', 'move', '-terastallize', 'faint'))
+        )
+        self.assertEqual(
+            [store.names[actor] for actor in store.column('actor')[:4]],
+            ['Flutter Mane', 'Regidrago', 'Tornadus', 'Flutter Mane']
+        )
+        self.assertEqual(store.column('side')[:4].tolist(), [1, 1, 2, 2])
+        self.assertEqual(store.column('slot')[:4].tolist(), [0, 1, 0, 1])
+        self.assertEqual(store.column('turn')[:4].tolist(), [0, 0, 0, 0])
+
+    def test_move_usage(self):
+        store = events.EventStore()
+        store.add_replay(self.battle_log)
+        self.assertEqual(store.move_usage(turn=1), {'Tailwind': 1, 'Shadow Ball': 1, 'Icy Wind': 1})
+        replay = showdown.parse_replay(self.battle_log)
+        expected = {}
+        for player_info in (replay.player1_info, replay.player2_info):
+            for pokemon in player_info.team.pokemon:
+                for move in pokemon.moves:
+                    if move.times_used:
+                        expected[move.name] = expected.get(move.name, 0) + move.times_used
+        self.assertEqual(store.move_usage(), expected)
+
+    def test_move_targets(self):
+        store = events.EventStore()
+        store.add_replay(self.battle_log)
+        tailwind = store.column('move') == store.name_id('Tailwind')
+        self.assertEqual(
+            {store.names[target] for target in store.column('target')[tailwind]},
+            {'Tornadus'}
+        )
+
+    def test_tera_turns(self):
+        store = events.EventStore()
+        store.add_replay(self.battle_log)
+        self.assertEqual(store.tera_turns(), {3: 1, 4: 1})
+        tera = store.column('event_type') == events.TERASTALLIZE
+        self.assertEqual(
+            sorted(store.names[move] for move in store.column('move')[tera]),
+            ['Fairy', 'Fire']
+        )
+
+    def test_save_and_load(self):
+        store = events.EventStore()
+        store.add_replay(self.battle_log, 'fixture')
+        store.save(self.directory)
+        loaded = events.EventStore.load(self.directory)
+        self.assertIsInstance(loaded.column('move'), np.memmap)
+        for name in events.COLUMNS:
+            np.testing.assert_array_equal(loaded.column(name), store.column(name))
+            self.assertEqual(loaded.column(name).dtype, events.COLUMNS[name])
+        self.assertEqual(loaded.move_usage(), store.move_usage())
+
+        loaded.add_replay(self.battle_log, 'again')
+        self.assertEqual(len(loaded), 2 * len(store))
+        self.assertEqual(loaded.replay_ids, ['fixture', 'again'])
+        self.assertEqual(loaded.tera_turns(), {3: 2, 4: 2})
+        self.assertEqual(set(loaded.column('replay').tolist()), {0, 1})
+
+    def test_from_columns_requires_every_column(self):
+        with self.assertRaises(ValueError):
+            events.EventStore.from_columns({'replay': np.zeros(1, np.int32)}, [], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
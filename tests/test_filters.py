@@ -0,0 +1,126 @@
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+from .context import filters, serialization, showdown
+from .html_utils import get_resource_location
+
+_SHOWDOWN_REPLAY_RESOURCE = 'Gen9VGC2024RegFBo3-2024-02-24-tearsricochet-quartermachine.html'
+
+
+class ReplayFilterTests(unittest.TestCase):
+    def setUp(self):
+        location = get_resource_location(_SHOWDOWN_REPLAY_RESOURCE)
+        self.battle_log = showdown.ShowdownDownloadReplayRetrievalStrategy().retrieve_replay(location)
+        self.no_ots_battle_log = '\n'.join(
+            line for line in self.battle_log.split('\n') if not line.startswith('|showteam|')
+        )
+
+    def _cases(self) -> list:
+        return [
+            (filters.player_in('Quarter Machine'), True),
+            (filters.player_in('ironpumpernickel'), False),
+            (filters.player_not_in('ironpumpernickel'), True),
+            (filters.player_not_in('ironpumpernickel', 'Tears ricochet'), False),
+            (filters.team_has('Amoonguss', 'Tornadus'), True),
+            (filters.team_has('Amoonguss', 'Regidrago'), False),
+            (filters.team_has('Amoonguss', players=['Quarter Machine']), True),
+            (filters.team_has('Amoonguss', players=['Tears ricochet']), False),
+            (filters.team_lacks('Iron Bundle', 'Calyrex-Shadow'), True),
+            (filters.team_lacks('Iron Bundle', 'Flutter Mane'), False),
+            (filters.team_lacks('Regidrago', players=['Quarter Machine']), True),
+            (filters.team_lacks('Regidrago', players=['Tears ricochet']), False),
+            (filters.ots(), True),
+            (filters.ots(False), False),
+            (filters.format_in('gen9vgc2024regfbo3'), True),
+            (filters.format_in('[Gen 9] VGC 2024 Reg F (Bo3)', 'gen9ou'), True),
+            (filters.format_in('gen9ou'), False),
+            (filters.player_in('Quarter Machine') & filters.team_has('Flutter Mane') & filters.ots(), True),
+            (filters.player_in('Quarter Machine') & filters.format_in('gen9ou'), False),
+        ]
+
+    def test_parse_replay_keeps_or_rejects(self):
+        for mode in showdown.PARSE_MODES:
+            expected = showdown.parse_replay(self.battle_log, mode)
+            for replay_filter, accepted in self._cases():
+                with self.subTest(mode=mode, replay_filter=replay_filter):
+                    replay = showdown.parse_replay(self.battle_log, mode, replay_filter=replay_filter)
+                    self.assertEqual(replay, expected if accepted else None)
+
+    def test_accepts_agrees_with_parsing(self):
+        replay = showdown.parse_replay(self.battle_log)
+        battle_format = filters.battle_format(self.battle_log)
+        for replay_filter, accepted in self._cases():
+            with self.subTest(replay_filter=replay_filter):
+                self.assertEqual(replay_filter.accepts(replay, battle_format), accepted)
+
+    def test_rejects_before_the_battle(self):
+        moves = []
+        handlers = {'move': lambda parser, command_parts: moves.append(command_parts[3])}
+        for replay_filter in (
+                filters.player_not_in('Tears ricochet'),
+                filters.team_lacks('Flutter Mane'),
+                filters.ots(False),
+                filters.format_in('gen9ou')):
+            with self.subTest(replay_filter=replay_filter):
+                self.assertIsNone(
+                    showdown.parse_replay(self.battle_log, handlers=handlers, replay_filter=replay_filter)
+                )
+                self.assertEqual(moves, [])
+        showdown.parse_replay(self.battle_log, handlers=handlers, replay_filter=filters.ots())
+        self.assertTrue(moves)
+
+    def test_team_preview_without_team_sheets(self):
+        expected = showdown.parse_replay(self.no_ots_battle_log)
+        self.assertFalse(expected.is_ots)
+        for replay_filter, accepted in (
+                (filters.ots(False), True),
+                (filters.ots(), False),
+                (filters.team_has('Urshifu-*', players=['Quarter Machine']), True),
+                (filters.team_lacks('Urshifu-*'), False),
+                (filters.team_lacks('Urshifu-Rapid-Strike'), True)):
+            with self.subTest(replay_filter=replay_filter):
+                self.assertEqual(
+                    showdown.parse_replay(self.no_ots_battle_log, replay_filter=replay_filter),
+                    expected if accepted else None
+                )
+
+    def test_missing_format_is_rejected(self):
+        battle_log = '\n'.join(line for line in self.battle_log.split('\n') if not line.startswith('|tier|'))
+        self.assertIsNone(filters.battle_format(battle_log))
+        self.assertIsNone(
+            showdown.parse_replay(battle_log, replay_filter=filters.format_in('gen9vgc2024regfbo3'))
+        )
+        self.assertIsNotNone(
+            showdown.parse_replay(battle_log, replay_filter=filters.player_in('Quarter Machine'))
+        )
+
+    def test_battle_format(self):
+        self.assertEqual(filters.battle_format(self.battle_log), '[Gen 9] VGC 2024 Reg F (Bo3)')
+        self.assertEqual(filters.to_id('[Gen 9] VGC 2024 Reg F (Bo3)'), 'gen9vgc2024regfbo3')
+
+    def test_conflicting_ots_conditions(self):
+        with self.assertRaises(ValueError):
+            filters.ots() & filters.ots(False)
+
+    def test_parsed_replay_cache(self):
+        directory = tempfile.mkdtemp()
+        try:
+            with serialization.ParsedReplayCache(f'{directory}/cache.sqlite3') as parsed_cache:
+                rejecting = filters.team_lacks('Flutter Mane')
+                self.assertIsNone(parsed_cache.parse_replay(self.battle_log, replay_filter=rejecting))
+                self.assertIsNone(parsed_cache.get(serialization.parsed_replay_key(self.battle_log)))
+                expected = parsed_cache.parse_replay(self.battle_log)
+                for replay_filter, accepted in self._cases():
+                    with self.subTest(replay_filter=replay_filter):
+                        self.assertEqual(
+                            parsed_cache.parse_replay(self.battle_log, replay_filter=replay_filter),
+                            expected if accepted else None
+                        )
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import json
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+import main
+
+from .context import instrumentation, showdown
+from .html_utils import get_resource_location
+
+_SHOWDOWN_REPLAY_RESOURCE = 'Gen9VGC2024RegFBo3-2024-02-24-tearsricochet-quartermachine.html'
+
+
+class ProfileTests(unittest.TestCase):
+    def test_stages_accumulate(self):
+        profile = instrumentation.Profile()
+        for _ in range(3):
+            with profile.stage('parse', 2):
+                pass
+        profile.add_time('walk', 5000, 10)
+        profile.count('replays')
+        profile.count('replays', 4)
+        self.assertEqual(profile.stages['parse'][:2], [3, 6])
+        self.assertGreaterEqual(profile.stages['parse'][2], 0)
+        self.assertEqual(profile.stages['walk'], [1, 10, 5000])
+        self.assertEqual(profile.counters['replays'], 5)
+
+    def test_merge(self):
+        profile = instrumentation.Profile()
+        profile.add_time('parse', 100, 1)
+        profile.count('parser.move', 3)
+        other = instrumentation.Profile()
+        other.add_time('parse', 50, 2)
+        other.add_time('extract', 10, 2)
+        other.count('parser.move', 2)
+        profile.merge(other)
+        self.assertEqual(profile.stages, {'parse': [2, 3, 150], 'extract': [1, 2, 10]})
+        self.assertEqual(profile.counters['parser.move'], 5)
+
+    def test_disabled_by_default(self):
+        profile = instrumentation.current()
+        self.assertFalse(profile.enabled)
+        with profile.stage('parse'):
+            pass
+        profile.count('replays')
+        self.assertEqual(profile.stages, {})
+        self.assertEqual(profile.counters, {})
+
+    def test_profiling_restores_previous_profile(self):
+        previous = instrumentation.current()
+        with instrumentation.profiling() as outer:
+            self.assertIs(instrumentation.current(), outer)
+            with instrumentation.profiling() as inner:
+                self.assertIs(instrumentation.current(), inner)
+            self.assertIs(instrumentation.current(), outer)
+        self.assertIs(instrumentation.current(), previous)
+
+    def test_summary_and_json(self):
+        profile = instrumentation.Profile()
+        profile.add_time('parse', 2_000_000, 4)
+        profile.count('parser.move', 7)
+        summary = profile.summary()
+        self.assertIn('parse', summary)
+        self.assertIn('parser.move', summary)
+        data = json.loads(json.dumps(profile.to_json(parser_version=showdown.PARSER_VERSION)))
+        self.assertEqual(data['stages']['parse'], {'calls': 1, 'items': 4, 'seconds': 0.002})
+        self.assertEqual(data['counters'], {'parser.move': 7})
+        self.assertEqual(data['parser_version'], showdown.PARSER_VERSION)
+
+
+class ParserCounterTests(unittest.TestCase):
+    def setUp(self):
+        location = get_resource_location(_SHOWDOWN_REPLAY_RESOURCE)
+        self.battle_log = showdown.ShowdownDownloadReplayRetrievalStrategy().retrieve_replay(location)
+
+    def test_counts_commands(self):
+        with instrumentation.profiling() as profile:
+            replay = showdown.parse_replay(self.battle_log)
+        lines = self.battle_log.split('\n')
+        self.assertEqual(profile.counters['parser.move'], sum(line.startswith('|move|') for line in lines))
+        self.assertEqual(profile.counters['parser.player'], sum(line.startswith('|player|') for line in lines))
+        self.assertEqual(replay, showdown.parse_replay(self.battle_log))
+
+    def test_summary_mode_skips_move_counter(self):
+        with instrumentation.profiling() as profile:
+            showdown.parse_replay(self.battle_log, mode='summary')
+        self.assertNotIn('parser.move', profile.counters)
+        self.assertGreater(profile.counters['parser.switch'], 0)
+
+
+class AnalyzeDirectoryProfileTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        html = get_resource_location(_SHOWDOWN_REPLAY_RESOURCE).read_text(encoding='utf8')
+        for i in range(6):
+            with open(f'{self.directory}/replay-{i}.html', 'w', encoding='utf8') as f:
+                f.write(html)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_worker_profiles_are_merged(self):
+        with instrumentation.profiling() as serial:
+            main.analyze_directory(self.directory, workers=1)
+        with instrumentation.profiling() as parallel:
+            main.analyze_directory(self.directory, workers=2)
+        for profile in (serial, parallel):
+            self.assertEqual(profile.counters['replays'], 6)
+            self.assertEqual(profile.stages['walk'][1], 6)
+            self.assertEqual(profile.stages['parse'][:2], [6, 6])
+            self.assertEqual(profile.stages['extract'][:2], [6, 6])
+        self.assertEqual(parallel.counters, serial.counters)
+
+    def test_parsed_cache_is_used(self):
+        cache_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_directory)
+        cache_path = f'{cache_directory}/cache.sqlite3'
+        with instrumentation.profiling() as profile:
+            main.analyze_directory(self.directory, workers=1, cache_path=cache_path)
+        self.assertEqual(profile.counters['parsed_cache.miss'], 1)
+        self.assertEqual(profile.counters['parsed_cache.hit'], 5)
+        self.assertEqual(profile.counters['parser.win'], 1)
@@ -0,0 +1,220 @@
+import io
+import os
+import json
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+import main
+
+from .context import aggregate
+from .html_utils import get_resource_location
+
+_SHOWDOWN_REPLAY_RESOURCE = 'Gen9VGC2024RegFBo3-2024-02-24-tearsricochet-quartermachine.html'
+
+
+def _write_usage(statistics: aggregate.UsageAggregate) -> str:
+    out_csv = io.StringIO()
+    main._write_usage_csv(statistics.rows, out_csv)
+    return '\n'.join([
+        json.dumps(statistics.usage_by_name(statistics.user_usage)),
+        json.dumps(statistics.usage_by_name(statistics.opponent_usage)),
+        out_csv.getvalue()
+    ])
+
+
+class AnalyzeDirectoryTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        html = get_resource_location(_SHOWDOWN_REPLAY_RESOURCE).read_text(encoding='utf8')
+        variants = [
+            html,
+            html.replace('Quarter Machine', 'ironpumpernickel'),
+            html.replace('Tailwind', 'Rain Dance').replace('|win|Quarter Machine', '|win|Tears ricochet'),
+            html.replace('Flutter Mane', 'Iron Bundle'),
+        ]
+        for i in range(12):
+            with open(f'{self.directory}/replay-{i:02d}.html', 'w', encoding='utf8') as f:
+                f.write(variants[i % len(variants)])
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_parallel_matches_serial(self):
+        serial = main.analyze_directory(self.directory, workers=1)
+        parallel = main.analyze_directory(self.directory, workers=3)
+        self.assertEqual(serial.user_usage['total'], 12)
+        self.assertEqual(len(serial.rows), 12 * 12)
+        self.assertEqual(_write_usage(parallel), _write_usage(serial))
+
+    def test_matches_per_file_analysis(self):
+        per_file = aggregate.UsageAggregate()
+        for statistics in main._analyze_each(main._find_replays(self.directory)):
+            per_file.merge(statistics)
+        self.assertEqual(_write_usage(main.analyze_directory(self.directory, workers=1)), _write_usage(per_file))
+
+    def test_parallel_with_cache_matches_serial(self):
+        cache_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_directory)
+        cache_path = f'{cache_directory}/cache.sqlite3'
+        serial = main.analyze_directory(self.directory, workers=1)
+        cold = main.analyze_directory(self.directory, workers=2, cache_path=cache_path)
+        warm = main.analyze_directory(self.directory, workers=2, cache_path=cache_path)
+        self.assertEqual(_write_usage(cold), _write_usage(serial))
+        self.assertEqual(_write_usage(warm), _write_usage(serial))
+
+    def test_second_run_reads_parsed_cache(self):
+        cache_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_directory)
+        cache_path = f'{cache_directory}/cache.sqlite3'
+        cold = main.analyze_directory(self.directory, workers=1, cache_path=cache_path)
+        with unittest.mock.patch.object(main.serialization, 'parse_replay') as cached_parse, \
+                unittest.mock.patch.object(main.showdown, 'parse_replay') as parse:
+            warm = main.analyze_directory(self.directory, workers=1, cache_path=cache_path)
+            cached_parse.assert_not_called()
+            parse.assert_not_called()
+        self.assertEqual(_write_usage(warm), _write_usage(cold))
+
+    def test_summary_mode_skips_moves(self):
+        full = main.analyze_directory(self.directory, workers=1)
+        summary = main.analyze_directory(self.directory, workers=1, mode='summary')
+        self.assertEqual(summary.user_usage['total'], full.user_usage['total'])
+        full_usage = full.usage_by_name(full.opponent_usage)
+        for species, pokemon_usage in summary.usage_by_name(summary.opponent_usage).items():
+            if species == 'total':
+                continue
+            self.assertEqual(pokemon_usage['brought'], full_usage[species]['brought'])
+            self.assertFalse(+pokemon_usage['moves'])
+
+
+
+class SelectPlayersTests(unittest.TestCase):
+    def setUp(self):
+        # Tears ricochet is Player 1 with Regidrago, Quarter Machine is Player 2 with Amoonguss.
+        self.locations = [str(get_resource_location(_SHOWDOWN_REPLAY_RESOURCE))]
+
+    def _select(self, usernames, ignored_pokemon=(), ignored_users=()):
+        with unittest.mock.patch.object(main, '_USERNAMES', list(usernames)), \
+                unittest.mock.patch.object(main, '_IGNORED_POKEMON', list(ignored_pokemon)), \
+                unittest.mock.patch.object(main, '_IGNORED_USERS', list(ignored_users)):
+            (players,) = main._select_players(self.locations)
+        if players is None:
+            return None
+        user_info, opponent_info = players
+        return user_info.player_name, opponent_info.player_name
+
+    def test_user_is_player1_if_a_username(self):
+        self.assertEqual(self._select(['Tears ricochet']), ('Tears ricochet', 'Quarter Machine'))
+        self.assertEqual(
+            self._select(['Tears ricochet', 'Quarter Machine']),
+            ('Tears ricochet', 'Quarter Machine')
+        )
+
+    def test_user_is_player2_otherwise(self):
+        self.assertEqual(self._select(['Quarter Machine']), ('Quarter Machine', 'Tears ricochet'))
+        self.assertEqual(self._select(['nobody']), ('Quarter Machine', 'Tears ricochet'))
+
+    def test_ignored_users(self):
+        self.assertIsNone(self._select(['Tears ricochet'], ignored_users=['Quarter Machine']))
+        self.assertIsNone(self._select(['Tears ricochet'], ignored_users=['Tears ricochet']))
+
+    def test_ignored_pokemon_are_only_checked_on_the_users_team(self):
+        self.assertIsNone(self._select(['Tears ricochet'], ignored_pokemon=['Regidrago']))
+        self.assertIsNotNone(self._select(['Tears ricochet'], ignored_pokemon=['Amoonguss']))
+        # Player 1 is the user when both players are usernames.
+        self.assertIsNotNone(
+            self._select(['Tears ricochet', 'Quarter Machine'], ignored_pokemon=['Amoonguss'])
+        )
+        # Player 2 is the user when neither player is a username.
+        self.assertIsNone(self._select(['nobody'], ignored_pokemon=['Amoonguss']))
+        self.assertIsNotNone(self._select(['nobody'], ignored_pokemon=['Regidrago']))
+
+
+class AnalyzeDirectoryIncrementalTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.state_directory = tempfile.mkdtemp()
+        self.state_path = f'{self.state_directory}/manifest.json'
+        self.html = get_resource_location(_SHOWDOWN_REPLAY_RESOURCE).read_text(encoding='utf8')
+        self._write('replay-0.html', self.html)
+        self._write('replay-1.html', self.html.replace('Quarter Machine', 'ironpumpernickel'))
+        self._write('replay-2.html', self.html.replace('Flutter Mane', 'Iron Bundle'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        shutil.rmtree(self.state_directory)
+
+    def _write(self, name: str, html: str):
+        with open(f'{self.directory}/{name}', 'w', encoding='utf8') as f:
+            f.write(html)
+
+    def _assert_matches_full_analysis(self, incremental: aggregate.UsageAggregate):
+        full = main.analyze_directory(self.directory, workers=1)
+        self.assertEqual(
+            json.loads(json.dumps(incremental.usage_by_name(incremental.user_usage))),
+            json.loads(json.dumps(full.usage_by_name(full.user_usage)))
+        )
+        self.assertEqual(
+            json.loads(json.dumps(incremental.usage_by_name(incremental.opponent_usage))),
+            json.loads(json.dumps(full.usage_by_name(full.opponent_usage)))
+        )
+        self.assertEqual(incremental.rows, full.rows)
+
+    def test_incremental_analysis(self):
+        first = main.analyze_directory_incremental(self.directory, self.state_path, workers=1)
+        self._assert_matches_full_analysis(first)
+
+        self._write('replay-3.html', self.html.replace('Tailwind', 'Rain Dance'))
+        self._write('replay-1.html', self.html.replace('|win|Quarter Machine', '|win|Tears ricochet'))
+        with unittest.mock.patch.object(main.showdown, 'parse_replay', wraps=main.showdown.parse_replay) as mock:
+            second = main.analyze_directory_incremental(self.directory, self.state_path, workers=1)
+            self.assertEqual(mock.call_count, 2)
+        self._assert_matches_full_analysis(second)
+
+        with unittest.mock.patch.object(main.showdown, 'parse_replay') as mock:
+            unchanged = main.analyze_directory_incremental(self.directory, self.state_path, workers=1)
+            mock.assert_not_called()
+        self._assert_matches_full_analysis(unchanged)
+
+    def test_deleted_replays_are_subtracted(self):
+        main.analyze_directory_incremental(self.directory, self.state_path, workers=1)
+        os.remove(f'{self.directory}/replay-2.html')
+        with unittest.mock.patch.object(main.showdown, 'parse_replay') as mock:
+            incremental = main.analyze_directory_incremental(self.directory, self.state_path, workers=1)
+            mock.assert_not_called()
+        self.assertNotIn('Iron Bundle', incremental.usage_by_name(incremental.opponent_usage))
+        self._assert_matches_full_analysis(incremental)
+
+
+    def test_unknown_tera_type_survives_the_state_file(self):
+        # Without team sheets the Tera type of a terastallized Pokemon is unknown.
+        non_ots_html = '\n'.join(
+            line for line in self.html.split('\n') if '|showteam|' not in line
+        )
+        for name in os.listdir(self.directory):
+            os.remove(f'{self.directory}/{name}')
+        self._write('replay-0.html', non_ots_html)
+        main.analyze_directory_incremental(self.directory, self.state_path, workers=1)
+
+        self._write('replay-1.html', non_ots_html.replace('Tailwind', 'Rain Dance'))
+        incremental = main.analyze_directory_incremental(self.directory, self.state_path, workers=1)
+        full = main.analyze_directory(self.directory, workers=1)
+        terastallized = [
+            pokemon_usage['tera']
+            for species, pokemon_usage in incremental.usage_by_name(incremental.opponent_usage).items()
+            if species != 'total' and pokemon_usage['tera']
+        ]
+        self.assertTrue(terastallized)
+        for tera in terastallized:
+            self.assertEqual(list(tera), [None])
+            self.assertEqual(tera[None]['used'], 2)
+        self.assertEqual(incremental.usage_by_name(incremental.user_usage), full.usage_by_name(full.user_usage))
+        self.assertEqual(
+            incremental.usage_by_name(incremental.opponent_usage),
+            full.usage_by_name(full.opponent_usage)
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
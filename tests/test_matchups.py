@@ -0,0 +1,122 @@
+import collections
+import io
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+import numpy as np
+
+from .context import matchups, showdown
+from .html_utils import get_resource_location
+
+_SHOWDOWN_REPLAY_RESOURCE = 'Gen9VGC2024RegFBo3-2024-02-24-tearsricochet-quartermachine.html'
+
+
+class MatchupMatrixTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        location = get_resource_location(_SHOWDOWN_REPLAY_RESOURCE)
+        battle_log = showdown.ShowdownDownloadReplayRetrievalStrategy().retrieve_replay(location)
+        self.replays = [
+            showdown.parse_replay(variant)
+            for variant in (
+                battle_log,
+                battle_log.replace('Tailwind', 'Rain Dance').replace('|win|Quarter Machine', '|win|Tears ricochet'),
+                battle_log.replace('Flutter Mane', 'Iron Bundle'),
+            )
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _count_matchups(self, selected) -> dict:
+        games = collections.Counter()
+        wins = collections.Counter()
+        for replay in self.replays:
+            for player_info, opponent_info in (
+                    (replay.player1_info, replay.player2_info),
+                    (replay.player2_info, replay.player1_info)):
+                for player in filter(selected, player_info.team.pokemon):
+                    for opponent in filter(selected, opponent_info.team.pokemon):
+                        games[player.species, opponent.species] += 1
+                        wins[player.species, opponent.species] += player_info.is_winner
+        return {matchup: (count, wins[matchup]) for matchup, count in games.items()}
+
+    def _matchups(self, matrix: matchups.MatchupMatrix) -> dict:
+        games = matrix.games()
+        wins = matrix.wins()
+        return {
+            (matrix.species.name(row), matrix.species.name(column)): (int(games[row, column]), int(wins[row, column]))
+            for row, column in zip(*np.nonzero(games))
+        }
+
+    def test_matches_every_pair_of_species(self):
+        for selection, selected in (
+                ('team', lambda p: True),
+                ('lead', lambda p: p.was_lead),
+                ('brought', lambda p: p.was_brought)):
+            with self.subTest(selection=selection):
+                matrix = matchups.MatchupMatrix(selection)
+                for replay in self.replays:
+                    matrix.add_replay(replay)
+                self.assertEqual(len(matrix), 2 * len(self.replays))
+                self.assertEqual(self._matchups(matrix), self._count_matchups(selected))
+
+    def test_add_after_counting(self):
+        matrix = matchups.MatchupMatrix('lead')
+        matrix.add_replay(self.replays[0])
+        matrix.games()
+        for replay in self.replays[1:]:
+            matrix.add_replay(replay)
+        self.assertEqual(self._matchups(matrix), self._count_matchups(lambda p: p.was_lead))
+
+    def test_win_rates(self):
+        matrix = matchups.MatchupMatrix('lead')
+        for replay in self.replays:
+            matrix.add_replay(replay)
+        rates = matrix.win_rates()
+        games = matrix.games()
+        self.assertTrue(np.isnan(rates[games == 0]).all())
+        np.testing.assert_array_equal(rates[games > 0], matrix.wins()[games > 0] / games[games > 0])
+        # Every game is won by one side.
+        np.testing.assert_array_equal(matrix.wins() + matrix.wins().T, games)
+
+    def test_save_and_load(self):
+        matrix = matchups.MatchupMatrix('brought')
+        matrix.add_replay(self.replays[0])
+        matrix.save(self.directory)
+        loaded = matchups.MatchupMatrix.load(self.directory)
+        self.assertEqual(loaded.selection, 'brought')
+        self.assertEqual(len(loaded), 2)
+        for replay in self.replays[1:]:
+            loaded.add_replay(replay)
+        self.assertEqual(self._matchups(loaded), self._count_matchups(lambda p: p.was_brought))
+
+    def test_write_csv(self):
+        matrix = matchups.MatchupMatrix('lead')
+        for replay in self.replays:
+            matrix.add_replay(replay)
+        out_csv = io.StringIO()
+        matrix.write_csv(out_csv, min_games=2)
+        lines = out_csv.getvalue().splitlines()
+        self.assertEqual(lines[0], 'species,opponent_species,games,wins,win_rate')
+        expected = {
+            matchup: counts
+            for matchup, counts in self._count_matchups(lambda p: p.was_lead).items()
+            if counts[0] >= 2
+        }
+        rows = [line.split(',') for line in lines[1:]]
+        self.assertEqual(
+            {(row[0], row[1]): (int(row[2]), int(row[3])) for row in rows},
+            expected
+        )
+        self.assertEqual([int(row[2]) for row in rows], sorted((int(row[2]) for row in rows), reverse=True))
+
+    def test_unknown_selection(self):
+        with self.assertRaises(ValueError):
+            matchups.MatchupMatrix('bench')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+
+from .context import packed_team
+
+_PACKED_TEAM = 'Nick|Tornadus|FocusSash|Prankster|Protect,Tailwind|Timid|4,,,252,,252|M|,0,,,,|S|50|' \
+    '200,Fire,pokeball,G,5,Ghost]Amoonguss||SitrusBerry|Regenerator|Protect,Spore|||M|||50|,,,,,Water'
+
+
+class PackedTeamTests(unittest.TestCase):
+    def test_unpack_team(self):
+        tornadus, amoonguss = packed_team.unpack_team(_PACKED_TEAM)
+        self.assertEqual(
+            tornadus,
+            packed_team.PackedPokemon(
+                nickname='Nick',
+                species='Tornadus',
+                item='FocusSash',
+                ability='Prankster',
+                moves=['Protect', 'Tailwind'],
+                nature='Timid',
+                evs=(4, 0, 0, 252, 0, 252),
+                gender='M',
+                ivs=(31, 0, 31, 31, 31, 31),
+                shiny=True,
+                level=50,
+                happiness=200,
+                hidden_power_type='Fire',
+                pokeball='pokeball',
+                gigantamax=True,
+                dynamax_level=5,
+                tera_type='Ghost'
+            )
+        )
+        self.assertEqual(
+            amoonguss,
+            packed_team.PackedPokemon(
+                nickname='Amoonguss',
+                species='Amoonguss',
+                item='SitrusBerry',
+                ability='Regenerator',
+                moves=['Protect', 'Spore'],
+                gender='M',
+                level=50,
+                tera_type='Water'
+            )
+        )
+
+    def test_unpack_team_blank_fields(self):
+        incineroar, = packed_team.unpack_team('Incineroar|||||||||||')
+        self.assertEqual(incineroar, packed_team.PackedPokemon('Incineroar', 'Incineroar'))
+
+    def test_unpack_team_from_offset(self):
+        line = f'|showteam|p2|{_PACKED_TEAM}'
+        self.assertEqual(
+            packed_team.unpack_team(line, len('|showteam|p2|')),
+            packed_team.unpack_team(_PACKED_TEAM)
+        )
+
+    def test_iter_packed_fields(self):
+        fields = f'|showteam|p2|{_PACKED_TEAM}'.split('|')
+        self.assertEqual(
+            list(packed_team.iter_packed_fields(fields, 3)),
+            packed_team.unpack_team(_PACKED_TEAM)
+        )
+
+    def test_unpack_team_malformed(self):
+        with self.assertRaises(ValueError):
+            packed_team.unpack_team('Tornadus||FocusSash|Prankster|Protect')
+        with self.assertRaises(ValueError):
+            packed_team.unpack_team('Tornadus|||||||||||]Amoonguss||SitrusBerry')
@@ -0,0 +1,130 @@
+import unittest
+import unittest.mock
+
+from .context import dex, pokemon
+
+
+class TeamTests(unittest.TestCase):
+    def setUp(self):
+        self.ogerpon = pokemon.Pokemon(species='Ogerpon-Hearthflame', nickname='Ogerpon')
+        self.urshifu = pokemon.Pokemon(species='Urshifu', nickname='Urshifu')
+        self.team = pokemon.Team(pokemon=[])
+        self.team.add_pokemon(self.ogerpon)
+        self.team.add_pokemon(self.urshifu)
+
+    def test_find_by_nickname(self):
+        self.assertIs(self.team.find_by_nickname('Ogerpon'), self.ogerpon)
+        self.assertIsNone(self.team.find_by_nickname('Rillaboom'))
+
+    def test_find_by_nickname_after_assign_nickname(self):
+        self.assertIs(self.team.find_by_nickname('Ogerpon'), self.ogerpon)
+        self.team.assign_nickname(self.ogerpon, 'Mask-Tera')
+        self.assertIsNone(self.team.find_by_nickname('Ogerpon'))
+        self.assertIs(self.team.find_by_nickname('Mask'), self.ogerpon)
+
+    def test_find_by_nickname_after_direct_changes(self):
+        self.assertIs(self.team.find_by_nickname('Urshifu'), self.urshifu)
+        self.urshifu.nickname = 'Fist'
+        self.assertIs(self.team.find_by_nickname('Fist'), self.urshifu)
+        self.assertIsNone(self.team.find_by_nickname('Urshifu'))
+        rillaboom = pokemon.Pokemon(species='Rillaboom', nickname='Rillaboom')
+        self.team.pokemon.append(rillaboom)
+        self.assertIs(self.team.find_by_nickname('Rillaboom'), rillaboom)
+
+    def test_find_by_species(self):
+        self.assertIs(self.team.find_by_species('Ogerpon-Hearthflame'), self.ogerpon)
+        self.assertIs(self.team.find_by_species('Urshifu-Rapid-Strike'), self.urshifu)
+        self.assertIsNone(self.team.find_by_species('Rillaboom'))
+        rillaboom = pokemon.Pokemon(species='Rillaboom')
+        self.team.add_pokemon(rillaboom)
+        self.assertIs(self.team.find_by_species('Rillaboom'), rillaboom)
+
+    def test_find_by_species_hidden_form(self):
+        urshifu = pokemon.Pokemon(species='Urshifu-*')
+        chi_yu = pokemon.Pokemon(species='Chi-Yu')
+        team = pokemon.Team(pokemon=[chi_yu, urshifu])
+        self.assertIs(team.find_by_species('Urshifu-Rapid-Strike'), urshifu)
+        self.assertIs(team.find_by_species('Chi-Yu'), chi_yu)
+        self.assertIsNone(team.find_by_species('Chi'))
+
+    def test_find_by_species_outside_dex(self):
+        missing = pokemon.Pokemon(species='Missing-No')
+        team = pokemon.Team(pokemon=[missing])
+        self.assertIsNone(missing.species_id)
+        self.assertIsNone(team.find_by_species('Missing-No-Form'))
+        self.assertIs(team.find_by_species('Missing-No'), missing)
+        self.assertIsNone(dex.default_dex().find_species_id('Missing-No'))
+
+    def test_indexes_do_not_affect_equality(self):
+        other = pokemon.Team(pokemon=[
+            pokemon.Pokemon(species='Ogerpon-Hearthflame', nickname='Ogerpon'),
+            pokemon.Pokemon(species='Urshifu', nickname='Urshifu'),
+        ])
+        self.team.find_by_nickname('Ogerpon')
+        self.team.find_by_species('Urshifu')
+        self.assertEqual(self.team, other)
+
+
+class PokemonTests(unittest.TestCase):
+    def test_struggle_is_created_on_first_use(self):
+        flutter_mane = pokemon.Pokemon(species='Flutter Mane')
+        self.assertIsNone(flutter_mane._struggle)  # pylint: disable=protected-access
+        struggle = flutter_mane.add_move('Struggle')
+        self.assertIs(flutter_mane.find_move('Struggle'), struggle)
+        self.assertEqual(flutter_mane.moves, [])
+
+    def test_unused_struggle_does_not_affect_equality(self):
+        flutter_mane = pokemon.Pokemon(species='Flutter Mane')
+        self.assertEqual(
+            flutter_mane,
+            pokemon.Pokemon(species='Flutter Mane', _struggle=pokemon.Move('Struggle'))
+        )
+        flutter_mane.find_move('Struggle')
+        self.assertEqual(flutter_mane, pokemon.Pokemon(species='Flutter Mane'))
+        flutter_mane.add_move('Struggle').increment_count()
+        self.assertNotEqual(flutter_mane, pokemon.Pokemon(species='Flutter Mane'))
+
+    def test_pokemon_are_slotted(self):
+        flutter_mane = pokemon.Pokemon(species='Flutter Mane', moves=[pokemon.Move('Moonblast')])
+        self.assertFalse(hasattr(flutter_mane, '__dict__'))
+        self.assertFalse(hasattr(flutter_mane.moves[0], '__dict__'))
+        with self.assertRaises(TypeError):
+            hash(flutter_mane)
+
+    def test_species_is_interned(self):
+        species = ''.join(['Flutter', ' Mane'])
+        self.assertIs(
+            pokemon.Pokemon(species=species).species,
+            pokemon.Pokemon(species='Flutter Mane').species
+        )
+
+
+class CanonicalMoveNameTests(unittest.TestCase):
+    def test_canonical_move_name(self):
+        self.assertEqual(pokemon.canonical_move_name('FreezeDry'), 'Freeze-Dry')
+        self.assertEqual(pokemon.canonical_move_name('WillOWisp'), 'Will-O-Wisp')
+        self.assertEqual(pokemon.canonical_move_name('Uturn'), 'U-turn')
+        self.assertEqual(pokemon.canonical_move_name('DoubleEdge'), 'Double-Edge')
+        self.assertEqual(pokemon.canonical_move_name('KingsShield'), "King's Shield")
+        self.assertEqual(pokemon.canonical_move_name('DragonEnergy'), 'Dragon Energy')
+
+    def test_canonical_move_name_is_idempotent(self):
+        for move_name in ('Freeze-Dry', 'U-turn', 'Icy Wind', "King's Shield", 'Double-Edge'):
+            self.assertEqual(pokemon.canonical_move_name(move_name), move_name)
+
+    def test_canonical_move_name_unknown_move(self):
+        self.assertEqual(pokemon.canonical_move_name('SomeNewMove'), 'Some New Move')
+
+    def test_seed_move_names(self):
+        pokemon.seed_move_names({'SomeOtherMove': 'Some-Other Move'})
+        self.assertEqual(pokemon.canonical_move_name('SomeOtherMove'), 'Some-Other Move')
+
+    def test_find_move_by_move_id(self):
+        flutter_mane = pokemon.Pokemon(species='Flutter Mane')
+        move = flutter_mane.add_move('ShadowBall')
+        self.assertIs(flutter_mane.find_move('Shadow Ball'), move)
+        self.assertIs(flutter_mane.find_move('ShadowBall'), move)
+
+
+if __name__ == '__main__':
+    unittest.main()
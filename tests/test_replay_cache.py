@@ -0,0 +1,149 @@
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+import unittest.mock
+
+from .context import cache, showdown
+from .html_utils import get_resource_location
+
+_SHOWDOWN_REPLAY_RESOURCE = 'Gen9VGC2024RegFBo3-2024-02-24-tearsricochet-quartermachine.html'
+
+
+def _put_many(path: str, worker: int):
+    replay_cache = cache.ReplayCache(path)
+    for i in range(25):
+        replay_cache.put(f'{worker}-{i}', f'|win|{worker}-{i}\n' * 10)
+    replay_cache.close()
+
+
+class ReplayCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = f'{self.directory}/cache.sqlite3'
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_get_put(self):
+        with cache.ReplayCache(self.path) as replay_cache:
+            self.assertIsNone(replay_cache.get('replay:a'))
+            replay_cache.put('replay:a', '|win|Tears ricochet\n')
+            self.assertEqual(replay_cache.get('replay:a'), '|win|Tears ricochet\n')
+        with cache.ReplayCache(self.path) as replay_cache:
+            self.assertEqual(replay_cache.get('replay:a'), '|win|Tears ricochet\n')
+            self.assertEqual(len(replay_cache), 1)
+
+    def test_sqlite_database(self):
+        database = cache.SqliteDatabase(f'{self.directory}/nested/db.sqlite3', 'CREATE TABLE IF NOT EXISTS t (x);')
+        connection = database.connect()
+        self.assertIs(database.connect(), connection)
+        self.assertEqual(connection.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+        self.assertEqual(connection.execute('PRAGMA foreign_keys').fetchone()[0], 1)
+        connection.execute('INSERT INTO t VALUES (1)')
+        database.close()
+        self.assertEqual(database.connect().execute('SELECT x FROM t').fetchall(), [(1,)])
+        database.close()
+
+    def test_lru_eviction(self):
+        with cache.ReplayCache(self.path) as replay_cache:
+            replay_cache.put('a', 'a' * 100)
+            entry_size = replay_cache.size()
+            replay_cache.max_size = entry_size * 2
+            replay_cache.put('b', 'b' * 100)
+            replay_cache.get('a')
+            replay_cache.put('c', 'c' * 100)
+            self.assertIn('a', replay_cache)
+            self.assertNotIn('b', replay_cache)
+            self.assertIn('c', replay_cache)
+            self.assertLessEqual(replay_cache.size(), replay_cache.max_size)
+
+    def test_concurrent_processes(self):
+        context = multiprocessing.get_context('spawn')
+        processes = [
+            context.Process(target=_put_many, args=(self.path, worker))
+            for worker in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+        with cache.ReplayCache(self.path) as replay_cache:
+            self.assertEqual(len(replay_cache), 100)
+            self.assertEqual(replay_cache.get('3-24'), '|win|3-24\n' * 10)
+
+    def test_replay_cache_key(self):
+        self.assertEqual(
+            cache.replay_cache_key('https://replay.pokemonshowdown.com/gen9vgc2024regf-2066960967'),
+            'replay:gen9vgc2024regf-2066960967'
+        )
+        location = get_resource_location(_SHOWDOWN_REPLAY_RESOURCE)
+        copy = f'{self.directory}/copy.html'
+        shutil.copyfile(location, copy)
+        key = cache.replay_cache_key(copy)
+        self.assertTrue(key.startswith('file:'))
+        self.assertEqual(cache.replay_cache_key(copy), key)
+        self.assertNotEqual(cache.replay_cache_key(location), key)
+        stat = os.stat(copy)
+        os.utime(copy, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        self.assertNotEqual(cache.replay_cache_key(copy), key)
+
+    def test_hits_do_not_write_access_times(self):
+        with cache.ReplayCache(self.path) as replay_cache:
+            replay_cache.put('a', 'a' * 100)
+            with unittest.mock.patch.object(cache.LruCache, '_write_access_times') as write:
+                for _ in range(10):
+                    replay_cache.get('a')
+                replay_cache.get_many_bytes(['a', 'b'])
+                write.assert_not_called()
+
+    def test_access_times_are_written_in_batches(self):
+        def last_access(key):
+            with sqlite3.connect(self.path) as connection:
+                return connection.execute(
+                    'SELECT last_access FROM battle_logs WHERE key = ?', (key,)).fetchone()[0]
+
+        with cache.ReplayCache(self.path) as replay_cache:
+            replay_cache.put('a', 'a')
+            replay_cache.put('b', 'b')
+            accessed = last_access('a')
+            replay_cache.get('a')
+            self.assertEqual(last_access('a'), accessed)
+            replay_cache.flush_access_times()
+            self.assertGreater(last_access('a'), accessed)
+            accessed = last_access('b')
+            with unittest.mock.patch.object(cache, '_MAX_PENDING_ACCESSES', 2):
+                replay_cache.get('b')
+                self.assertEqual(last_access('b'), accessed)
+                replay_cache.get('a')
+                self.assertGreater(last_access('b'), accessed)
+            replay_cache.get('b')
+            accessed = last_access('b')
+        self.assertGreater(last_access('b'), accessed)
+
+    def test_caching_strategy_skips_retrieval_when_cached(self):
+        location = get_resource_location(_SHOWDOWN_REPLAY_RESOURCE)
+        with cache.ReplayCache(self.path) as replay_cache:
+            strategy = showdown.ShowdownReplayRetrievalStrategyFactory.resolve_strategy(
+                location,
+                cache=replay_cache
+            )
+            self.assertIsInstance(strategy, showdown.CachingReplayRetrievalStrategy)
+            expected_battle_log = strategy.retrieve_replay(location)
+            with unittest.mock.patch.object(
+                    showdown.ShowdownDownloadReplayRetrievalStrategy,
+                    'retrieve_replay'
+            ) as mock:
+                self.assertEqual(strategy.retrieve_replay(location), expected_battle_log)
+                self.assertEqual(
+                    list(strategy.retrieve_replays([location])),
+                    [(location, expected_battle_log)]
+                )
+                mock.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
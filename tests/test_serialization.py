@@ -0,0 +1,81 @@
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+from .context import pokemon, serialization, showdown
+from .html_utils import get_resource_location
+
+_SHOWDOWN_REPLAY_RESOURCE = 'Gen9VGC2024RegFBo3-2024-02-24-tearsricochet-quartermachine.html'
+
+_STRUGGLE_BATTLE_LOG = '''
+|player|p1|Tears ricochet|170|1529
+|player|p2|Quarter Machine|2|1730
+|poke|p1|Regidrago, L50|
+|poke|p1|Flutter Mane, L50|
+|poke|p2|Flutter Mane, L50|
+|poke|p2|Tornadus, L50, M|
+|switch|p1a: Flutter Mane|Flutter Mane, L50|100\\/100
+|switch|p1b: Regidrago|Regidrago, L50|100\\/100
+|switch|p2a: Tornadus|Tornadus, L50, M|157\\/157
+|switch|p2b: Flutter Mane|Flutter Mane, L50|137\\/137
+|move|p1a: Flutter Mane|Struggle|p2a: Tornadus
+|move|p2a: Tornadus|Tailwind|p2a: Tornadus
+|win|Tears ricochet
+'''
+
+
+class SerializationTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = f'{self.directory}/cache.sqlite3'
+        location = get_resource_location(_SHOWDOWN_REPLAY_RESOURCE)
+        self.battle_log = showdown.ShowdownDownloadReplayRetrievalStrategy().retrieve_replay(location)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        for battle_log in (self.battle_log, _STRUGGLE_BATTLE_LOG):
+            replay = showdown.parse_replay(battle_log)
+            record = serialization.encode_replay(replay)
+            self.assertEqual(serialization.decode_replay(record), replay)
+
+    def test_round_trip_optional_fields(self):
+        replay = showdown.parse_replay(self.battle_log)
+        replay.player1_info.team.pokemon[0].ability = 'Mold Breaker'
+        replay.player1_info.team.pokemon[0].item = 'Hearthflame Mask'
+        replay.player2_info.team.pokemon = [pokemon.Pokemon(species='Amoonguss')]
+        record = serialization.encode_replay(replay)
+        self.assertEqual(serialization.decode_replay(record), replay)
+
+    def test_decode_rejects_other_records(self):
+        with self.assertRaises(ValueError):
+            serialization.decode_replay(b'\0' * 16)
+
+    def test_parsed_replay_cache(self):
+        expected_replay = showdown.parse_replay(self.battle_log)
+        with serialization.ParsedReplayCache(self.path) as parsed_cache:
+            self.assertEqual(parsed_cache.parse_replay(self.battle_log), expected_replay)
+            with unittest.mock.patch.object(serialization, 'parse_replay') as mock:
+                self.assertEqual(parsed_cache.parse_replay(self.battle_log), expected_replay)
+                mock.assert_not_called()
+
+    def test_parser_version_invalidates_records(self):
+        key = serialization.parsed_replay_key(self.battle_log)
+        with unittest.mock.patch.object(serialization, 'PARSER_VERSION', showdown.PARSER_VERSION + 1):
+            self.assertNotEqual(serialization.parsed_replay_key(self.battle_log), key)
+
+    def test_parse_replays_bulk(self):
+        battle_logs = [self.battle_log, _STRUGGLE_BATTLE_LOG] * 3
+        expected_replays = [showdown.parse_replay(battle_log) for battle_log in battle_logs]
+        with serialization.ParsedReplayCache(self.path) as parsed_cache:
+            self.assertEqual(parsed_cache.parse_replays(battle_logs), expected_replays)
+            self.assertEqual(len(parsed_cache), 2)
+            with unittest.mock.patch.object(serialization, 'parse_replay') as mock:
+                self.assertEqual(parsed_cache.parse_replays(battle_logs), expected_replays)
+                mock.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,16 @@
+import io
+import tempfile
+import textwrap
+import tracemalloc
 import unittest
 import unittest.mock
 
-from .context import pokemon, showdown
+from .context import bulk, handlers, pokemon, showdown
 from .html_utils import get_resource_location
 
 _SHOWDOWN_REPLAY_RESOURCE = 'Gen9VGC2024RegFBo3-2024-02-24-tearsricochet-quartermachine.html'
+# The memory retained by a parsed replay with two full teams.
+_REPLAY_MEMORY_BUDGET = 10 * 1024
 
 
 class ShowdownReplayParserTests(unittest.TestCase):
@@ -32,6 +38,41 @@ class ShowdownReplayParserTests(unittest.TestCase):
         expected_battle_log = _get_expected_battle_log()
         self.assertEqual(battle_log, expected_battle_log)
 
+    def test_showdown_downloaded_replay_retrieval_strategy_bs4(self):
+        location = get_resource_location(_SHOWDOWN_REPLAY_RESOURCE)
+        strategy = showdown.ShowdownDownloadReplayRetrievalStrategy(
+            fast_extraction=False
+        )
+        battle_log = strategy.retrieve_replay(location)
+        expected_battle_log = _get_expected_battle_log()
+        self.assertEqual(battle_log, expected_battle_log)
+
+    def test_showdown_downloaded_replay_retrieval_strategy_unusual_markup(self):
+        html = get_resource_location(_SHOWDOWN_REPLAY_RESOURCE).read_text(encoding='utf8')
+        html = html.replace(
+            '<script type="text/plain" class="battle-log-data">',
+            "<script type='text/plain' class='battle-log-data'>"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            location = f'{directory}/replay.html'
+            with open(location, 'w', encoding='utf8') as f:
+                f.write(html)
+            battle_log = showdown.ShowdownDownloadReplayRetrievalStrategy().retrieve_replay(location)
+        expected_battle_log = _get_expected_battle_log()
+        self.assertEqual(battle_log, expected_battle_log)
+
+    def test_dedent_matches_textwrap(self):
+        texts = [
+            '\n        |j|a\n\n        |t:|1\n    ',
+            '\t|a\n\t\t|b\n  \t\n\t|c',
+            '  |a\n    |b\n |c\n',
+            '|a\n  |b',
+            '   \n  \n',
+            '',
+        ]
+        for text in texts:
+            self.assertEqual(showdown._dedent(text), textwrap.dedent(text))
+
     def test_parse_replay(self):
         location = get_resource_location(_SHOWDOWN_REPLAY_RESOURCE)
         battle_log = showdown.ShowdownDownloadReplayRetrievalStrategy().retrieve_replay(location)
@@ -197,6 +238,232 @@ class ShowdownReplayParserTests(unittest.TestCase):
         )
         self.assertEqual(parsed_replay, expected_replay)
 
+    def test_parse_replay_stream_chunks(self):
+        battle_log = _get_expected_battle_log()
+        chunks = (battle_log[i:i + 37] for i in range(0, len(battle_log), 37))
+        self.assertEqual(
+            showdown.parse_replay_stream(chunks),
+            showdown.parse_replay(battle_log)
+        )
+
+    def test_parse_replay_stream_file(self):
+        battle_log = _get_expected_battle_log()
+        with io.StringIO(battle_log) as f:
+            self.assertEqual(
+                showdown.parse_replay_stream(f),
+                showdown.parse_replay(battle_log)
+            )
+
+    def test_iter_replays_concatenated_logs(self):
+        battle_log = _get_expected_battle_log()
+        replays = list(showdown.iter_replays(io.StringIO(battle_log * 3)))
+        self.assertEqual(len(replays), 3)
+        for replay in replays:
+            self.assertEqual(replay, showdown.parse_replay(battle_log))
+
+    def test_replay_parser_without_showteam(self):
+        parser = showdown.ReplayParser()
+        for line in textwrap.dedent(r'''
+            |player|p1|Tears ricochet|170|1529
+            |player|p2|Quarter Machine|2|1730
+            |poke|p1|Regidrago, L50|
+            |poke|p1|Flutter Mane, L50|
+            |poke|p2|Flutter Mane, L50|
+            |poke|p2|Tornadus, L50, M|
+            |start
+            |switch|p1a: Flutter Mane|Flutter Mane, L50|100\/100
+            |switch|p1b: Regidrago|Regidrago, L50|100\/100
+            |switch|p2a: Tornadus|Tornadus, L50, M|157\/157
+            |switch|p2b: Flutter Mane|Flutter Mane, L50|137\/137
+            |move|p2a: Tornadus|Tailwind|p2a: Tornadus
+            |win|Quarter Machine''').splitlines(keepends=True):
+            parser.feed(line)
+        replay = parser.finish()
+        self.assertFalse(replay.is_ots)
+        self.assertEqual(replay.winner, 2)
+        self.assertEqual(
+            [p.species for p in replay.player1_info.team.pokemon],
+            ['Regidrago', 'Flutter Mane']
+        )
+        tornadus = replay.player2_info.team.find_by_species('Tornadus')
+        self.assertEqual(tornadus.moves, [pokemon.Move(name='Tailwind', times_used=1)])
+        self.assertTrue(tornadus.was_lead)
+
+    def test_showteam_nickname_is_base_species(self):
+        parser = showdown.ReplayParser()
+        parser.feed('|player|p1|Tears ricochet|170|1529')
+        parser.feed('|showteam|p1|Chi-Yu||ChoiceSpecs|BeadsofRuin|HeatWave,DarkPulse||||||50|,,,,,Fire'
+                    ']Ogerpon-Hearthflame||HearthflameMask|MoldBreaker|IvyCudgel|||F|||50|,,,,,Fire')
+        chi_yu, ogerpon = parser.finish().player1_info.team.pokemon
+        self.assertEqual(chi_yu.nickname, 'Chi-Yu')
+        self.assertEqual(ogerpon.nickname, 'Ogerpon')
+
+    def test_showteam_moves_follow_seeded_move_names(self):
+        def parse_moves():
+            parser = showdown.ReplayParser()
+            parser.feed('|player|p1|Tears ricochet|170|1529')
+            parser.feed('|showteam|p1|Chi-Yu||ChoiceSpecs|BeadsofRuin|HeatWave,SeededTeamSheetMove||||||50|,,,,,Fire')
+            return [move.name for move in parser.finish().player1_info.team.pokemon[0].moves]
+
+        self.assertEqual(parse_moves(), ['Heat Wave', 'Seeded Team Sheet Move'])
+        pokemon.seed_move_names({'SeededTeamSheetMove': 'Seeded-Team Sheet Move'})
+        self.assertEqual(parse_moves(), ['Heat Wave', 'Seeded-Team Sheet Move'])
+
+    def test_replay_parser_custom_handlers(self):
+        faints = []
+        parser = showdown.ReplayParser(handlers={
+            'faint': lambda parser, command_parts: faints.append(command_parts[2])
+        })
+        parser.feed('|faint|p2a: Tornadus')
+        parser.feed('|-damage|p2a: Tornadus|0 fnt')
+        self.assertEqual(faints, ['p2a: Tornadus'])
+
+    def test_register_handler(self):
+        faints = []
+        with unittest.mock.patch.dict(handlers._HANDLERS):  # pylint: disable=protected-access
+            handlers.register_handler(
+                'faint',
+                lambda parser, command_parts: faints.append(parser.team(command_parts[2][:2]))
+            )
+            replay = showdown.parse_replay(_get_expected_battle_log())
+        self.assertEqual(len(faints), 6)
+        self.assertIs(faints[0], replay.player1_info.team)
+        self.assertNotIn('faint', showdown.ReplayParser()._handlers)  # pylint: disable=protected-access
+
+    def test_parse_replay_ignores_commands_in_other_lines(self):
+        replay = showdown.parse_replay(textwrap.dedent(r'''
+            |player|p1|Tears ricochet|170|1529
+            |player|p2|Quarter Machine|2|1730
+            |poke|p1|Regidrago, L50|
+            |poke|p2|Tornadus, L50, M|
+            |c|☆Tears ricochet||move|p1a: Regidrago|Protect
+            |switch|p1a: Regidrago|Regidrago, L50|100\/100
+            |switch|p2a: Tornadus|Tornadus, L50, M|157\/157
+            |move|p1a: Regidrago|Protect|p1a: Regidrago
+            |move|p1a: Regidrago|Protect|p1a: Regidrago
+            |win|Quarter Machine'''))
+        regidrago = replay.player1_info.team.pokemon[0]
+        self.assertEqual(regidrago.moves, [pokemon.Move(name='Protect', times_used=2)])
+
+    def test_parse_replay_repeated_switches(self):
+        replay = showdown.parse_replay(textwrap.dedent(r'''
+            |player|p1|Tears ricochet|170|1529
+            |player|p2|Quarter Machine|2|1730
+            |poke|p1|Regidrago, L50|
+            |poke|p1|Flutter Mane, L50|
+            |poke|p2|Tornadus, L50, M|
+            |switch|p1a: Drago|Regidrago, L50|100\/100
+            |switch|p2a: Tornadus|Tornadus, L50, M|157\/157
+            |move|p1a: Drago|Protect|p1a: Drago
+            |switch|p1a: Flutter|Flutter Mane, L50|100\/100
+            |move|p1a: Flutter|Moonblast|p2a: Tornadus
+            |switch|p1a: Drago|Regidrago, L50|100\/100
+            |move|p1a: Drago|Protect|p1a: Drago
+            |win|Quarter Machine'''))
+        regidrago, flutter_mane = replay.player1_info.team.pokemon
+        self.assertEqual(flutter_mane.nickname, 'Flutter')
+        self.assertEqual(regidrago.moves, [pokemon.Move(name='Protect', times_used=2)])
+        self.assertEqual(flutter_mane.moves, [pokemon.Move(name='Moonblast', times_used=1)])
+
+    def test_parse_replay_summary_mode(self):
+        battle_log = _get_expected_battle_log()
+        full = showdown.parse_replay(battle_log)
+        summary = showdown.parse_replay(battle_log, mode='summary')
+        self.assertEqual(summary.winner, full.winner)
+        self.assertEqual(summary.is_ots, full.is_ots)
+        for summary_info, full_info in (
+                (summary.player1_info, full.player1_info),
+                (summary.player2_info, full.player2_info)):
+            self.assertEqual(summary_info.player_name, full_info.player_name)
+            self.assertEqual(summary_info.is_winner, full_info.is_winner)
+            for summary_pokemon, full_pokemon in zip(summary_info.team.pokemon, full_info.team.pokemon):
+                self.assertEqual(summary_pokemon.species, full_pokemon.species)
+                self.assertEqual(summary_pokemon.tera_type, full_pokemon.tera_type)
+                self.assertEqual(summary_pokemon.was_brought, full_pokemon.was_brought)
+                self.assertEqual(summary_pokemon.was_lead, full_pokemon.was_lead)
+                self.assertEqual(summary_pokemon.was_terastallized, full_pokemon.was_terastallized)
+                self.assertEqual(
+                    [move.name for move in summary_pokemon.moves],
+                    [move.name for move in full_pokemon.moves]
+                )
+                self.assertTrue(all(move.times_used == 0 for move in summary_pokemon.moves))
+
+    def test_parse_replay_summary_mode_without_win(self):
+        battle_log = _get_expected_battle_log().replace('|win|', '|tie|')
+        summary = showdown.parse_replay(battle_log, mode='summary')
+        self.assertIsNone(summary.winner)
+        self.assertTrue(any(p.was_brought for p in summary.player1_info.team.pokemon))
+
+    def test_parse_replay_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            showdown.parse_replay(_get_expected_battle_log(), mode='moves')
+
+    def test_parse_battle_logs_matches_parse_replay(self):
+        battle_log = _get_expected_battle_log()
+        battle_logs = [
+            battle_log,
+            battle_log.replace('Quarter Machine', 'ironpumpernickel'),
+            battle_log.replace('|showteam|', '|c|x|'),
+            battle_log.replace('|win|', '|tie|'),
+            '',
+            battle_log.replace('Tailwind', 'Rain Dance'),
+        ]
+        for mode in showdown.PARSE_MODES:
+            with self.subTest(mode=mode):
+                self.assertEqual(
+                    bulk.parse_battle_logs(battle_logs, mode),
+                    [showdown.parse_replay(battle_log, mode) for battle_log in battle_logs]
+                )
+
+    def test_repeated_team_sheets_are_not_shared(self):
+        battle_log = _get_expected_battle_log()
+        first = showdown.parse_replay(battle_log)
+        second = showdown.parse_replay(battle_log)
+        self.assertEqual(first, second)
+        first_pokemon = first.player1_info.team.pokemon[0]
+        second_pokemon = second.player1_info.team.pokemon[0]
+        self.assertIsNot(first_pokemon, second_pokemon)
+        self.assertIsNot(first_pokemon.moves[0], second_pokemon.moves[0])
+
+    def test_parse_battle_logs_batches(self):
+        battle_logs = [_get_expected_battle_log()] * 5
+        with unittest.mock.patch.object(bulk, '_BULK_BATCH_SIZE', 1):
+            self.assertEqual(
+                bulk.parse_battle_logs(battle_logs),
+                [showdown.parse_replay(battle_log) for battle_log in battle_logs]
+            )
+
+    def test_parse_concatenated_file(self):
+        battle_log = _get_expected_battle_log()
+        other_battle_log = battle_log.replace('|win|Quarter Machine', '|win|Tears ricochet')
+        with tempfile.TemporaryDirectory() as directory:
+            path = f'{directory}/battle-logs.txt'
+            with open(path, 'w', encoding='utf8') as f:
+                f.write(battle_log + '\n' + other_battle_log + '\n' + battle_log)
+            for mode in showdown.PARSE_MODES:
+                with self.subTest(mode=mode):
+                    self.assertEqual(
+                        bulk.parse_concatenated_file(path, mode),
+                        [
+                            showdown.parse_replay(battle_log, mode),
+                            showdown.parse_replay(other_battle_log, mode),
+                            showdown.parse_replay(battle_log, mode)
+                        ]
+                    )
+
+    def test_parse_replay_memory_budget(self):
+        battle_log = _get_expected_battle_log()
+        showdown.parse_replay(battle_log)
+        replay_count = 100
+        tracemalloc.start()
+        try:
+            replays = [showdown.parse_replay(battle_log) for _ in range(replay_count)]
+            retained, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(len(replays), replay_count)
+        self.assertLess(retained / replay_count, _REPLAY_MEMORY_BUDGET)
+
 
 def _get_expected_battle_log() -> str:
     return r'''
@@ -0,0 +1,155 @@
+import http.server
+import os
+import subprocess
+import sys
+import threading
+import time
+import unittest
+import unittest.mock
+
+import requests
+
+from .context import showdown
+from .html_utils import get_resource, get_resource_location
+
+_SHOWDOWN_REPLAY_JSON_RESOURCE = 'Gen9VGC2024RegFBo3-2024-02-24-tearsricochet-quartermachine.json'
+_SHOWDOWN_REPLAY_HTML_RESOURCE = 'Gen9VGC2024RegFBo3-2024-02-24-tearsricochet-quartermachine.html'
+_LATENCY_SECONDS = 0.2
+
+
+class _ReplayHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        server = self.server
+        with server.lock:
+            server.connections.add(self.client_address)
+            server.requests[self.path] = server.requests.get(self.path, 0) + 1
+            attempt = server.requests[self.path]
+        time.sleep(_LATENCY_SECONDS)
+        if self.path.startswith('/flaky') and attempt < 3:
+            self._send(503, b'unavailable')
+        elif self.path.startswith('/missing'):
+            self._send(404, b'not found')
+        else:
+            self._send(200, server.body)
+
+    def _send(self, status: int, body: bytes):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+class ShowdownUrlReplayRetrievalTests(unittest.TestCase):
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _ReplayHandler)
+        self.server.lock = threading.Lock()
+        self.server.connections = set()
+        self.server.requests = {}
+        self.server.body = get_resource(_SHOWDOWN_REPLAY_JSON_RESOURCE).encode('utf8')
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base_url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        self.expected_battle_log = showdown.ShowdownDownloadReplayRetrievalStrategy().retrieve_replay(
+            get_resource_location(_SHOWDOWN_REPLAY_HTML_RESOURCE)
+        )
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def test_retrieve_replays_concurrently(self):
+        strategy = showdown.ShowdownUrlReplayRetrievalStrategy(max_workers=8)
+        locations = [f'{self.base_url}/replay-{i}' for i in range(16)]
+        start = time.perf_counter()
+        retrieved = dict(strategy.retrieve_replays(locations))
+        elapsed = time.perf_counter() - start
+        strategy.close()
+
+        self.assertEqual(set(retrieved), set(locations))
+        for battle_log in retrieved.values():
+            self.assertEqual(battle_log, self.expected_battle_log)
+        self.assertLess(elapsed, len(locations) * _LATENCY_SECONDS / 2)
+        self.assertLessEqual(len(self.server.connections), 8)
+
+    def test_retrieve_replays_bounds_pending_requests(self):
+        strategy = showdown.ShowdownUrlReplayRetrievalStrategy(max_workers=2)
+        requested = []
+
+        def locations():
+            for i in range(12):
+                requested.append(i)
+                yield f'{self.base_url}/replay-{i}'
+
+        replays = strategy.retrieve_replays(locations())
+        next(replays)
+        self.assertLessEqual(len(requested), 5)
+        replays.close()
+        strategy.close()
+        self.assertLessEqual(len(self.server.requests), 5)
+
+    def test_retrieve_replays_retries_with_backoff(self):
+        strategy = showdown.ShowdownUrlReplayRetrievalStrategy(retries=3, backoff=0.01)
+        location = f'{self.base_url}/flaky'
+        retrieved = list(strategy.retrieve_replays([location]))
+        strategy.close()
+
+        self.assertEqual(retrieved, [(location, self.expected_battle_log)])
+        self.assertEqual(self.server.requests['/flaky.json'], 3)
+
+    def test_retrieve_replays_does_not_retry_client_errors(self):
+        strategy = showdown.ShowdownUrlReplayRetrievalStrategy(retries=3, backoff=0.01)
+        with self.assertRaises(requests.HTTPError):
+            list(strategy.retrieve_replays([f'{self.base_url}/missing']))
+        strategy.close()
+        self.assertEqual(self.server.requests['/missing.json'], 1)
+
+    def test_retrieve_replay(self):
+        strategy = showdown.ShowdownUrlReplayRetrievalStrategy()
+        battle_log = strategy.retrieve_replay(f'{self.base_url}/replay')
+        strategy.close()
+        self.assertEqual(battle_log, self.expected_battle_log)
+
+    def test_retrieve_replay_retries_with_backoff(self):
+        strategy = showdown.ShowdownUrlReplayRetrievalStrategy(retries=3, backoff=0.01)
+        battle_log = strategy.retrieve_replay(f'{self.base_url}/flaky')
+        strategy.close()
+
+        self.assertEqual(battle_log, self.expected_battle_log)
+        self.assertEqual(self.server.requests['/flaky.json'], 3)
+
+    def test_retrieve_replay_does_not_retry_client_errors(self):
+        strategy = showdown.ShowdownUrlReplayRetrievalStrategy(retries=3, backoff=0.01)
+        with self.assertRaises(requests.HTTPError):
+            strategy.retrieve_replay(f'{self.base_url}/missing')
+        strategy.close()
+        self.assertEqual(self.server.requests['/missing.json'], 1)
+
+
+class LazyImportTests(unittest.TestCase):
+    def test_parsing_downloaded_replay_does_not_import_bs4_or_requests(self):
+        script = '\n'.join([
+            'import sys',
+            'from showdown_replay_analyzer import showdown',
+            'strategy = showdown.ShowdownDownloadReplayRetrievalStrategy()',
+            f'showdown.parse_replay(strategy.retrieve_replay({str(get_resource_location(_SHOWDOWN_REPLAY_HTML_RESOURCE))!r}))',
+            'print(sorted(name for name in ("bs4", "requests") if name in sys.modules))',
+        ])
+        output = subprocess.run(
+            [sys.executable, '-c', script],
+            cwd=os.path.join(os.path.dirname(__file__), '..'),
+            check=True,
+            capture_output=True,
+            text=True
+        ).stdout
+        self.assertEqual(output.strip(), '[]')
+
+
+if __name__ == '__main__':
+    unittest.main()
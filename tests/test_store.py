@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+from .context import showdown, store
+from .html_utils import get_resource_location
+
+_SHOWDOWN_REPLAY_RESOURCE = 'Gen9VGC2024RegFBo3-2024-02-24-tearsricochet-quartermachine.html'
+
+
+class ReplayStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = store.ReplayStore(os.path.join(self.directory, 'replays.sqlite3'))
+        self.location = get_resource_location(_SHOWDOWN_REPLAY_RESOURCE)
+        battle_log = showdown.ShowdownDownloadReplayRetrievalStrategy().retrieve_replay(self.location)
+        self.replays = {
+            'original': showdown.parse_replay(battle_log),
+            'reversed': showdown.parse_replay(
+                battle_log.replace('|win|Quarter Machine', '|win|Tears ricochet')
+            ),
+            'iron bundle': showdown.parse_replay(battle_log.replace('Flutter Mane', 'Iron Bundle')),
+        }
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def _expected_sides(self, selected, player=None, opponent=None, won=None) -> list:
+        sides = []
+        for location, replay in self.replays.items():
+            players = (replay.player1_info, replay.player2_info)
+            for side, player_info in enumerate(players, start=1):
+                opponent_info = players[2 - side]
+                if player is not None and player_info.player_name != player:
+                    continue
+                if opponent is not None and opponent_info.player_name != opponent:
+                    continue
+                if won is not None and player_info.is_winner != won:
+                    continue
+                if any(map(selected, player_info.team.pokemon)):
+                    sides.append(store.StoredSide(location, side, player_info.player_name, player_info.is_winner))
+        return sides
+
+    def test_find_and_count_match_the_parsed_replays(self):
+        self.assertEqual(self.store.add_replays(self.replays.items()), 3)
+        self.assertEqual(len(self.store), 3)
+        cases = [
+            ({}, lambda p: True, {}),
+            ({'species': 'Flutter Mane'}, lambda p: p.species == 'Flutter Mane', {}),
+            (
+                {'species': 'Flutter Mane', 'brought': True, 'terastallized': True},
+                lambda p: p.species == 'Flutter Mane' and p.was_brought and p.was_terastallized,
+                {}
+            ),
+            ({'lead': True, 'won': False}, lambda p: p.was_lead, {'won': False}),
+            ({'tera_type': 'Fairy'}, lambda p: p.tera_type == 'Fairy', {}),
+            ({'brought': False, 'player': 'Quarter Machine'}, lambda p: not p.was_brought, {'player': 'Quarter Machine'}),
+            ({'terastallized': True, 'opponent': 'Tears ricochet'}, lambda p: p.was_terastallized,
+             {'opponent': 'Tears ricochet'}),
+        ]
+        for filters, selected, side_filters in cases:
+            with self.subTest(filters=filters):
+                expected = self._expected_sides(selected, **side_filters)
+                self.assertTrue(expected)
+                self.assertEqual(self.store.find(**filters), expected)
+                self.assertEqual(
+                    self.store.count(**filters),
+                    (len(expected), sum(side.is_winner for side in expected))
+                )
+
+    def test_find_limit(self):
+        self.store.add_replays(self.replays.items())
+        self.assertEqual(self.store.find(limit=2), self._expected_sides(lambda p: True)[:2])
+
+    def test_stores_moves_of_each_team_slot(self):
+        self.store.add_replays(self.replays.items())
+        replay = self.replays['original']
+        expected = sorted(
+            (pokemon.species, move.name, move.times_used)
+            for pokemon in replay.player1_info.team.pokemon
+            for move in pokemon.moves
+        )
+        rows = self.store.query('''
+            SELECT slot.species, moves.name, moves.times_used
+            FROM moves
+            JOIN team_slots AS slot ON slot.id = moves.slot_id
+            JOIN replays AS replay ON replay.id = slot.replay_id
+            WHERE replay.location = ? AND slot.side = 1
+        ''', ('original',))
+        self.assertEqual(sorted(rows), expected)
+
+    def test_add_replays_replaces_replays_from_the_same_location(self):
+        self.store.add_replays(self.replays.items())
+        self.store.add_replays([('original', self.replays['iron bundle'])])
+        self.replays['original'] = self.replays['iron bundle']
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual(
+            self.store.find(species='Flutter Mane'),
+            self._expected_sides(lambda p: p.species == 'Flutter Mane')
+        )
+        self.assertEqual(self.store.query('SELECT COUNT(*) FROM sides'), [(6,)])
+
+    def test_ingest_skips_stored_locations(self):
+        self.assertEqual(self.store.ingest([self.location]), 1)
+        self.assertIn(self.location, self.store)
+        self.assertEqual(self.store.ingest([self.location]), 0)
+        self.assertEqual(len(self.store), 1)
+
+    def test_persists_between_connections(self):
+        self.store.add_replays(self.replays.items())
+        self.store.close()
+        with store.ReplayStore(self.store.path) as reopened:
+            self.assertEqual(reopened.count(species='Flutter Mane'), self.store.count(species='Flutter Mane'))
+
+    def test_unknown_filter(self):
+        with self.assertRaises(TypeError):
+            self.store.find(speceis='Flutter Mane')
+
+
+if __name__ == '__main__':
+    unittest.main()
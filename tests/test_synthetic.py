@@ -0,0 +1,83 @@
+import collections
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+from .context import showdown, synthetic
+
+
+class BattleLogGeneratorTests(unittest.TestCase):
+    def test_is_deterministic(self):
+        generator = synthetic.BattleLogGenerator(seed=3)
+        self.assertEqual(
+            list(generator.battle_logs(5, start=10)),
+            [synthetic.BattleLogGenerator(seed=3).battle_log(index) for index in range(10, 15)]
+        )
+        self.assertNotEqual(generator.battle_log(0), synthetic.BattleLogGenerator(seed=4).battle_log(0))
+        self.assertNotEqual(generator.battle_log(0), generator.battle_log(1))
+
+    def test_battle_logs_parse(self):
+        generator = synthetic.BattleLogGenerator(seed=1, nickname_rate=0.5, struggle_rate=0.05, long_game_rate=0.2)
+        counts = collections.Counter()
+        for battle_log in generator.battle_logs(200):
+            replay = showdown.parse_replay(battle_log)
+            winner = battle_log.rsplit('|win|', 1)[1].split('\n')[0]
+            players = (replay.player1_info, replay.player2_info)
+            self.assertEqual(players[replay.winner - 1].player_name, winner)
+            self.assertNotEqual(replay.player1_info.player_name, replay.player2_info.player_name)
+            counts['ots'] += replay.is_ots
+            counts['long'] += battle_log.count('|turn|') > 40
+            for player_info in players:
+                team = player_info.team.pokemon
+                self.assertEqual(len(team), 6)
+                self.assertLessEqual(sum(p.was_brought for p in team), 4)
+                self.assertEqual(sum(p.was_lead for p in team), 2)
+                self.assertLessEqual(sum(p.was_terastallized for p in team), 1)
+                self.assertTrue(all(p.was_brought for p in team if p.was_lead or p.was_terastallized))
+                counts['tera'] += sum(p.was_terastallized for p in team)
+                counts['hidden form'] += any(p.species == 'Urshifu-*' for p in team)
+                counts['nickname'] += any(
+                    p.nickname not in (None, p.species.split('-')[0]) for p in team if p.was_brought
+                )
+                counts['struggle'] += any(p.find_move('Struggle').times_used for p in team)
+        for feature in ('ots', 'long', 'tera', 'hidden form', 'nickname', 'struggle'):
+            self.assertGreater(counts[feature], 0, feature)
+        self.assertLess(counts['ots'], 200)
+
+    def test_moves_are_usable_in_generation_9(self):
+        generator = synthetic.BattleLogGenerator(seed=5, ots_rate=1)
+        moves = set()
+        for battle_log in generator.battle_logs(50):
+            replay = showdown.parse_replay(battle_log)
+            for player_info in (replay.player1_info, replay.player2_info):
+                moves.update(move.name for p in player_info.team.pokemon for move in p.moves)
+        self.assertTrue(moves)
+        self.assertLessEqual(moves - {'Struggle'}, set(synthetic._MOVES))
+        self.assertFalse([move for move in moves if move.startswith(('G-Max ', 'Max '))])
+
+    def test_ots_rate(self):
+        for ots_rate, is_ots in ((0, False), (1, True)):
+            generator = synthetic.BattleLogGenerator(ots_rate=ots_rate)
+            self.assertTrue(all(
+                showdown.parse_replay(battle_log).is_ots == is_ots
+                for battle_log in generator.battle_logs(10)
+            ))
+
+    def test_html_round_trip(self):
+        directory = tempfile.mkdtemp()
+        try:
+            generator = synthetic.BattleLogGenerator(seed=2)
+            paths = synthetic.write_replays(directory, generator, 3)
+            strategy = showdown.ShowdownDownloadReplayRetrievalStrategy()
+            for index, path in enumerate(paths):
+                self.assertEqual(strategy.retrieve_replay(path).strip('\n'), generator.battle_log(index))
+            log_paths = synthetic.write_replays(directory, generator, 1, start=5, as_html=False)
+            with open(log_paths[0], encoding='utf-8') as log_file:
+                self.assertEqual(log_file.read(), generator.battle_log(5))
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()